@@ -30,6 +30,10 @@ setup(
         "systemd", # For system logging integration
         "nats-py"
     ],
+    extras_require={
+        # In-process spectral scan decoder, ss-analyser is used without it
+        "spectral": ["numpy"],
+    },
     classifiers=[
         "Programming Language :: Python :: 3",
         "License :: OSI Approved :: Apache Software License",
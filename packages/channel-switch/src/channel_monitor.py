@@ -0,0 +1,186 @@
+import errno
+import select
+import socket
+import threading
+import time
+
+from logging_config import logger
+from nl80211 import (get_nl80211, NL80211Events, attr_u32, attr_str, NL80211_CMD_CH_SWITCH_NOTIFY,
+                     NL80211_CMD_CH_SWITCH_STARTED_NOTIFY, NL80211_CMD_SET_INTERFACE, NL80211_CMD_NEW_INTERFACE,
+                     NL80211_CMD_DEL_INTERFACE, NL80211_ATTR_IFINDEX, NL80211_ATTR_IFNAME,
+                     NL80211_ATTR_WIPHY_FREQ, NL80211_ATTR_CH_SWITCH_COUNT)
+from rmacs_util import get_mesh_freq
+
+
+class ChannelMonitor(threading.Thread):
+    '''
+    Keep the operating frequency of the radio interfaces current from nl80211 events.
+
+    The frequencies are read once when the monitor starts and then updated from
+    the channel switch notifications of the nl80211 "mlme" multicast group, so
+    reading the operating frequency does not query the kernel and a channel switch
+    can be awaited until it actually completed instead of sleeping a fixed time.
+
+    Changes without a channel switch event (mesh leave/join, interface down/up,
+    a frequency set with iw) are caught by reading the frequency of an interface
+    again when it is created, removed or changes type ("config" group), and when
+    there was no event and no read for max_age seconds.
+
+    If nl80211 events are not available the monitor does not run: get_frequency()
+    queries get_mesh_freq() and wait_for_switch() polls it until the timeout.
+    '''
+    def __init__(self, interfaces, poll_interval: float = 1.0, max_age: float = 10.0):
+        super().__init__(name="rmacs-channel-monitor", daemon=True)
+        self.interfaces = set(interfaces)
+        self.poll_interval = poll_interval
+        self.max_age = max_age
+        self.frequencies: dict = {}
+        # Monotonic time of the last event or read of the frequency of every interface
+        self.updated: dict = {}
+        self.pending: dict = {}
+        self.switches = 0
+        self.condition = threading.Condition()
+        self.events = None
+        self.running = False
+
+    def start(self) -> None:
+        nl80211 = get_nl80211()
+        if nl80211 is None:
+            logger.info("nl80211 events are not available, operating frequency is polled")
+            return
+        try:
+            self.events = NL80211Events(nl80211, ("mlme", "config"))
+        except OSError as e:
+            logger.warning(f"Subscribing to nl80211 channel switch events failed: {e}")
+            return
+        self.running = True
+        self.resync()
+        super().start()
+
+    def stop(self) -> None:
+        self.running = False
+        with self.condition:
+            self.condition.notify_all()
+
+    def resync(self, interfaces=None) -> None:
+        """
+        Read the operating frequency of the monitored interfaces from the kernel.
+
+        :param interfaces: Interfaces to read, all monitored interfaces by default.
+        """
+        interfaces = list(self.interfaces if interfaces is None else interfaces)
+        frequencies = {interface: get_mesh_freq(interface) for interface in interfaces}
+        now = time.monotonic()
+        with self.condition:
+            self.frequencies.update(frequencies)
+            self.updated.update(dict.fromkeys(frequencies, now))
+            self.condition.notify_all()
+
+    def stale(self) -> list:
+        """
+        Monitored interfaces without an event or read of their frequency for max_age seconds.
+        """
+        deadline = time.monotonic() - self.max_age
+        with self.condition:
+            return [interface for interface in self.interfaces if self.updated.get(interface, 0.0) < deadline]
+
+    def get_frequency(self, interface: str) -> int:
+        """
+        Current operating frequency of the interface.
+
+        :return: The frequency in MHz, None if the interface is not an operating mesh point.
+        """
+        if not self.running:
+            return get_mesh_freq(interface)
+        with self.condition:
+            if interface in self.frequencies and time.monotonic() - self.updated[interface] < self.max_age:
+                return self.frequencies[interface]
+            # Not monitored yet, from now on it is
+            self.interfaces.add(interface)
+        self.resync([interface])
+        with self.condition:
+            return self.frequencies[interface]
+
+    def wait_for_switch(self, interface: str, frequency: int, timeout: float) -> bool:
+        """
+        Wait until the interface operates on the given frequency.
+
+        :param interface: Name of the network interface.
+        :param frequency: Frequency the interface is switching to.
+        :param timeout: Maximum time to wait in seconds.
+        :return: True if the interface operates on the frequency.
+        """
+        deadline = time.monotonic() + timeout
+        if not self.running:
+            while get_mesh_freq(interface) != frequency:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                time.sleep(min(self.poll_interval, remaining))
+            return True
+        self.get_frequency(interface)
+        with self.condition:
+            switched = self.condition.wait_for(
+                lambda: self.frequencies.get(interface) == frequency or not self.running, timeout)
+            return switched and self.frequencies.get(interface) == frequency
+
+    def run(self) -> None:
+        logger.info(f"Monitoring channel switches of {sorted(self.interfaces)}")
+        poller = select.poll()
+        poller.register(self.events.fileno(), select.POLLIN)
+        try:
+            while self.running:
+                ready = poller.poll(self.poll_interval * 1000)
+                stale = self.stale()
+                if stale:
+                    self.resync(stale)
+                if not ready:
+                    continue
+                try:
+                    events = self.events.read()
+                except OSError as e:
+                    if e.errno != errno.ENOBUFS:
+                        raise
+                    logger.warning("nl80211 events were dropped, reading operating frequencies again")
+                    self.resync()
+                    continue
+                for cmd, attrs in events:
+                    self._handle_event(cmd, attrs)
+        except Exception as e:
+            logger.error(f"Channel monitor stopped: {e}")
+        finally:
+            self.running = False
+            self.events.close()
+            with self.condition:
+                self.condition.notify_all()
+
+    def _handle_event(self, cmd: int, attrs: dict) -> None:
+        if cmd in (NL80211_CMD_NEW_INTERFACE, NL80211_CMD_DEL_INTERFACE, NL80211_CMD_SET_INTERFACE):
+            # A removed interface has no index any more, the event carries its name
+            interface = attr_str(attrs, NL80211_ATTR_IFNAME)
+            if interface in self.interfaces:
+                logger.info(f"Interface {interface} changed, reading its operating frequency again")
+                self.resync([interface])
+            return
+        if cmd not in (NL80211_CMD_CH_SWITCH_NOTIFY, NL80211_CMD_CH_SWITCH_STARTED_NOTIFY):
+            return
+        try:
+            interface = socket.if_indextoname(attr_u32(attrs, NL80211_ATTR_IFINDEX))
+        except (OSError, TypeError):
+            return
+        if interface not in self.interfaces:
+            return
+        frequency = attr_u32(attrs, NL80211_ATTR_WIPHY_FREQ)
+        if cmd == NL80211_CMD_CH_SWITCH_STARTED_NOTIFY:
+            count = attr_u32(attrs, NL80211_ATTR_CH_SWITCH_COUNT)
+            logger.info(f"Channel switch of {interface} to {frequency} MHz started, {count} beacons")
+            with self.condition:
+                self.pending[interface] = frequency
+            return
+        logger.info(f"Channel switch of {interface} completed, operating frequency {frequency} MHz")
+        with self.condition:
+            self.pending.pop(interface, None)
+            self.frequencies[interface] = frequency
+            self.updated[interface] = time.monotonic()
+            self.switches += 1
+            self.condition.notify_all()
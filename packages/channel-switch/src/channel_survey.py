@@ -0,0 +1,109 @@
+import threading
+import time
+
+from logging_config import logger
+from nl80211 import get_nl80211
+
+
+class ChannelUsage:
+    '''
+    Channel time spent on one frequency between two surveys, in ms.
+
+    Attributes:
+    freq : Frequency in MHz.
+    active : Time the radio was on the channel.
+    busy : Time the channel was sensed busy.
+    rx : Time spent receiving.
+    tx : Time spent transmitting.
+    noise : Latest noise floor in dBm, None if not reported.
+    in_use : True for the operating channel.
+    '''
+    __slots__ = ("freq", "active", "busy", "rx", "tx", "noise", "in_use")
+
+    def __init__(self, freq: int, active, busy, rx, tx, noise, in_use: bool):
+        self.freq = freq
+        self.active = active
+        self.busy = busy
+        self.rx = rx
+        self.tx = tx
+        self.noise = noise
+        self.in_use = in_use
+
+    @property
+    def busy_ratio(self) -> float:
+        """Fraction of the active time the channel was busy, None if the channel was not visited."""
+        if not self.active or self.busy is None:
+            return None
+        return min(self.busy / self.active, 1.0)
+
+    def __repr__(self):
+        return f"ChannelUsage(freq={self.freq}, active={self.active}, busy={self.busy}, busy_ratio={self.busy_ratio})"
+
+
+def _delta(current, previous):
+    if current is None:
+        return None
+    if previous is None or current < previous:
+        # First survey of the channel, or the driver reset its counters
+        return current
+    return current - previous
+
+
+class ChannelSurvey:
+    '''
+    Collect channel utilization of every channel of an interface from nl80211 surveys.
+
+    Every update() reads the survey of the whole band with one NL80211_CMD_GET_SURVEY
+    dump and computes the time deltas since the previous update. Drivers keep the
+    counters of the operating channel running, other channels are only updated
+    while the radio visits them (e.g. during scans), their active time delta is 0
+    otherwise.
+    '''
+    def __init__(self, interface: str):
+        self.interface = interface
+        self.previous: dict = {}
+        self.usage: dict = {}
+        self.updated: float = None
+        self.lock = threading.Lock()
+
+    def update(self) -> dict:
+        """
+        Survey all channels and compute the usage since the previous update.
+
+        :return: Dict of {frequency: ChannelUsage}, empty if the survey is not available.
+        """
+        nl80211 = get_nl80211()
+        if nl80211 is None:
+            return {}
+        try:
+            surveys = nl80211.get_survey(self.interface)
+        except OSError as e:
+            logger.warning(f"Channel survey of {self.interface} failed: {e}")
+            return {}
+        with self.lock:
+            usage = {}
+            for freq, survey in surveys.items():
+                previous = self.previous.get(freq)
+                if previous is None:
+                    usage[freq] = ChannelUsage(freq, None, None, None, None, survey.noise, survey.in_use)
+                    continue
+                usage[freq] = ChannelUsage(freq,
+                                           _delta(survey.time, previous.time),
+                                           _delta(survey.busy, previous.busy),
+                                           _delta(survey.rx, previous.rx),
+                                           _delta(survey.tx, previous.tx),
+                                           survey.noise, survey.in_use)
+            self.previous = surveys
+            self.usage = usage
+            self.updated = time.monotonic()
+            return usage
+
+    def busy_ratios(self, frequencies) -> dict:
+        """
+        Busy ratio of the given frequencies over the last survey window.
+
+        :param frequencies: Frequencies in MHz, e.g. the configured freq_list.
+        :return: Dict of {frequency: busy ratio between 0 and 1, None if not measured}.
+        """
+        with self.lock:
+            return {freq: (self.usage[freq].busy_ratio if freq in self.usage else None) for freq in frequencies}
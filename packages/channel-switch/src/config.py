@@ -1,6 +1,8 @@
-import yaml
 import os
+import copy
 import logging
+import threading
+from types import MappingProxyType
 
 # Define default configuration  
 default_config = {
@@ -16,6 +18,8 @@ default_config = {
         "osf_interface": "osf0",
         "nw_interface": "wlp1s0",
         "halow_interface": "morse1",
+        "halow_firmware": "/run/current-system/sw/lib/firmware/mm6108.bin",
+        "halow_stats_interval": 5.0,
         "driver": "ath9k",
         "bridge_interface": "br-lan",
         "addr_prefix": "fdd8",
@@ -56,6 +60,27 @@ default_config = {
         "periodic_operating_freq_broadcast": 15.0,
         "log_file": "/var/log/rmacs.log",
         "bin_file": "/home/scmd/sample.bin",
+        "spectral_decoder": "auto",
+        "spectral_persist": False,
+        "spectral_interference_margin": 10,
+        # Nodes before the binary format stop receiving on its first message, switch to
+        # binary once every node of the mesh decodes both formats
+        "wire_format": "json",
+        "dedup_capacity": 4096,
+        "dedup_ttl": 300,
+        "switch_ack_enabled": True,
+        "switch_ack_timeout": 0.1,
+        "switch_ack_max_retries": 4,
+        "peer_expiry_time": 600,
+        "receive_buffer_size": 2048,
+        "socket_rcvbuf": 262144,
+        "sampler_enabled": True,
+        "sampler_interval": 1.0,
+        "sampler_capacity": 128,
+        "metrics_enabled": False,
+        "metrics_address": "127.0.0.1",
+        "metrics_server_port": 9465,
+        "metrics_client_port": 9466,
     },
     "NATS_Config": {       
     "nats_server_url": "nats://localhost:4222",
@@ -67,26 +92,192 @@ default_config = {
 def merge_dicts(default, user):
     """Recursively merge user config into default config."""
     for key, value in user.items():
-        if isinstance(value, dict) and key in default:
+        if isinstance(value, dict) and isinstance(default.get(key), dict):
             default[key] = merge_dicts(default[key], value)
         else:
             default[key] = value
     return default
 
+def freeze_config(value):
+    """Return a read-only view of a parsed configuration (dicts become mappingproxies, lists tuples)."""
+    if isinstance(value, dict):
+        return MappingProxyType({key: freeze_config(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(freeze_config(item) for item in value)
+    return value
+
+def thaw_config(value):
+    """Return a mutable deep copy of a frozen configuration snapshot."""
+    if isinstance(value, (dict, MappingProxyType)):
+        return {key: thaw_config(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [thaw_config(item) for item in value]
+    return value
+
+
+class ConfigStore:
+    """
+    Process-wide cache of a parsed configuration file.
+
+    The YAML file is parsed once and re-parsed only when its (mtime, inode, size)
+    signature changes. Readers get an immutable snapshot which is safe to share
+    between threads.
+    """
+    def __init__(self, config_file_path):
+        self.config_file_path = config_file_path
+        self._lock = threading.Lock()
+        self._signature = None
+        self._snapshot = None
+
+    def _stat_signature(self):
+        try:
+            stat = os.stat(self.config_file_path)
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_ino, stat.st_size)
+
+    def get(self):
+        """
+        Return the current configuration snapshot, re-parsing the file only if it changed.
+        """
+        signature = self._stat_signature()
+        snapshot = self._snapshot
+        if snapshot is not None and signature == self._signature:
+            return snapshot
+        with self._lock:
+            if self._snapshot is None or signature != self._signature:
+                self._snapshot = freeze_config(self._parse())
+                self._signature = signature
+                logging.debug(f"RMACS configuration (re)loaded from {self.config_file_path}")
+            return self._snapshot
+
+    def invalidate(self):
+        """Force the next get() to re-parse the configuration file."""
+        with self._lock:
+            self._signature = None
+            self._snapshot = None
+
+    def _parse(self):
+        config = copy.deepcopy(default_config)
+        if os.path.exists(self.config_file_path):
+            import yaml
+            with open(self.config_file_path, 'r') as file:
+                user_config = yaml.safe_load(file)
+            if isinstance(user_config, dict):
+                config = merge_dicts(config, user_config)
+        return config
+
+
+_config_stores = {}
+_config_stores_lock = threading.Lock()
+
+def get_config_store(config_file_path):
+    """Return the process-wide ConfigStore for the given configuration file."""
+    store = _config_stores.get(config_file_path)
+    if store is None:
+        with _config_stores_lock:
+            store = _config_stores.setdefault(config_file_path, ConfigStore(config_file_path))
+    return store
+
+def get_config(config_file_path):
+    """Return an immutable, cached snapshot of the configuration."""
+    return get_config_store(config_file_path).get()
+
 def load_config(config_file_path):
-    """Load configuration by merging default and user-provided configs."""
-    if os.path.exists(config_file_path):
-        with open(config_file_path, 'r') as file:
-            user_config = yaml.safe_load(file)
-            config = merge_dicts(default_config.copy(), user_config)
-    else:
-        config = default_config
+    """Load configuration by merging default and user-provided configs.
 
-    return config
+    Returns a mutable copy, callers may modify it without affecting other readers.
+    """
+    return thaw_config(get_config(config_file_path))
+
+def diff_config(old, new):
+    """
+    Compute the keys that changed between two configuration snapshots.
+
+    :param old: Previous configuration snapshot.
+    :param new: Current configuration snapshot.
+    :return: Dict of {(section, key): (old_value, new_value)} for every changed key.
+    """
+    changes = {}
+    for section in set(old) | set(new):
+        old_section = old.get(section, {})
+        new_section = new.get(section, {})
+        for key in set(old_section) | set(new_section):
+            old_value = old_section.get(key)
+            new_value = new_section.get(key)
+            if old_value != new_value:
+                changes[(section, key)] = (old_value, new_value)
+    return changes
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+def _positive_int(value):
+    return isinstance(value, int) and not isinstance(value, bool) and value > 0
+
+def _positive_number(value):
+    return _is_number(value) and value > 0
+
+def _non_negative_number(value):
+    return _is_number(value) and value >= 0
+
+def _percentage(value):
+    return _is_number(value) and 0 <= value <= 100
+
+def _channel_bandwidth(value):
+    return value in (5, 10, 20, 40, 80, 160) and not isinstance(value, bool)
+
+def _freq_list(value):
+    return isinstance(value, (list, tuple)) and len(value) > 0 and all(_positive_int(freq) for freq in value)
+
+# Validators for the RMACS_Config keys which can be applied to running server and client
+RELOADABLE_KEYS = {
+    "traffic_threshold": _non_negative_number,
+    "phy_error_limit": _non_negative_number,
+    "tx_timeout_limit": _non_negative_number,
+    "air_time_limit": _percentage,
+    "max_error_check": _positive_int,
+    "freq_list": _freq_list,
+    "seq_limit": _positive_int,
+    "hop_interval": _non_negative_number,
+    "stability_threshold": _positive_int,
+    "report_expiry_threshold": _positive_number,
+    "channel_bandwidth": _channel_bandwidth,
+    "beacon_count": _positive_int,
+    "client_beacon_count": _positive_int,
+    "buffer_period": _non_negative_number,
+    "channel_quality_index_threshold": _is_number,
+    "bcqi_threshold_time": _non_negative_number,
+    "periodic_recovery_switch": _positive_number,
+    "periodic_operating_freq_broadcast": _positive_number,
+}
+
+def validate_config_changes(changes, keys):
+    """
+    Select and validate the RMACS_Config changes relevant to a running component.
+
+    :param changes: Changes as returned by diff_config().
+    :param keys: RMACS_Config keys the component can apply at runtime.
+    :return: Tuple (updates, rejected, ignored) where updates maps key -> new value,
+             rejected lists keys with invalid values and ignored lists changed keys
+             which need a restart to take effect.
+    """
+    updates = {}
+    rejected = []
+    ignored = []
+    for (section, key), (_, value) in changes.items():
+        if section != "RMACS_Config" or key not in keys:
+            ignored.append(f"{section}.{key}")
+        elif not RELOADABLE_KEYS[key](value):
+            rejected.append(f"{key}={value!r}")
+        else:
+            updates[key] = value
+    return updates, rejected, ignored
 
 def create_default_config(config_file_path):
     """Create a default configuration file if it does not exist."""
     if not os.path.exists(config_file_path):
+        import yaml
         with open(config_file_path, 'w') as file:
             yaml.dump(default_config, file, sort_keys=False)
         logging.info(f"RMACS Default configuration file created at {config_file_path}")
@@ -0,0 +1,143 @@
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import threading
+import time
+
+from config import get_config_store, diff_config
+from logging_config import logger
+
+# Reference : include/uapi/linux/inotify.h
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+INOTIFY_EVENT_HEADER = struct.Struct("iIII")
+
+
+class ConfigWatcher(threading.Thread):
+    '''
+    Watch the RMACS configuration file and push changed keys to listeners.
+
+    The configuration directory is watched with inotify, so the watcher also sees
+    files replaced by editors or by rmacs_manager. If inotify is not available the
+    file is polled through the ConfigStore signature check instead.
+
+    Listeners are called with the diff computed by config.diff_config() and the
+    new configuration snapshot.
+    '''
+    def __init__(self, config_file_path: str, poll_interval: float = 2.0, settle_time: float = 0.2):
+        super().__init__(name="rmacs-config-watcher", daemon=True)
+        self.config_file_path = config_file_path
+        self.config_dir = os.path.dirname(config_file_path) or "."
+        self.config_name = os.path.basename(config_file_path)
+        self.poll_interval = poll_interval
+        self.settle_time = settle_time
+        self.store = get_config_store(config_file_path)
+        self.snapshot = self.store.get()
+        self.listeners: list = []
+        self.running = False
+        self.inotify_fd = None
+
+    def add_listener(self, callback) -> None:
+        """
+        Register a callback(changes, snapshot) to be called on every configuration change.
+        """
+        self.listeners.append(callback)
+
+    def run(self) -> None:
+        self.running = True
+        self.inotify_fd = self._inotify_open()
+        if self.inotify_fd is None:
+            logger.info(f"inotify is not available, polling {self.config_file_path} every {self.poll_interval}s")
+            while self.running:
+                time.sleep(self.poll_interval)
+                self.check()
+            return
+
+        logger.info(f"Watching {self.config_file_path} for configuration changes")
+        poller = select.poll()
+        poller.register(self.inotify_fd, select.POLLIN)
+        try:
+            while self.running:
+                if not poller.poll(self.poll_interval * 1000):
+                    continue
+                if self._read_events():
+                    # Editors and yaml.dump write in several steps, let the file settle
+                    time.sleep(self.settle_time)
+                    self._read_events()
+                    self.check()
+        finally:
+            os.close(self.inotify_fd)
+            self.inotify_fd = None
+
+    def stop(self) -> None:
+        self.running = False
+
+    def check(self) -> dict:
+        """
+        Reload the configuration and notify listeners about changed keys.
+
+        :return: The changed keys, empty if nothing changed.
+        """
+        try:
+            new_snapshot = self.store.get()
+        except Exception as e:
+            logger.error(f"Failed to reload configuration {self.config_file_path}, keeping current one: {e}")
+            return {}
+        if new_snapshot is self.snapshot:
+            return {}
+        changes = diff_config(self.snapshot, new_snapshot)
+        self.snapshot = new_snapshot
+        if not changes:
+            return {}
+        logger.info(f"Configuration changed: {sorted(f'{section}.{key}' for section, key in changes)}")
+        for callback in self.listeners:
+            try:
+                callback(changes, new_snapshot)
+            except Exception as e:
+                logger.error(f"Error applying configuration change in {callback}: {e}")
+        return changes
+
+    def _inotify_open(self):
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+            fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+            if fd < 0:
+                return None
+            mask = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_MODIFY
+            if libc.inotify_add_watch(fd, self.config_dir.encode(), mask) < 0:
+                logger.warning(f"inotify watch on {self.config_dir} failed: {os.strerror(ctypes.get_errno())}")
+                os.close(fd)
+                return None
+            return fd
+        except (OSError, AttributeError) as e:
+            logger.warning(f"inotify setup failed: {e}")
+            return None
+
+    def _read_events(self) -> bool:
+        """
+        Drain pending inotify events.
+
+        :return: True if any event concerned the configuration file.
+        """
+        relevant = False
+        while True:
+            try:
+                buf = os.read(self.inotify_fd, 4096)
+            except BlockingIOError:
+                return relevant
+            if not buf:
+                return relevant
+            pos = 0
+            while pos + INOTIFY_EVENT_HEADER.size <= len(buf):
+                _, _, _, name_len = INOTIFY_EVENT_HEADER.unpack_from(buf, pos)
+                pos += INOTIFY_EVENT_HEADER.size
+                name = buf[pos:pos + name_len].rstrip(b"\0").decode(errors="replace")
+                pos += name_len
+                if name == self.config_name:
+                    relevant = True
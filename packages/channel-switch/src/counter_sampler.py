@@ -0,0 +1,146 @@
+import threading
+import time
+from array import array
+
+from logging_config import logger
+
+WRAP_32 = 1 << 32
+WRAP_64 = 1 << 64
+
+
+def counter_delta(previous: int, current: int) -> int:
+    """
+    Increase of a free running counter, allowing for one wraparound.
+
+    A counter which was in the upper half of the 32-bit (unsigned long of 32-bit
+    kernels, firmware counters) or 64-bit range has wrapped, a counter which
+    went back from anywhere else was reset (e.g. driver reload) and counts from 0.
+    """
+    if current >= previous:
+        return current - previous
+    if WRAP_32 // 2 <= previous < WRAP_32:
+        return current + WRAP_32 - previous
+    if previous >= WRAP_64 // 2:
+        return current + WRAP_64 - previous
+    return current
+
+
+class CounterSampler(threading.Thread):
+    '''
+    Poll a set of counters in the background into fixed-size ring buffers.
+
+    Every interval the read() callable returns the raw values of the counters
+    (None for counters which could not be read, the next value read is then
+    taken as a new baseline instead of a delta). The values are unwrapped into
+    64-bit running totals and stored with their timestamp in array('Q') / array('d')
+    rings of capacity samples, so deltas over any recent window are available
+    without waiting.
+
+    :param names: Names of the counters, in the order read() returns them.
+    :param read: Callable returning a sequence of raw counter values.
+    :param interval: Seconds between two samples.
+    :param capacity: Number of samples kept.
+    '''
+    def __init__(self, names, read, interval: float = 1.0, capacity: int = 128, name: str = "rmacs-counter-sampler"):
+        super().__init__(name=name, daemon=True)
+        self.names = tuple(names)
+        self.read = read
+        self.interval = interval
+        self.capacity = capacity
+        self.times = array("d", bytes(8 * capacity))
+        self.totals = {counter: array("Q", bytes(8 * capacity)) for counter in self.names}
+        self.valid = {counter: array("B", bytes(capacity)) for counter in self.names}
+        self.raw = dict.fromkeys(self.names)
+        self.running_totals = dict.fromkeys(self.names, 0)
+        self.count = 0
+        self.read_errors = 0
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+
+    def run(self) -> None:
+        logger.info(f"Sampling {', '.join(self.names)} every {self.interval}s")
+        next_sample = time.monotonic()
+        while not self.stopped.is_set():
+            self.sample_once()
+            next_sample += self.interval
+            delay = next_sample - time.monotonic()
+            if delay < 0:
+                # Reading took longer than the interval, do not try to catch up
+                next_sample = time.monotonic()
+                delay = 0
+            self.stopped.wait(delay)
+
+    def stop(self) -> None:
+        self.stopped.set()
+
+    def sample_once(self) -> None:
+        """
+        Read the counters and append them to the rings.
+        """
+        try:
+            values = self.read()
+        except Exception as e:
+            self.read_errors += 1
+            logger.warning(f"Reading counters failed: {e}")
+            return
+        now = time.monotonic()
+        with self.lock:
+            slot = self.count % self.capacity
+            self.times[slot] = now
+            for counter, value in zip(self.names, values):
+                valid = value is not None
+                previous = self.raw[counter]
+                if valid and previous is not None:
+                    total = (self.running_totals[counter] + counter_delta(previous, value)) % WRAP_64
+                    self.running_totals[counter] = total
+                self.raw[counter] = value
+                self.totals[counter][slot] = self.running_totals[counter]
+                self.valid[counter][slot] = valid
+            self.count += 1
+
+    def window(self, seconds: float, end: int = 0):
+        """
+        Counter deltas over the most recent window.
+
+        :param seconds: Length of the window, the shortest sampled window of about this length is used.
+        :param end: Number of samples to skip back from the newest one, to get earlier windows.
+        :return: (end time, window length, {counter: delta or None}), None if the history is too short.
+        """
+        with self.lock:
+            available = min(self.count, self.capacity)
+            newest = self.count - 1 - end
+            if newest < 1 or self.count - newest > available:
+                return None
+            new_slot = newest % self.capacity
+            end_time = self.times[new_slot]
+            oldest = newest - 1
+            # Allow for jitter of the sampling times
+            shortest = seconds - self.interval / 2
+            while oldest > self.count - available and end_time - self.times[oldest % self.capacity] < shortest:
+                oldest -= 1
+            old_slot = oldest % self.capacity
+            window = end_time - self.times[old_slot]
+            if window < shortest:
+                return None
+            deltas = {}
+            for counter in self.names:
+                if self.valid[counter][new_slot] and self.valid[counter][old_slot]:
+                    deltas[counter] = (self.totals[counter][new_slot] - self.totals[counter][old_slot]) % WRAP_64
+                else:
+                    deltas[counter] = None
+            return end_time, window, deltas
+
+    def windows(self, seconds: float, count: int) -> list:
+        """
+        Consecutive windows of the given length ending at the newest sample, oldest first.
+
+        :return: List of window() results, None if the history is too short.
+        """
+        step = max(1, round(seconds / self.interval))
+        result = []
+        for index in range(count):
+            window = self.window(seconds, end=index * step)
+            if window is None:
+                return None
+            result.append(window)
+        return result[::-1]
@@ -0,0 +1,76 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class MessageIdCache:
+    '''
+    Fixed-capacity, time-expiring set of processed message ids.
+
+    Ids are kept in insertion order with the time they were first seen, so expiry
+    and eviction only ever look at the oldest entries. Insert, lookup, expiry and
+    eviction are O(1) (amortized), and the memory use is bounded by the capacity.
+
+    Attributes:
+    hits : Number of duplicate ids seen.
+    misses : Number of new ids seen.
+    expired : Number of ids dropped because they were older than the ttl.
+    evicted : Number of ids dropped because the cache was full.
+    '''
+    def __init__(self, capacity: int = 4096, ttl: float = 300.0):
+        if capacity <= 0:
+            raise ValueError(f"Invalid dedup cache capacity: {capacity}")
+        self.capacity = capacity
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evicted = 0
+
+    def check_and_add(self, message_id, now: float = None) -> bool:
+        """
+        Record a message id.
+
+        :param message_id: Id of the received message.
+        :param now: Current monotonic time, read from the clock if not given.
+        :return: True if the id is new, False if it is a duplicate.
+        """
+        now = time.monotonic() if now is None else now
+        with self.lock:
+            self._expire(now)
+            if message_id in self.entries:
+                self.hits += 1
+                return False
+            if len(self.entries) >= self.capacity:
+                self.entries.popitem(last=False)
+                self.evicted += 1
+            self.entries[message_id] = now
+            self.misses += 1
+            return True
+
+    def __contains__(self, message_id) -> bool:
+        with self.lock:
+            self._expire(time.monotonic())
+            return message_id in self.entries
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def stats(self) -> dict:
+        """
+        Return the cache counters.
+        """
+        return {"size": len(self.entries), "hits": self.hits, "misses": self.misses,
+                "expired": self.expired, "evicted": self.evicted}
+
+    def _expire(self, now: float) -> None:
+        deadline = now - self.ttl
+        entries = self.entries
+        while entries:
+            message_id, seen = next(iter(entries.items()))
+            if seen > deadline:
+                break
+            del entries[message_id]
+            self.expired += 1
@@ -0,0 +1,130 @@
+import threading
+import time
+
+from logging_config import logger
+
+
+class Delivery:
+    '''
+    Delivery state of one acknowledged message.
+
+    Attributes:
+    message_id : Id of the tracked message.
+    message : The encoded message, retransmitted as is.
+    expected : Devices expected to acknowledge the message.
+    latency : Dict of {device: seconds from the first send to its acknowledgement}.
+    attempts : Number of times the message has been sent.
+    done : Event set once every expected device acknowledged or the retries ran out.
+    '''
+    def __init__(self, message_id, message: bytes, expected, sent_at: float):
+        self.message_id = message_id
+        self.message = message
+        self.expected = set(expected)
+        self.latency: dict = {}
+        self.sent_at = sent_at
+        self.attempts = 1
+        self.done = threading.Event()
+        if not self.expected:
+            self.done.set()
+
+    @property
+    def pending(self) -> set:
+        """Devices which have not acknowledged the message yet."""
+        return self.expected - self.latency.keys()
+
+    def wait(self, timeout: float = None) -> bool:
+        """
+        Wait until the delivery is complete or given up.
+
+        :return: True if every expected device acknowledged the message.
+        """
+        self.done.wait(timeout)
+        return not self.pending
+
+
+class AckTracker:
+    '''
+    Track acknowledgements of multicast messages and retransmit with exponential backoff.
+
+    The retransmission timers run on the given event loop (the multicast transport
+    loop), acknowledgements may be reported from any thread. The message is sent
+    again while any expected device is missing, waiting ack_timeout, 2 * ack_timeout,
+    4 * ack_timeout ... between attempts, up to max_retries retransmissions.
+
+    Attributes:
+    latencies : Dict of {device: latest delivery latency in seconds}.
+    retransmissions : Total number of retransmitted messages.
+    stragglers : Total number of devices which never acknowledged a message.
+    '''
+    def __init__(self, loop, send, ack_timeout: float = 0.1, max_retries: int = 4):
+        self.loop = loop
+        self.send = send
+        self.ack_timeout = ack_timeout
+        self.max_retries = max_retries
+        self.deliveries: dict = {}
+        self.latencies: dict = {}
+        self.retransmissions = 0
+        self.stragglers = 0
+        self.lock = threading.Lock()
+
+    def track(self, message_id, message: bytes, expected) -> Delivery:
+        """
+        Start tracking a message which has just been sent.
+
+        :param message_id: Id of the message, acknowledgements refer to it.
+        :param message: The encoded message for retransmissions.
+        :param expected: Devices expected to acknowledge the message.
+        :return: The Delivery, wait() on it to block until delivery is complete.
+        """
+        delivery = Delivery(message_id, message, expected, time.monotonic())
+        if delivery.done.is_set():
+            return delivery
+        with self.lock:
+            self.deliveries[message_id] = delivery
+        self.loop.call_soon_threadsafe(self._schedule, delivery)
+        return delivery
+
+    def acknowledge(self, message_id, device: str) -> float:
+        """
+        Record the acknowledgement of a message by a device.
+
+        :return: The delivery latency in seconds, None for unknown or repeated acknowledgements.
+        """
+        now = time.monotonic()
+        with self.lock:
+            delivery = self.deliveries.get(message_id)
+            if delivery is None or device in delivery.latency:
+                return None
+            # Devices not known when the message was sent are tracked as well
+            delivery.expected.add(device)
+            latency = now - delivery.sent_at
+            delivery.latency[device] = latency
+            self.latencies[device] = latency
+            if not delivery.pending:
+                del self.deliveries[message_id]
+                delivery.done.set()
+        return latency
+
+    def _schedule(self, delivery: Delivery) -> None:
+        delay = self.ack_timeout * 2 ** (delivery.attempts - 1)
+        self.loop.call_later(delay, self._check, delivery)
+
+    def _check(self, delivery: Delivery) -> None:
+        with self.lock:
+            pending = delivery.pending
+            if not pending:
+                return
+            if delivery.attempts > self.max_retries:
+                self.deliveries.pop(delivery.message_id, None)
+                self.stragglers += len(pending)
+                delivery.done.set()
+                logger.warning(f"Message {delivery.message_id} not acknowledged by {sorted(pending)} after {delivery.attempts} attempts")
+                return
+            delivery.attempts += 1
+            self.retransmissions += 1
+        logger.info(f"Retransmitting message {delivery.message_id} (attempt {delivery.attempts}), waiting for {sorted(pending)}")
+        try:
+            self.send(delivery.message)
+        except Exception as e:
+            logger.error(f"Retransmission of message {delivery.message_id} failed: {e}")
+        self._schedule(delivery)
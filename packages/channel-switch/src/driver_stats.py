@@ -0,0 +1,147 @@
+import abc
+import os
+import subprocess
+import time
+
+from logging_config import logger
+from rmacs_util import path_lookup
+
+# Counter names are normalized by normalize_name()
+BEACONS_LATE = "beacons late from host delay"
+
+
+def normalize_name(name: str) -> str:
+    """
+    Counter name in lower case with single spaces, as names are matched case-insensitively.
+    """
+    return " ".join(name.split()).lower()
+
+
+class DriverStats(abc.ABC):
+    '''
+    Collector of the driver specific statistics of a radio interface.
+
+    read() returns all counters of the driver in one call as a dict of
+    {normalized name: value}, see normalize_name(). Collectors which are
+    expensive to query are read at most every min_interval seconds, the last
+    counters are returned in between. Drivers without specific statistics
+    have no collector, their counters come from ethtool.
+    '''
+    def __init__(self, interface: str, min_interval: float = 0.0):
+        self.interface = interface
+        self.min_interval = min_interval
+        self.counters: dict = None
+        self.read_at: float = None
+
+    def read(self) -> dict:
+        """
+        Read all counters.
+
+        :return: Dict of {name: value}, None if the statistics could not be read.
+        """
+        now = time.monotonic()
+        if self.read_at is None or now - self.read_at >= self.min_interval:
+            self.counters = self._read()
+            self.read_at = now
+        return self.counters
+
+    @abc.abstractmethod
+    def _read(self) -> dict:
+        """
+        Query the driver for all counters, None if they could not be read.
+        """
+
+    def close(self) -> None:
+        pass
+
+
+class MorseStats(DriverStats):
+    '''
+    Statistics of Morse Micro HaLow interfaces.
+
+    The firmware statistics are only exposed through morsectrl, which decodes
+    them with the firmware image. One morsectrl call without a shell reads the
+    whole set, instead of a sudo + grep + awk + cut pipeline per counter; sudo
+    is only used when not running as root.
+
+    :param interface: HaLow interface, e.g. halow_interface of the configuration.
+    :param firmware: Firmware image the statistics are decoded with.
+    :param min_interval: Minimum seconds between two morsectrl calls.
+    :param timeout: Seconds a morsectrl call may take.
+    '''
+    def __init__(self, interface: str, firmware: str, min_interval: float = 0.0, timeout: float = 5.0):
+        super().__init__(interface, min_interval)
+        self.firmware = firmware
+        self.timeout = timeout
+        self.command = None
+        morsectrl = path_lookup('morsectrl')
+        if morsectrl is None:
+            logger.warning(f"morsectrl not found, HaLow statistics of {interface} are not available")
+            return
+        self.command = [morsectrl, "-i", interface, "stats", "-s", firmware]
+        if os.geteuid() != 0:
+            sudo = path_lookup('sudo')
+            if sudo is not None:
+                self.command.insert(0, sudo)
+
+    def _read(self) -> dict:
+        if self.command is None:
+            return None
+        try:
+            result = subprocess.run(self.command, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                    text=True, timeout=self.timeout)
+        except (OSError, subprocess.SubprocessError) as e:
+            logger.info(f"Reading HaLow statistics of {self.interface} failed: {e}")
+            return None
+        if result.returncode != 0:
+            logger.info(f"morsectrl failed with return code {result.returncode}. Error: {result.stderr}")
+            return None
+        return self.parse(result.stdout)
+
+    @staticmethod
+    def parse(output: str) -> dict:
+        """
+        Parse the "Name: value" lines of morsectrl stats, lines without a numeric value are skipped.
+        """
+        stats = {}
+        for line in output.splitlines():
+            name, separator, value = line.partition(":")
+            if not separator:
+                continue
+            try:
+                stats[normalize_name(name)] = int(value.strip())
+            except ValueError:
+                continue
+        return stats
+
+
+_halow_stats: dict = {}
+
+
+def get_halow_stats(rconfig) -> DriverStats:
+    """
+    Statistics collector of the HaLow radio of the configuration (halow_interface
+    and halow_firmware), shared by all monitors of the process.
+    """
+    interface = rconfig.halow_interface
+    stats = _halow_stats.get(interface)
+    if stats is None:
+        stats = _halow_stats.setdefault(interface, MorseStats(interface, rconfig.halow_firmware,
+                                                              rconfig.halow_stats_interval))
+    return stats
+
+
+def get_driver_stats(interface: str, driver: str, rconfig) -> DriverStats:
+    """
+    Statistics collector for the driver of an interface.
+
+    :param interface: Name of the interface.
+    :param driver: Driver bound to the interface, see get_interface_driver().
+    :param rconfig: Runtime configuration.
+    :return: The collector, None if the driver has no specific statistics.
+    """
+    if interface == rconfig.halow_interface:
+        return get_halow_stats(rconfig)
+    if driver is not None and driver.startswith("morse"):
+        return MorseStats(interface, rconfig.halow_firmware, rconfig.halow_stats_interval)
+    return None
@@ -0,0 +1,150 @@
+import ctypes
+import fcntl
+import socket
+import struct
+import threading
+import time
+from array import array
+
+from logging_config import logger
+
+# Reference : include/uapi/linux/ethtool.h, include/uapi/linux/sockios.h
+SIOCETHTOOL = 0x8946
+ETHTOOL_GSTRINGS = 0x1b
+ETHTOOL_GSTATS = 0x1d
+ETHTOOL_GSSET_INFO = 0x37
+ETH_SS_STATS = 1
+ETH_GSTRING_LEN = 32
+IFNAMSIZ = 16
+
+IFREQ = struct.Struct("16sP")
+IFREQ_SIZE = 40
+SSET_INFO = struct.Struct("=IIQI")
+GSTRINGS_HEADER = struct.Struct("=III")
+GSTATS_HEADER = struct.Struct("=II")
+
+# The kernel writes as many counters as the driver reports, whatever the request
+# says, so the buffers leave room for drivers which add counters at runtime
+STATS_HEADROOM = 64
+
+
+class EthtoolSnapshot:
+    '''
+    Values of all ethtool statistics of an interface read at one instant.
+
+    Attributes:
+    time : Monotonic time of the read.
+    values : array('Q') of the counter values, in the order of the driver string table.
+    index : Dict of {statistic name: position in values}, shared by the snapshots of an interface.
+    '''
+    __slots__ = ("time", "values", "index")
+
+    def __init__(self, timestamp: float, values: array, index: dict):
+        self.time = timestamp
+        self.values = values
+        self.index = index
+
+    def __getitem__(self, name: str) -> int:
+        return self.values[self.index[name]]
+
+    def get(self, name: str, default=None):
+        position = self.index.get(name)
+        return self.values[position] if position is not None else default
+
+    def delta(self, previous: "EthtoolSnapshot", name: str):
+        """
+        Increase of a counter since a previous snapshot.
+
+        :return: The difference, None if the counter is unknown or the driver string table changed in between.
+        """
+        if previous.index is not self.index:
+            return None
+        position = self.index.get(name)
+        if position is None:
+            return None
+        return self.values[position] - previous.values[position]
+
+    def as_dict(self) -> dict:
+        return {name: self.values[position] for name, position in self.index.items()}
+
+
+class EthtoolStats:
+    '''
+    Read the ethtool statistics (`ethtool -S`) of an interface through the SIOCETHTOOL ioctl.
+
+    The driver string table is fetched once and cached, every snapshot() then reads
+    all counters with a single ioctl. The table is fetched again if the number of
+    counters reported by the driver changes.
+    '''
+    def __init__(self, interface: str):
+        self.interface = interface
+        self.ifname = interface.encode()[:IFNAMSIZ - 1]
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.lock = threading.Lock()
+        self.index: dict = None
+        self.count = 0
+        self.buffer = None
+
+    def names(self) -> tuple:
+        """
+        Names of the statistics in the driver string table.
+        """
+        with self.lock:
+            if self.index is None:
+                self._load_strings()
+            return tuple(self.index)
+
+    def snapshot(self) -> EthtoolSnapshot:
+        """
+        Read all counters.
+
+        :return: The snapshot of the counters.
+        :raises OSError: If the interface does not exist or its driver has no ethtool statistics.
+        """
+        with self.lock:
+            for _ in range(2):
+                if self.index is None:
+                    self._load_strings()
+                GSTATS_HEADER.pack_into(self.buffer, 0, ETHTOOL_GSTATS, self.count)
+                self._ioctl(self.buffer)
+                _, count = GSTATS_HEADER.unpack_from(self.buffer, 0)
+                if count == self.count:
+                    values = array("Q")
+                    values.frombytes(memoryview(self.buffer).cast("B")[GSTATS_HEADER.size:GSTATS_HEADER.size + 8 * count])
+                    return EthtoolSnapshot(time.monotonic(), values, self.index)
+                logger.info(f"Number of ethtool statistics of {self.interface} changed from {self.count} to {count}")
+                self.index = None
+            raise OSError(f"ethtool statistics of {self.interface} keep changing")
+
+    def close(self) -> None:
+        self.sock.close()
+
+    def _ioctl(self, buffer) -> None:
+        ifreq = bytearray(IFREQ_SIZE)
+        IFREQ.pack_into(ifreq, 0, self.ifname, ctypes.addressof(buffer))
+        fcntl.ioctl(self.sock.fileno(), SIOCETHTOOL, ifreq)
+
+    def _load_strings(self) -> None:
+        info = ctypes.create_string_buffer(SSET_INFO.size)
+        SSET_INFO.pack_into(info, 0, ETHTOOL_GSSET_INFO, 0, 1 << ETH_SS_STATS, 0)
+        self._ioctl(info)
+        _, _, mask, count = SSET_INFO.unpack_from(info, 0)
+        if not mask & (1 << ETH_SS_STATS):
+            raise OSError(f"Interface {self.interface} has no ethtool statistics")
+
+        capacity = count + STATS_HEADROOM
+        strings = ctypes.create_string_buffer(GSTRINGS_HEADER.size + capacity * ETH_GSTRING_LEN)
+        GSTRINGS_HEADER.pack_into(strings, 0, ETHTOOL_GSTRINGS, ETH_SS_STATS, count)
+        self._ioctl(strings)
+        _, _, count = GSTRINGS_HEADER.unpack_from(strings, 0)
+        raw = strings.raw
+        index = {}
+        for position in range(count):
+            start = GSTRINGS_HEADER.size + position * ETH_GSTRING_LEN
+            name = raw[start:start + ETH_GSTRING_LEN].split(b"\0", 1)[0].decode(errors="replace").strip()
+            index.setdefault(name, position)
+
+        self.index = index
+        self.count = count
+        self.buffer = ctypes.create_string_buffer(GSTATS_HEADER.size + (count + STATS_HEADROOM) * 8)
+        logger.info(f"Loaded {count} ethtool statistics names of {self.interface}")
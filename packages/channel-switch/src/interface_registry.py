@@ -0,0 +1,185 @@
+import errno
+import socket
+import threading
+import time
+
+from logging_config import logger
+from nl80211 import get_nl80211, parse_messages, parse_attrs, attr_str
+from rmacs_util import get_interface_operstate, get_phy_interface, get_interface_driver, get_mac_address, get_channel_bw
+
+# Reference : include/uapi/linux/rtnetlink.h, include/uapi/linux/if_link.h
+NETLINK_ROUTE = 0
+RTMGRP_LINK = 0x1
+RTM_NEWLINK = 16
+RTM_DELLINK = 17
+IFINFOMSG_SIZE = 16
+IFLA_IFNAME = 3
+
+# Seconds a property is cached, link events invalidate all properties of an interface earlier
+DEFAULT_TTLS = {
+    "operstate": 2.0,
+    "mac": 300.0,
+    "phy": 300.0,
+    "driver": 300.0,
+    "channel": 5.0,
+}
+
+
+class InterfaceState:
+    '''
+    Snapshot of the properties of a network interface.
+
+    Attributes:
+    name : Name of the interface.
+    is_up : True if the operational state is up, None if the interface does not exist.
+    mac : MAC address.
+    phy : Name of the wiphy (e.g. phy0), None for non-wireless interfaces.
+    freq : Operating frequency in MHz, None if unknown.
+    channel_bw : Channel width in MHz, None if the interface is down or unknown.
+    '''
+    __slots__ = ("name", "is_up", "mac", "phy", "freq", "channel_bw")
+
+    def __init__(self, name: str, is_up, mac, phy, freq, channel_bw):
+        self.name = name
+        self.is_up = is_up
+        self.mac = mac
+        self.phy = phy
+        self.freq = freq
+        self.channel_bw = channel_bw
+
+    def __repr__(self):
+        return (f"InterfaceState(name={self.name!r}, is_up={self.is_up}, mac={self.mac!r}, phy={self.phy!r}, "
+                f"freq={self.freq}, channel_bw={self.channel_bw})")
+
+
+class InterfaceRegistry:
+    '''
+    Shared, time-limited cache of network interface properties.
+
+    Each property is loaded on first use and cached for its ttl. An rtnetlink
+    listener (RTMGRP_LINK) drops the cached properties of an interface as soon as
+    the kernel reports a change of the link, so the ttls only bound the staleness
+    of changes without link events, e.g. the channel width.
+    '''
+    def __init__(self, ttls: dict = None):
+        self.ttls = dict(DEFAULT_TTLS, **(ttls or {}))
+        self.cache: dict = {}
+        self.lock = threading.Lock()
+        self.link_events = 0
+        self.listener: threading.Thread = None
+        self.sock = None
+
+    def start_listener(self) -> bool:
+        """
+        Start invalidating on rtnetlink link events.
+
+        :return: True if the listener is running.
+        """
+        with self.lock:
+            if self.listener is not None:
+                return True
+            try:
+                self.sock = socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, NETLINK_ROUTE)
+                self.sock.bind((0, RTMGRP_LINK))
+            except OSError as e:
+                logger.warning(f"Link events are not available, interface properties expire by ttl only: {e}")
+                self.sock = None
+                return False
+            self.listener = threading.Thread(target=self._listen, name="rmacs-link-events", daemon=True)
+            self.listener.start()
+            return True
+
+    def get(self, interface: str) -> InterfaceState:
+        """
+        Snapshot of all properties of the interface.
+        """
+        is_up = self.is_up(interface)
+        freq, channel_bw = self._channel(interface) if is_up else (None, None)
+        return InterfaceState(interface, is_up, self.mac(interface), self.phy(interface), freq, channel_bw)
+
+    def is_up(self, interface: str) -> bool:
+        return self._cached(interface, "operstate", get_interface_operstate)
+
+    def mac(self, interface: str) -> str:
+        return self._cached(interface, "mac", get_mac_address)
+
+    def phy(self, interface: str) -> str:
+        return self._cached(interface, "phy", get_phy_interface)
+
+    def driver(self, interface: str) -> str:
+        return self._cached(interface, "driver", get_interface_driver)
+
+    def channel_bw(self, interface: str) -> int:
+        return self._channel(interface)[1]
+
+    def invalidate(self, interface: str = None) -> None:
+        """
+        Drop the cached properties of an interface, or of all interfaces.
+        """
+        with self.lock:
+            if interface is None:
+                self.cache.clear()
+            else:
+                self.cache.pop(interface, None)
+
+    def _channel(self, interface: str) -> tuple:
+        return self._cached(interface, "channel", self._load_channel)
+
+    @staticmethod
+    def _load_channel(interface: str) -> tuple:
+        nl80211 = get_nl80211()
+        if nl80211 is None:
+            return None, get_channel_bw(interface)
+        try:
+            info = nl80211.get_interface(interface)
+        except OSError as e:
+            logger.error(f"Get channel of {interface} failed: {e}")
+            return None, None
+        return info.freq, info.width
+
+    def _cached(self, interface: str, prop: str, loader):
+        now = time.monotonic()
+        with self.lock:
+            entry = self.cache.get(interface, {}).get(prop)
+            if entry is not None and entry[1] > now:
+                return entry[0]
+        value = loader(interface)
+        with self.lock:
+            self.cache.setdefault(interface, {})[prop] = (value, now + self.ttls[prop])
+        return value
+
+    def _listen(self) -> None:
+        while True:
+            try:
+                data = self.sock.recv(65536)
+            except OSError as e:
+                if e.errno == errno.ENOBUFS:
+                    # Events were dropped, every cached property may be stale
+                    self.invalidate()
+                    continue
+                logger.error(f"Link event listener stopped: {e}")
+                return
+            for msg_type, _, payload, end in parse_messages(data):
+                if msg_type not in (RTM_NEWLINK, RTM_DELLINK):
+                    continue
+                name = attr_str(parse_attrs(data, payload + IFINFOMSG_SIZE, end), IFLA_IFNAME)
+                self.link_events += 1
+                self.invalidate(name)
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_registry() -> InterfaceRegistry:
+    """
+    Interface registry shared by all modules of the process, listening to link events.
+    """
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                registry = InterfaceRegistry()
+                registry.start_listener()
+                _registry = registry
+    return _registry
@@ -0,0 +1,232 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from logging_config import logger
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class Metric:
+    '''
+    One metric family in the Prometheus text exposition format.
+
+    The "name{labels} " prefix of every series is formatted once, when the label
+    set is first used, so updates are a dict lookup and a scrape only formats
+    the values.
+
+    Attributes:
+    name : Name of the metric.
+    kind : counter, gauge or summary.
+    labels : Names of the labels.
+    '''
+    def __init__(self, name: str, help_text: str, kind: str, labels: tuple = ()):
+        self.name = name
+        self.kind = kind
+        self.labels = tuple(labels)
+        self.header = f"# HELP {name} {help_text}\n# TYPE {name} {kind}\n"
+        self.values: dict = {}
+        self.prefixes: dict = {}
+        self.lock = threading.Lock()
+
+    def inc(self, *label_values, amount: float = 1) -> None:
+        with self.lock:
+            self._prefix(label_values)
+            self.values[label_values] = self.values.get(label_values, 0) + amount
+
+    def set(self, value, *label_values) -> None:
+        with self.lock:
+            self._prefix(label_values)
+            self.values[label_values] = value
+
+    def observe(self, value: float, *label_values) -> None:
+        """
+        Add an observation to a summary, exported as its _sum and _count.
+        """
+        with self.lock:
+            self._prefix(label_values)
+            total, count = self.values.get(label_values, (0.0, 0))
+            self.values[label_values] = (total + value, count + 1)
+
+    def clear(self) -> None:
+        with self.lock:
+            self.values.clear()
+
+    def render(self, out: list) -> None:
+        with self.lock:
+            out.append(self.header)
+            for label_values, value in self.values.items():
+                prefixes = self.prefixes[label_values]
+                if self.kind == "summary":
+                    out.append(f"{prefixes[1]}{value[0]}\n{prefixes[2]}{value[1]}\n")
+                elif value is not None:
+                    out.append(f"{prefixes[0]}{value}\n")
+
+    def _prefix(self, label_values: tuple) -> None:
+        if label_values in self.prefixes:
+            return
+        if len(label_values) != len(self.labels):
+            raise ValueError(f"{self.name} has labels {self.labels}, got {label_values}")
+        labels = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(self.labels, label_values))
+        labels = f"{{{labels}}}" if labels else ""
+        self.prefixes[label_values] = (f"{self.name}{labels} ", f"{self.name}_sum{labels} ", f"{self.name}_count{labels} ")
+
+
+class RmacsMetrics:
+    '''
+    Metrics of one RMACS component (server or client).
+
+    Event counters are updated where the events happen; values which are state
+    of other objects (traffic samples, channel quality, message counters) are
+    read by collectors, callables run on every scrape.
+
+    Attributes:
+    role : server or client, exported as the role label.
+    '''
+    def __init__(self, role: str):
+        self.role = role
+        self.collectors: list = []
+        self.metrics: list = []
+        # Traffic of the last sample window
+        self.tx_rate = self._add("rmacs_tx_rate_kbps", "Transmit rate over the last sample window", "gauge", ("interface", "driver"))
+        self.phy_errors = self._add("rmacs_phy_errors", "PHY receive errors in the last sample window", "gauge", ("interface", "driver"))
+        self.tx_timeouts = self._add("rmacs_tx_timeouts", "Transmit timeouts in the last sample window", "gauge", ("interface", "driver"))
+        self.air_time = self._add("rmacs_air_time_percent", "Busy time of the operating channel in the last sample window", "gauge", ("interface", "driver"))
+        self.beacons_late = self._add("rmacs_beacons_late", "HaLow beacons sent late per sample window, measured by the last error check", "gauge", ("interface", "driver"))
+        # Channel quality
+        self.average_quality = self._add("rmacs_average_quality", "Average channel quality reported for the frequency", "gauge", ("frequency",))
+        self.channel_quality_index = self._add("rmacs_channel_quality_index", "Channel quality index of the last scan", "gauge", ("frequency",))
+        # FSM
+        self.fsm_state = self._add("rmacs_fsm_state", "1 for the current state of the FSM", "gauge", ("role", "state"))
+        self.fsm_transitions = self._add("rmacs_fsm_transitions_total", "FSM state transitions", "counter", ("role", "from_state", "to_state"))
+        # Scans and switches
+        self.scan_duration = self._add("rmacs_scan_duration_seconds", "Duration of spectral scans", "summary", ("role",))
+        self.csa = self._add("rmacs_channel_switch_total", "Channel switch announcements by result", "counter", ("role", "result"))
+        # Messages
+        self.messages_sent = self._add("rmacs_messages_sent_total", "Messages sent", "counter", ("role", "interface", "result"))
+        self.messages_received = self._add("rmacs_messages_received_total", "Datagrams received", "counter", ("role",))
+        self.messages_dropped = self._add("rmacs_messages_dropped_total", "Datagrams dropped by the transport", "counter", ("role", "reason"))
+        self.messages_duplicate = self._add("rmacs_messages_duplicate_total", "Duplicate messages ignored", "counter", ("role",))
+        self.messages_processed = self._add("rmacs_messages_processed_total", "New messages processed", "counter", ("role",))
+
+    def _add(self, name: str, help_text: str, kind: str, labels: tuple) -> Metric:
+        metric = Metric(name, help_text, kind, labels)
+        self.metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector) -> None:
+        """
+        Run a callable on every scrape, to copy current values into the metrics.
+        """
+        self.collectors.append(collector)
+
+    def transition(self, from_state, to_state) -> None:
+        self.fsm_transitions.inc(self.role, from_state.name, to_state.name)
+
+    def current_state(self, current, states) -> None:
+        """
+        Export 1 for the current FSM state and 0 for all other states.
+        """
+        for state in states:
+            self.fsm_state.set(int(state is current), self.role, state.name)
+
+    def channel_switch(self, error) -> None:
+        """
+        Count a channel switch announcement by its result, see channel_switch_announcement().
+        """
+        self.csa.inc(self.role, "success" if error is None else error)
+
+    def sent(self, results: dict) -> None:
+        """
+        Count the per interface results of a send_fanout().
+        """
+        for interface, error in results.items():
+            self.messages_sent.inc(self.role, interface, "success" if error is None else "error")
+
+    def traffic_samples(self, samples) -> None:
+        for sample in samples:
+            if sample is None:
+                continue
+            labels = (sample.interface, sample.driver or "unknown")
+            self.tx_rate.set(round(sample.traffic, 3), *labels)
+            self.phy_errors.set(sample.phy_error, *labels)
+            self.tx_timeouts.set(sample.tx_timeout, *labels)
+            self.air_time.set(round(sample.air_time, 3) if sample.air_time is not None else None, *labels)
+            if sample.beacons_late is not None:
+                self.beacons_late.set(sample.beacons_late, *labels)
+
+    def transport(self, transport, processed_ids) -> None:
+        """
+        Copy the counters of the multicast transport and the dedup cache.
+        """
+        stats = transport.stats()
+        self.messages_received.set(stats["received"], self.role)
+        self.messages_dropped.set(stats["truncated"], self.role, "truncated")
+        self.messages_dropped.set(stats["malformed"], self.role, "malformed")
+        self.messages_duplicate.set(processed_ids.hits, self.role)
+        self.messages_processed.set(processed_ids.misses, self.role)
+
+    def render(self) -> bytes:
+        for collector in self.collectors:
+            try:
+                collector()
+            except Exception as e:
+                logger.warning(f"Metrics collector failed: {e}")
+        out = []
+        for metric in self.metrics:
+            metric.render(out)
+        return "".join(out).encode()
+
+
+class MetricsExporter(threading.Thread):
+    '''
+    Serve RmacsMetrics on http://<address>:<port>/metrics for Prometheus.
+    '''
+    def __init__(self, metrics: RmacsMetrics, address: str, port: int):
+        super().__init__(name=f"rmacs-metrics-{metrics.role}", daemon=True)
+        self.metrics = metrics
+        self.address = address
+        self.port = port
+        self.httpd: ThreadingHTTPServer = None
+
+    def start(self) -> None:
+        try:
+            self.httpd = ThreadingHTTPServer((self.address, self.port), self._handler())
+        except OSError as e:
+            logger.error(f"Metrics endpoint on {self.address}:{self.port} is not available: {e}")
+            return
+        self.httpd.daemon_threads = True
+        logger.info(f"Serving metrics on http://{self.address}:{self.port}/metrics")
+        super().start()
+
+    def run(self) -> None:
+        self.httpd.serve_forever(poll_interval=1.0)
+
+    def stop(self) -> None:
+        if self.httpd is not None and self.is_alive():
+            self.httpd.shutdown()
+            self.httpd.server_close()
+
+    def _handler(self):
+        metrics = self.metrics
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?", 1)[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = metrics.render()
+                self.send_response(200)
+                self.send_header("Content-Type", CONTENT_TYPE)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                # Scrapes are not worth a line in the RMACS log
+                pass
+
+        return Handler
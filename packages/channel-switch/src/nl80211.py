@@ -0,0 +1,565 @@
+"""
+Minimal generic netlink client for nl80211.
+
+Talks to the kernel over one persistent AF_NETLINK socket instead of forking
+`iw` and parsing its text output. Only the commands and attributes used by
+RMACS are implemented; see include/uapi/linux/nl80211.h for their definitions.
+"""
+
+import errno
+import os
+import socket
+import struct
+import threading
+
+from logging_config import logger
+
+
+NETLINK_GENERIC = 16
+SOL_NETLINK = 270
+NETLINK_ADD_MEMBERSHIP = 1
+
+# Netlink message types and flags
+NLMSG_ERROR = 2
+NLMSG_DONE = 3
+NLM_F_REQUEST = 0x1
+NLM_F_MULTI = 0x2
+NLM_F_ACK = 0x4
+NLM_F_DUMP = 0x300
+NLA_F_NESTED = 0x8000
+NLA_TYPE_MASK = 0x3fff
+
+# Generic netlink controller
+GENL_ID_CTRL = 0x10
+CTRL_CMD_GETFAMILY = 3
+CTRL_ATTR_FAMILY_ID = 1
+CTRL_ATTR_FAMILY_NAME = 2
+CTRL_ATTR_MCAST_GROUPS = 7
+CTRL_ATTR_MCAST_GRP_NAME = 1
+CTRL_ATTR_MCAST_GRP_ID = 2
+
+# nl80211 commands
+NL80211_CMD_GET_WIPHY = 1
+NL80211_CMD_GET_INTERFACE = 5
+NL80211_CMD_SET_INTERFACE = 6
+NL80211_CMD_NEW_INTERFACE = 7
+NL80211_CMD_DEL_INTERFACE = 8
+NL80211_CMD_GET_SURVEY = 50
+NL80211_CMD_CH_SWITCH_NOTIFY = 88
+NL80211_CMD_CHANNEL_SWITCH = 102
+NL80211_CMD_CH_SWITCH_STARTED_NOTIFY = 110
+
+# nl80211 attributes
+NL80211_ATTR_WIPHY = 1
+NL80211_ATTR_IFINDEX = 3
+NL80211_ATTR_IFNAME = 4
+NL80211_ATTR_IFTYPE = 5
+NL80211_ATTR_MAC = 6
+NL80211_ATTR_WIPHY_BANDS = 22
+NL80211_ATTR_WIPHY_FREQ = 38
+NL80211_ATTR_SURVEY_INFO = 84
+NL80211_ATTR_CHANNEL_WIDTH = 159
+NL80211_ATTR_CENTER_FREQ1 = 160
+NL80211_ATTR_CENTER_FREQ2 = 161
+NL80211_ATTR_SPLIT_WIPHY_DUMP = 174
+NL80211_ATTR_CH_SWITCH_COUNT = 183
+NL80211_ATTR_CH_SWITCH_BLOCK_TX = 184
+
+# Nested band and frequency attributes of NL80211_ATTR_WIPHY_BANDS
+NL80211_BAND_ATTR_FREQS = 1
+NL80211_FREQUENCY_ATTR_FREQ = 1
+NL80211_FREQUENCY_ATTR_DISABLED = 2
+NL80211_FREQUENCY_ATTR_NO_IR = 3
+NL80211_FREQUENCY_ATTR_RADAR = 5
+
+# Nested attributes of NL80211_ATTR_SURVEY_INFO, times are in ms
+NL80211_SURVEY_INFO_FREQUENCY = 1
+NL80211_SURVEY_INFO_NOISE = 2
+NL80211_SURVEY_INFO_IN_USE = 3
+NL80211_SURVEY_INFO_TIME = 4
+NL80211_SURVEY_INFO_TIME_BUSY = 5
+NL80211_SURVEY_INFO_TIME_EXT_BUSY = 6
+NL80211_SURVEY_INFO_TIME_RX = 7
+NL80211_SURVEY_INFO_TIME_TX = 8
+
+NL80211_IFTYPE_MESH_POINT = 7
+
+# enum nl80211_chan_width to MHz
+CHANNEL_WIDTH_MHZ = {0: 20, 1: 20, 2: 40, 3: 80, 4: 80, 5: 160, 6: 5, 7: 10,
+                     8: 1, 9: 2, 10: 4, 11: 8, 12: 16, 13: 320}
+# MHz to enum nl80211_chan_width of the channel widths RMACS can switch to
+CHANNEL_WIDTH_ID = {5: 6, 10: 7, 20: 1, 40: 2, 80: 3, 160: 5}
+
+# Channel switch failure reasons
+CSA_BUSY = "busy"
+CSA_DFS = "dfs"
+CSA_INVALID_CHANDEF = "invalid_chandef"
+CSA_NOT_SUPPORTED = "not_supported"
+CSA_FAILED = "failed"
+CSA_ERRNO_REASONS = {errno.EBUSY: CSA_BUSY, errno.EINVAL: CSA_INVALID_CHANDEF,
+                     errno.EOPNOTSUPP: CSA_NOT_SUPPORTED}
+
+NLMSGHDR = struct.Struct("=IHHII")
+GENLMSGHDR = struct.Struct("=BBH")
+NLATTR = struct.Struct("=HH")
+U16 = struct.Struct("=H")
+U32 = struct.Struct("=I")
+U64 = struct.Struct("=Q")
+ERRNO = struct.Struct("=i")
+
+RECV_BUFFER_SIZE = 65536
+
+
+class NetlinkError(OSError):
+    '''
+    Error reported by the kernel in reply to a netlink request.
+    '''
+
+
+class ChannelSwitchError(NetlinkError):
+    '''
+    Channel switch rejected by the pre-checks or by the kernel.
+
+    Attributes:
+    reason : One of CSA_BUSY, CSA_DFS, CSA_INVALID_CHANDEF, CSA_NOT_SUPPORTED, CSA_FAILED.
+    '''
+    def __init__(self, reason: str, error: int, message: str):
+        super().__init__(error, message)
+        self.reason = reason
+
+
+def _align(length: int) -> int:
+    return (length + 3) & ~3
+
+
+def pack_attr(attr_type: int, payload: bytes) -> bytes:
+    """
+    Encode a netlink attribute, padded to a 4 byte boundary.
+    """
+    length = NLATTR.size + len(payload)
+    return NLATTR.pack(length, attr_type) + payload + bytes(_align(length) - length)
+
+
+def pack_u32(attr_type: int, value: int) -> bytes:
+    return pack_attr(attr_type, U32.pack(value))
+
+
+def pack_str(attr_type: int, value: str) -> bytes:
+    return pack_attr(attr_type, value.encode() + b"\0")
+
+
+def parse_attrs(data, offset: int = 0, end: int = None) -> dict:
+    """
+    Decode a sequence of netlink attributes.
+
+    :return: Dict of {attribute type: payload bytes}, the nested flag is masked out.
+    """
+    end = len(data) if end is None else end
+    attrs = {}
+    while offset + NLATTR.size <= end:
+        length, attr_type = NLATTR.unpack_from(data, offset)
+        if length < NLATTR.size:
+            break
+        attrs[attr_type & NLA_TYPE_MASK] = bytes(data[offset + NLATTR.size:offset + length])
+        offset += _align(length)
+    return attrs
+
+
+def parse_messages(data):
+    """
+    Split a netlink datagram into its messages.
+
+    :return: Generator of (msg_type, seq, payload offset, message end) tuples.
+    """
+    offset = 0
+    while offset + NLMSGHDR.size <= len(data):
+        length, msg_type, _, seq, _ = NLMSGHDR.unpack_from(data, offset)
+        if length < NLMSGHDR.size:
+            return
+        yield msg_type, seq, offset + NLMSGHDR.size, offset + length
+        offset += _align(length)
+
+
+def attr_u32(attrs: dict, attr_type: int, default=None):
+    value = attrs.get(attr_type)
+    return U32.unpack_from(value)[0] if value is not None and len(value) >= 4 else default
+
+
+def attr_u64(attrs: dict, attr_type: int, default=None):
+    value = attrs.get(attr_type)
+    return U64.unpack_from(value)[0] if value is not None and len(value) >= 8 else default
+
+
+def attr_str(attrs: dict, attr_type: int, default=None):
+    value = attrs.get(attr_type)
+    return value.rstrip(b"\0").decode(errors="replace") if value is not None else default
+
+
+class GenericNetlink:
+    '''
+    Request/response client of one generic netlink family over a persistent socket.
+
+    Requests are serialized with a lock, so the client can be shared by threads.
+
+    Attributes:
+    family_id : Numeric id of the family, resolved when the client is created.
+    mcast_groups : Dict of {multicast group name: group id} of the family.
+    '''
+    def __init__(self, family: str, timeout: float = 2.0):
+        self.family = family
+        self.sock = socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, NETLINK_GENERIC)
+        self.sock.settimeout(timeout)
+        self.sock.bind((0, 0))
+        self.seq = 0
+        self.lock = threading.Lock()
+        try:
+            self.family_id, self.mcast_groups = self._resolve_family(family)
+        except OSError:
+            self.sock.close()
+            raise
+
+    def request(self, msg_type: int, cmd: int, attrs: bytes = b"", dump: bool = False, version: int = 1) -> list:
+        """
+        Send a request and collect the replies.
+
+        :param msg_type: Netlink message type, i.e. the family id.
+        :param cmd: Generic netlink command.
+        :param attrs: Encoded request attributes.
+        :param dump: Request all objects (NLM_F_DUMP).
+        :return: List of (cmd, attrs) tuples of the replies.
+        :raises NetlinkError: If the kernel rejected the request.
+        """
+        flags = NLM_F_REQUEST | NLM_F_ACK | (NLM_F_DUMP if dump else 0)
+        with self.lock:
+            self.seq = (self.seq + 1) & 0xffffffff
+            seq = self.seq
+            body = GENLMSGHDR.pack(cmd, version, 0) + attrs
+            self.sock.send(NLMSGHDR.pack(NLMSGHDR.size + len(body), msg_type, flags, seq, 0) + body)
+            return self._receive(seq)
+
+    def close(self) -> None:
+        self.sock.close()
+
+    def _receive(self, seq: int) -> list:
+        replies = []
+        while True:
+            data = self.sock.recv(RECV_BUFFER_SIZE)
+            for msg_type, msg_seq, payload, end in parse_messages(data):
+                if msg_seq != seq:
+                    # Reply of an earlier, timed out request
+                    continue
+                if msg_type == NLMSG_DONE:
+                    return replies
+                if msg_type == NLMSG_ERROR:
+                    error = -ERRNO.unpack_from(data, payload)[0]
+                    if error:
+                        raise NetlinkError(error, os.strerror(error))
+                    return replies
+                cmd = data[payload]
+                replies.append((cmd, parse_attrs(data, payload + GENLMSGHDR.size, end)))
+
+    def _resolve_family(self, family: str):
+        replies = self.request(GENL_ID_CTRL, CTRL_CMD_GETFAMILY, pack_str(CTRL_ATTR_FAMILY_NAME, family))
+        if not replies:
+            raise NetlinkError(2, f"Generic netlink family {family} not found")
+        attrs = replies[0][1]
+        groups = {}
+        nested = attrs.get(CTRL_ATTR_MCAST_GROUPS, b"")
+        for group in parse_attrs(nested).values():
+            group = parse_attrs(group)
+            name = attr_str(group, CTRL_ATTR_MCAST_GRP_NAME)
+            if name is not None:
+                groups[name] = attr_u32(group, CTRL_ATTR_MCAST_GRP_ID)
+        return U16.unpack_from(attrs[CTRL_ATTR_FAMILY_ID])[0], groups
+
+
+def center_frequency(freq: int, width: int) -> int:
+    """
+    Center frequency of the channel of the given width containing freq.
+
+    40 MHz channels in the 2.4 GHz band extend upwards up to channel 7 and
+    downwards above it (HT40+ / HT40-), 5 and 6 GHz channels are bonded in the
+    fixed blocks of the band plan.
+
+    :raises ChannelSwitchError: If the width is not available in the band of freq.
+    """
+    if width <= 20:
+        return freq
+    if 2400 < freq < 2500:
+        if width != 40:
+            raise ChannelSwitchError(CSA_INVALID_CHANDEF, errno.EINVAL, f"{width} MHz channels are not available at {freq} MHz")
+        return freq + 10 if freq <= 2447 else freq - 10
+    if 5000 < freq < 5735:
+        base = 5170
+    elif 5735 <= freq < 5900:
+        base = 5735
+    elif freq >= 5945:
+        base = 5945
+    else:
+        raise ChannelSwitchError(CSA_INVALID_CHANDEF, errno.EINVAL, f"{width} MHz channels are not available at {freq} MHz")
+    return base + (freq - base) // width * width + width // 2
+
+
+def channel_flags(attrs: dict) -> dict:
+    """
+    Collect the channel flags of the NL80211_ATTR_WIPHY_BANDS attribute of a wiphy.
+
+    :return: Dict of {frequency: set of flags}, flags are "disabled", "no_ir" and "radar".
+    """
+    channels = {}
+    for band in parse_attrs(attrs.get(NL80211_ATTR_WIPHY_BANDS, b"")).values():
+        freqs = parse_attrs(band).get(NL80211_BAND_ATTR_FREQS, b"")
+        for freq in parse_attrs(freqs).values():
+            freq = parse_attrs(freq)
+            mhz = attr_u32(freq, NL80211_FREQUENCY_ATTR_FREQ)
+            if mhz is None:
+                continue
+            flags = set()
+            if NL80211_FREQUENCY_ATTR_DISABLED in freq:
+                flags.add("disabled")
+            if NL80211_FREQUENCY_ATTR_NO_IR in freq:
+                flags.add("no_ir")
+            if NL80211_FREQUENCY_ATTR_RADAR in freq:
+                flags.add("radar")
+            channels[mhz] = flags
+    return channels
+
+
+class InterfaceInfo:
+    '''
+    State of a wireless interface as reported by NL80211_CMD_GET_INTERFACE.
+
+    Frequencies are in MHz, width is the channel width in MHz. Values the driver
+    does not report (e.g. the channel of an interface which is not operating) are None.
+    '''
+    __slots__ = ("ifindex", "ifname", "iftype", "mac", "wiphy", "freq", "width", "center_freq1", "center_freq2")
+
+    def __init__(self, attrs: dict):
+        self.ifindex = attr_u32(attrs, NL80211_ATTR_IFINDEX)
+        self.ifname = attr_str(attrs, NL80211_ATTR_IFNAME)
+        self.iftype = attr_u32(attrs, NL80211_ATTR_IFTYPE)
+        mac = attrs.get(NL80211_ATTR_MAC)
+        self.mac = mac.hex(":") if mac else None
+        self.wiphy = attr_u32(attrs, NL80211_ATTR_WIPHY)
+        self.freq = attr_u32(attrs, NL80211_ATTR_WIPHY_FREQ)
+        width = attr_u32(attrs, NL80211_ATTR_CHANNEL_WIDTH)
+        self.width = CHANNEL_WIDTH_MHZ.get(width) if width is not None else None
+        self.center_freq1 = attr_u32(attrs, NL80211_ATTR_CENTER_FREQ1)
+        self.center_freq2 = attr_u32(attrs, NL80211_ATTR_CENTER_FREQ2)
+
+    @property
+    def is_mesh(self) -> bool:
+        return self.iftype == NL80211_IFTYPE_MESH_POINT
+
+    def __repr__(self):
+        return (f"InterfaceInfo(ifname={self.ifname!r}, iftype={self.iftype}, freq={self.freq}, "
+                f"width={self.width}, center_freq1={self.center_freq1}, center_freq2={self.center_freq2})")
+
+
+class SurveyInfo:
+    '''
+    Channel survey of one frequency as reported by NL80211_CMD_GET_SURVEY.
+
+    The times are cumulative counters in ms, None if the driver does not report them.
+    '''
+    __slots__ = ("freq", "noise", "in_use", "time", "busy", "ext_busy", "rx", "tx")
+
+    def __init__(self, attrs: dict):
+        self.freq = attr_u32(attrs, NL80211_SURVEY_INFO_FREQUENCY)
+        noise = attrs.get(NL80211_SURVEY_INFO_NOISE)
+        self.noise = struct.unpack_from("=b", noise)[0] if noise else None
+        self.in_use = NL80211_SURVEY_INFO_IN_USE in attrs
+        self.time = attr_u64(attrs, NL80211_SURVEY_INFO_TIME)
+        self.busy = attr_u64(attrs, NL80211_SURVEY_INFO_TIME_BUSY)
+        self.ext_busy = attr_u64(attrs, NL80211_SURVEY_INFO_TIME_EXT_BUSY)
+        self.rx = attr_u64(attrs, NL80211_SURVEY_INFO_TIME_RX)
+        self.tx = attr_u64(attrs, NL80211_SURVEY_INFO_TIME_TX)
+
+    def __repr__(self):
+        return (f"SurveyInfo(freq={self.freq}, in_use={self.in_use}, noise={self.noise}, time={self.time}, "
+                f"busy={self.busy}, rx={self.rx}, tx={self.tx})")
+
+
+class NL80211(GenericNetlink):
+    '''
+    nl80211 client.
+
+    Attributes:
+    channels : Dict of {wiphy: channel flags}, the cache of get_channels().
+    '''
+    def __init__(self, timeout: float = 2.0):
+        super().__init__("nl80211", timeout)
+        self.channels: dict = {}
+
+    def get_interface(self, interface: str) -> InterfaceInfo:
+        """
+        Query the state of one wireless interface.
+
+        :param interface: Name of the network interface.
+        :return: The interface state.
+        :raises OSError: If the interface does not exist or is not a wireless interface.
+        """
+        ifindex = socket.if_nametoindex(interface)
+        replies = self.request(self.family_id, NL80211_CMD_GET_INTERFACE, pack_u32(NL80211_ATTR_IFINDEX, ifindex))
+        if not replies:
+            raise NetlinkError(19, f"No nl80211 interface {interface}")
+        return InterfaceInfo(replies[0][1])
+
+    def get_interfaces(self) -> dict:
+        """
+        Query the state of all wireless interfaces.
+
+        :return: Dict of {interface name: InterfaceInfo}.
+        """
+        replies = self.request(self.family_id, NL80211_CMD_GET_INTERFACE, dump=True)
+        interfaces = (InterfaceInfo(attrs) for _, attrs in replies)
+        return {info.ifname: info for info in interfaces}
+
+    def get_survey(self, interface: str) -> dict:
+        """
+        Query the channel survey of every channel of the interface in one dump.
+
+        :param interface: Name of the network interface.
+        :return: Dict of {frequency: SurveyInfo}.
+        """
+        ifindex = socket.if_nametoindex(interface)
+        replies = self.request(self.family_id, NL80211_CMD_GET_SURVEY, pack_u32(NL80211_ATTR_IFINDEX, ifindex), dump=True)
+        surveys = {}
+        for _, attrs in replies:
+            nested = attrs.get(NL80211_ATTR_SURVEY_INFO)
+            if nested is None:
+                continue
+            survey = SurveyInfo(parse_attrs(nested))
+            if survey.freq is not None:
+                surveys[survey.freq] = survey
+        return surveys
+
+    def get_channels(self, wiphy: int, refresh: bool = False) -> dict:
+        """
+        Query the channels of a wiphy, cached after the first query.
+
+        :param wiphy: Index of the wiphy.
+        :param refresh: Query the kernel again, e.g. after a regulatory domain change.
+        :return: Dict of {frequency: set of flags}, see channel_flags().
+        """
+        channels = self.channels.get(wiphy)
+        if channels is None or refresh:
+            attrs = pack_u32(NL80211_ATTR_WIPHY, wiphy) + pack_attr(NL80211_ATTR_SPLIT_WIPHY_DUMP, b"")
+            channels = {}
+            for _, reply in self.request(self.family_id, NL80211_CMD_GET_WIPHY, attrs, dump=True):
+                if attr_u32(reply, NL80211_ATTR_WIPHY) == wiphy:
+                    channels.update(channel_flags(reply))
+            self.channels[wiphy] = channels
+        return channels
+
+    def channel_switch(self, interface: str, freq: int, width: int = 20, count: int = 5, block_tx: bool = False) -> None:
+        """
+        Announce a channel switch (CSA) and switch the interface after count beacons.
+
+        The channel is checked against the wiphy channel list first: the kernel
+        rejects disabled and radar channels with a bare EINVAL.
+
+        :param interface: Name of the network interface.
+        :param freq: Control channel frequency in MHz.
+        :param width: Channel width in MHz: 5, 10, 20, 40, 80 or 160.
+        :param count: Number of beacons before the switch.
+        :param block_tx: Stop transmitting until the switch.
+        :raises ChannelSwitchError: If the switch was not started, see its reason.
+        """
+        width_id = CHANNEL_WIDTH_ID.get(width)
+        if width_id is None:
+            raise ChannelSwitchError(CSA_INVALID_CHANDEF, errno.EINVAL, f"Unsupported channel width {width} MHz")
+        center = center_frequency(freq, width)
+        try:
+            info = self.get_interface(interface)
+            channels = self.get_channels(info.wiphy) if info.wiphy is not None else {}
+        except NetlinkError as e:
+            raise ChannelSwitchError(CSA_FAILED, e.errno, f"Channel switch of {interface} failed: {e.strerror}") from e
+        if channels:
+            for subchannel in range(center - width // 2 + 10, center + width // 2, 20) if width >= 40 else (freq,):
+                flags = channels.get(subchannel)
+                if flags is None or "disabled" in flags:
+                    raise ChannelSwitchError(CSA_INVALID_CHANDEF, errno.EINVAL, f"Channel {subchannel} MHz is not available on {interface}")
+                if "radar" in flags:
+                    raise ChannelSwitchError(CSA_DFS, errno.EINVAL, f"Channel {subchannel} MHz requires radar detection (DFS)")
+
+        attrs = (pack_u32(NL80211_ATTR_IFINDEX, info.ifindex)
+                 + pack_u32(NL80211_ATTR_WIPHY_FREQ, freq)
+                 + pack_u32(NL80211_ATTR_CHANNEL_WIDTH, width_id)
+                 + pack_u32(NL80211_ATTR_CENTER_FREQ1, center)
+                 + pack_u32(NL80211_ATTR_CH_SWITCH_COUNT, count))
+        if block_tx:
+            attrs += pack_attr(NL80211_ATTR_CH_SWITCH_BLOCK_TX, b"")
+        try:
+            self.request(self.family_id, NL80211_CMD_CHANNEL_SWITCH, attrs)
+        except NetlinkError as e:
+            reason = CSA_ERRNO_REASONS.get(e.errno, CSA_FAILED)
+            raise ChannelSwitchError(reason, e.errno, f"Channel switch of {interface} to {freq} MHz failed: {e.strerror}") from e
+
+
+class NL80211Events:
+    '''
+    Non-blocking socket subscribed to nl80211 multicast groups.
+
+    :param groups: Names of the nl80211 multicast groups, e.g. "mlme" for channel switch events.
+    '''
+    def __init__(self, client: NL80211, groups=("mlme",)):
+        self.family_id = client.family_id
+        self.sock = socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, NETLINK_GENERIC)
+        try:
+            self.sock.bind((0, 0))
+            for group in groups:
+                if group not in client.mcast_groups:
+                    raise NetlinkError(2, f"nl80211 multicast group {group} not found")
+                self.sock.setsockopt(SOL_NETLINK, NETLINK_ADD_MEMBERSHIP, client.mcast_groups[group])
+        except OSError:
+            self.sock.close()
+            raise
+        self.sock.setblocking(False)
+
+    def fileno(self) -> int:
+        return self.sock.fileno()
+
+    def read(self) -> list:
+        """
+        Drain the pending events.
+
+        :return: List of (cmd, attrs) tuples.
+        :raises OSError: ENOBUFS if events were dropped because the socket buffer overflowed.
+        """
+        events = []
+        while True:
+            try:
+                data = self.sock.recv(RECV_BUFFER_SIZE)
+            except BlockingIOError:
+                return events
+            for msg_type, _, payload, end in parse_messages(data):
+                if msg_type == self.family_id:
+                    events.append((data[payload], parse_attrs(data, payload + GENLMSGHDR.size, end)))
+
+    def close(self) -> None:
+        self.sock.close()
+
+
+_client = None
+_client_lock = threading.Lock()
+_client_failed = False
+
+
+def get_nl80211():
+    """
+    Shared nl80211 client of the process, created on first use.
+
+    :return: The NL80211 client, None if nl80211 is not available.
+    """
+    global _client, _client_failed
+    if _client is not None or _client_failed:
+        return _client
+    with _client_lock:
+        if _client is None and not _client_failed:
+            try:
+                _client = NL80211()
+            except OSError as e:
+                _client_failed = True
+                logger.warning(f"nl80211 is not available, falling back to iw: {e}")
+    return _client
@@ -0,0 +1,214 @@
+import os
+import select
+import signal
+import subprocess
+import threading
+import time
+
+from logging_config import logger
+from rmacs_util import find_processes
+
+
+class SupervisedProcess:
+    '''
+    State of one supervised component.
+
+    Attributes:
+    name : Name of the component, also its process name in /proc.
+    command : Command line starting the component.
+    pid : Process id, None while the component is not running.
+    started_at : Monotonic time of the last start.
+    restarts : Number of restarts after the component exited.
+    last_exit : Exit status of the last run, None if unknown (adopted process).
+    '''
+    def __init__(self, name: str, command: list):
+        self.name = name
+        self.command = command
+        self.popen: subprocess.Popen = None
+        self.pid: int = None
+        self.pidfd: int = None
+        self.started_at: float = None
+        self.restarts = 0
+        self.last_exit = None
+        self.backoff = 0.0
+        self.next_start = 0.0
+
+    @property
+    def uptime(self) -> float:
+        return time.monotonic() - self.started_at if self.pid is not None else 0.0
+
+
+class ProcessSupervisor(threading.Thread):
+    '''
+    Start RMACS components as child processes and restart them when they exit.
+
+    Exits are detected through pidfds (os.pidfd_open), so the supervisor sleeps in
+    poll() until a component exits or a restart is due instead of checking on a
+    timer; without pidfd support the components are polled every poll_interval.
+    A component which is already running (found through /proc) is adopted instead
+    of started a second time. Crashed components are restarted with exponential
+    backoff, the backoff is reset once a component stayed up for stable_time.
+    '''
+    def __init__(self, log_file: str = None, min_backoff: float = 1.0, max_backoff: float = 60.0,
+                 stable_time: float = 60.0, poll_interval: float = 1.0, status_interval: float = 600.0):
+        super().__init__(name="rmacs-supervisor", daemon=True)
+        self.log_file = log_file
+        self.min_backoff = min_backoff
+        self.max_backoff = max_backoff
+        self.stable_time = stable_time
+        self.poll_interval = poll_interval
+        self.status_interval = status_interval
+        self.processes: dict = {}
+        self.lock = threading.Lock()
+        self.running = False
+        self.pidfd_supported = hasattr(os, "pidfd_open")
+        # Wakes up the poll() of run() on stop()
+        self.wake_r, self.wake_w = os.pipe()
+
+    def add(self, name: str, command: list = None) -> None:
+        """
+        Supervise a component, started on start() or right away if already running.
+
+        :param name: Name of the component.
+        :param command: Command line, [name] if not given.
+        """
+        with self.lock:
+            self.processes[name] = SupervisedProcess(name, command or [name])
+
+    def status(self) -> dict:
+        """
+        Status of the supervised components.
+
+        :return: Dict of {name: {"pid", "running", "uptime", "restarts", "last_exit"}}.
+        """
+        with self.lock:
+            return {name: {"pid": process.pid, "running": process.pid is not None,
+                           "uptime": round(process.uptime, 1), "restarts": process.restarts,
+                           "last_exit": process.last_exit}
+                    for name, process in self.processes.items()}
+
+    def run(self) -> None:
+        self.running = True
+        last_status = time.monotonic()
+        while self.running:
+            now = time.monotonic()
+            with self.lock:
+                for process in self.processes.values():
+                    if process.pid is None and now >= process.next_start:
+                        self._start(process)
+                timeout = self._next_timeout(now)
+                pidfds = {process.pidfd: process for process in self.processes.values() if process.pidfd is not None}
+            poller = select.poll()
+            poller.register(self.wake_r, select.POLLIN)
+            for fd in pidfds:
+                poller.register(fd, select.POLLIN)
+            ready = {fd for fd, _ in poller.poll(timeout * 1000)}
+            if self.wake_r in ready:
+                os.read(self.wake_r, 64)
+            with self.lock:
+                exited = [pidfds[fd] for fd in ready if fd in pidfds]
+                exited += [process for process in self.processes.values()
+                           if process.pid is not None and process.pidfd is None and not self._alive(process)]
+                for process in exited:
+                    if self.running:
+                        self._on_exit(process)
+            if time.monotonic() - last_status >= self.status_interval:
+                last_status = time.monotonic()
+                logger.info(f"Supervised components: {self.status()}")
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """
+        Stop supervising and terminate the components.
+        """
+        self.running = False
+        os.write(self.wake_w, b"\0")
+        with self.lock:
+            processes = [process for process in self.processes.values() if process.pid is not None]
+        for process in processes:
+            logger.info(f"Stopping {process.name} (pid {process.pid})")
+            try:
+                os.kill(process.pid, signal.SIGTERM)
+            except ProcessLookupError:
+                continue
+        deadline = time.monotonic() + timeout
+        for process in processes:
+            while self._alive(process) and time.monotonic() < deadline:
+                time.sleep(0.1)
+            if self._alive(process):
+                logger.warning(f"{process.name} (pid {process.pid}) did not stop, killing it")
+                try:
+                    os.kill(process.pid, signal.SIGKILL)
+                except ProcessLookupError:
+                    pass
+                if process.popen is not None:
+                    process.popen.wait()
+            self._release(process)
+
+    def _start(self, process: SupervisedProcess) -> None:
+        existing = [pid for pid in find_processes(process.name) if pid != os.getpid()]
+        if existing:
+            process.pid = existing[0]
+            process.popen = None
+            logger.info(f"{process.name} is already running (pid {process.pid}), supervising it")
+        else:
+            try:
+                output = open(self.log_file, "a") if self.log_file else subprocess.DEVNULL
+                try:
+                    process.popen = subprocess.Popen(process.command, stdout=output, stderr=output)
+                finally:
+                    if output is not subprocess.DEVNULL:
+                        output.close()
+            except OSError as e:
+                logger.error(f"Failed to start {process.name}: {e}")
+                self._schedule_restart(process, 0.0)
+                return
+            process.pid = process.popen.pid
+            logger.info(f"Started {process.name} (pid {process.pid})")
+        process.started_at = time.monotonic()
+        if self.pidfd_supported:
+            try:
+                process.pidfd = os.pidfd_open(process.pid)
+            except ProcessLookupError:
+                # Exited already, handled by the liveness check
+                process.pidfd = None
+            except OSError as e:
+                logger.info(f"pidfd is not supported, polling components: {e}")
+                self.pidfd_supported = False
+
+    def _on_exit(self, process: SupervisedProcess) -> None:
+        uptime = process.uptime
+        process.last_exit = process.popen.wait() if process.popen is not None else None
+        logger.warning(f"{process.name} (pid {process.pid}) exited with status {process.last_exit} after {uptime:.1f}s")
+        self._release(process)
+        process.restarts += 1
+        self._schedule_restart(process, uptime)
+
+    def _schedule_restart(self, process: SupervisedProcess, uptime: float) -> None:
+        if uptime >= self.stable_time or process.backoff == 0.0:
+            process.backoff = self.min_backoff
+        else:
+            process.backoff = min(process.backoff * 2, self.max_backoff)
+        process.next_start = time.monotonic() + process.backoff
+        logger.info(f"Restarting {process.name} in {process.backoff:.1f}s (restart {process.restarts})")
+
+    def _next_timeout(self, now: float) -> float:
+        timeout = self.status_interval
+        for process in self.processes.values():
+            if process.pid is None:
+                timeout = min(timeout, max(process.next_start - now, 0.0))
+            elif process.pidfd is None:
+                timeout = min(timeout, self.poll_interval)
+        return timeout
+
+    def _alive(self, process: SupervisedProcess) -> bool:
+        if process.pid is None:
+            return False
+        if process.popen is not None:
+            return process.popen.poll() is None
+        return os.path.exists(f"/proc/{process.pid}")
+
+    def _release(self, process: SupervisedProcess) -> None:
+        if process.pidfd is not None:
+            os.close(process.pidfd)
+            process.pidfd = None
+        process.pid = None
@@ -1,13 +1,11 @@
 import sys
-import yaml
+import asyncio
 import threading
 import time
 import socket
 from enum import auto, Enum
 from typing import List, Tuple, Dict
 from collections import deque
-import subprocess
-import uuid
 import json
 import os
 
@@ -16,22 +14,33 @@ if parent_directory not in sys.path:
    sys.path.append(parent_directory)
 
 from logging_config import logger
-from config import load_config
-from traffic_monitor import TrafficMonitor
-from rmacs_util import get_mesh_freq, get_mac_address, get_interface_operstate, get_channel_bw, path_lookup
+from startup_profile import profiler, enable_from_args
+from config import validate_config_changes
+from runtime_config import RuntimeConfig
+from traffic_monitor import RadioMonitor
+from rmacs_util import get_mesh_freq, probe_interfaces, channel_switch_announcement
+from interface_registry import get_registry
+from nl80211 import CSA_BUSY
 from spectral_scan import Spectral_Scan
-from rmacs_comms import rmacs_comms, send_data
+from rmacs_comms import rmacs_comms, send_fanout
+from config_watcher import ConfigWatcher
+from channel_monitor import ChannelMonitor
+from rmacs_transport import MulticastTransport
+from dedup_cache import MessageIdCache
+from metrics_exporter import RmacsMetrics, MetricsExporter
 
 config_file_path = '/etc/meshshield/rmacs_config.yaml'
 CONFIG_DIR = "/etc/meshshield"
 
-action_to_id = {
-    "bad_channel_quality_index": 0,
-    "channel_quality_report": 1,
-    "operating_frequency": 2,
-    "switch_frequency": 3
-}
-id_to_action = {v: k for k, v in action_to_id.items()}
+from rmacs_codec import action_to_id, id_to_action, new_message_id, encode_message
+
+
+# RMACS_Config keys which are applied to a running client without a restart
+CLIENT_RELOADABLE_KEYS = (
+    "channel_bandwidth", "client_beacon_count", "freq_list", "channel_quality_index_threshold",
+    "phy_error_limit", "tx_timeout_limit", "air_time_limit", "max_error_check",
+    "periodic_recovery_switch", "traffic_threshold",
+)
 
 
 class ClientState(Enum):
@@ -158,6 +167,7 @@ class ClientFSM:
         if key in self.transitions:
             next_state, action = self.transitions[key]
             logger.info(f'{self.state} -> {next_state}')
+            self.client.metrics.transition(self.state, next_state)
             self.state = next_state
             if action:
                 action(event)
@@ -176,53 +186,75 @@ class InterferenceDetection(threading.Thread):
     stop:
     traffic_monitoring:
     '''
-    def __init__(self) -> None:
+    def __init__(self, rconfig: RuntimeConfig = None) -> None:
         super().__init__()
         # Initialize client objects
         self.fsm = ClientFSM(self)
         # Load the configuration
-        config = load_config(config_file_path)
-        self.traffic_monitor = TrafficMonitor()
-        self.channel_bandwidth = config['RMACS_Config']['channel_bandwidth']
-        self.client_beacon_count = config['RMACS_Config']['client_beacon_count']
-        self.interface = config['RMACS_Config']['primary_radio']
-        self.switching_frequency = config['RMACS_Config']['starting_frequency']
-        self.freq_list = config['RMACS_Config']['freq_list']
+        self.rconfig = rconfig if rconfig is not None else RuntimeConfig.from_file(config_file_path)
+        rconfig = self.rconfig
+        # Operating frequency kept current from nl80211 channel switch events
+        self.channel_monitor = ChannelMonitor([rconfig.interface])
+        # Traffic and errors of all radios, the FSM decides on the primary radio
+        self.radio_monitor = RadioMonitor(rconfig, self.channel_monitor)
+        self.traffic_monitor = self.radio_monitor.primary
+        self.channel_bandwidth = rconfig.channel_bandwidth
+        self.client_beacon_count = rconfig.client_beacon_count
+        self.interface = rconfig.interface
+        self.switching_frequency = rconfig.starting_frequency
+        self.freq_list = list(rconfig.freq_list)
         # Control channel interfaces
-        self.ch_interfaces = config['RMACS_Config']['radio_interfaces']
+        self.ch_interfaces = rconfig.radio_interfaces
         
         self.freq_index = -1
         self.sockets: Dict = {}
-        self.listen_threads: list = []
+        # Receives the messages of all interfaces on one event loop
+        self.transport = MulticastTransport(self.handle_message, name="rmacs-client-transport",
+                                            buffer_size=rconfig.receive_buffer_size)
         
-        # Initialize the Scanning Object
-        self.scan = Spectral_Scan()
+        # The Scanning Object probes the radio, it is created on the first scan
+        self.scan: Spectral_Scan = None
         
         # Channel Quality index
-        self.channel_quality_index_threshold = config['RMACS_Config']['channel_quality_index_threshold']
+        self.channel_quality_index_threshold = rconfig.channel_quality_index_threshold
         
         # Error Monitoring threshold
-        self.phy_error_limit = config['RMACS_Config']['phy_error_limit']
-        self.tx_timeout_limit = config['RMACS_Config']['tx_timeout_limit']
-        self.air_time_limit = config['RMACS_Config']['air_time_limit']
+        self.phy_error_limit = rconfig.phy_error_limit
+        self.tx_timeout_limit = rconfig.tx_timeout_limit
+        self.air_time_limit = rconfig.air_time_limit
         
         # Device MAC address
-        self.mac_address = get_mac_address(self.interface)
+        self.mac_address = get_registry().mac(self.interface)
         
         # Error Monitor 
         self.phy_error = 0   
         self.tx_timeout = 0   
         self.num_retries = 0
         self.max_retries = 3
-        self.max_error_check = config['RMACS_Config']['max_error_check']
-        self.periodic_recovery_switch = config['RMACS_Config']['periodic_recovery_switch']
+        self.max_error_check = rconfig.max_error_check
+        self.periodic_recovery_switch = rconfig.periodic_recovery_switch
 
         ## Create listen and client run FSM threads
         self.running = False
-        self.processed_ids = set()
-        self.msg_id_lock = threading.Lock()
+        # Bounded, expiring set of the unique IDs of processed messages
+        self.processed_ids = MessageIdCache(rconfig.dedup_capacity, rconfig.dedup_ttl)
+        # (message id, time) of the last acknowledged switch request
+        self.last_switch_ack: Tuple = (None, 0.0)
         self.run_client_fsm_thread = threading.Thread(target=self.run_client_fsm)
         
+        # Configuration hot-reload
+        self.config_lock = threading.Lock()
+        self.config_watcher = ConfigWatcher(config_file_path)
+        self.config_watcher.add_listener(self.apply_config_update)
+
+        # Prometheus metrics, served on /metrics if enabled
+        self.metrics = RmacsMetrics("client")
+        self.metrics.add_collector(lambda: self.metrics.current_state(self.fsm.state, ClientState))
+        self.metrics.add_collector(lambda: self.metrics.transport(self.transport, self.processed_ids))
+        self.metrics.add_collector(lambda: self.metrics.traffic_samples(self.radio_monitor.samples().values()))
+        self.metrics_exporter = (MetricsExporter(self.metrics, rconfig.metrics_address, rconfig.metrics_client_port)
+                                 if rconfig.metrics_enabled else None)
+        
     def run(self) -> None:
         """
         Connect to the orchestrator node and start the client's operation in separate
@@ -230,24 +262,31 @@ class InterferenceDetection(threading.Thread):
         """
         try:
             self.running = True
-            for interface in self.ch_interfaces:
-                if get_interface_operstate(interface):
-                    logger.info(f'Radio interface:[{interface}] is up with channel BW : {get_channel_bw(interface)}MHz')
+            self.channel_monitor.start()
+            self.radio_monitor.start()
+            if self.metrics_exporter is not None:
+                self.metrics_exporter.start()
+            for interface, (is_up, channel_bw) in probe_interfaces(self.ch_interfaces).items():
+                if is_up:
+                    logger.info(f'Radio interface:[{interface}] is up with channel BW : {channel_bw}MHz')
                     try:
-                        socket = rmacs_comms(interface)
+                        socket = rmacs_comms(interface, self.rconfig)
+                        if socket is None:
+                            continue
                         self.sockets[interface] = socket
-                        listen_thread = threading.Thread(target=self.receive_messages, args=(socket, interface))
-                        self.listen_threads.append(listen_thread)
-                        listen_thread.start()
-                        logger.info(f"Listening on interface: {interface}")
+                        self.transport.add_socket(interface, socket)
                     except ConnectionError as e:
                         logger.error(f"Connection error on {interface}: {e}")
                 else:
                     logger.info(f'Radio interface:[{interface}] is not up, cannot create a multicast socket connection to it.')                    
+            self.transport.start()
+            profiler.mark("sockets listening")
             # Start the server FSM thread
             logger.info("Server started and listening...")
             
             self.run_client_fsm_thread.start()
+            self.config_watcher.start()
+            profiler.mark("fsm started")
         except Exception as e:
             logger.error(f"Unexpected error while starting server: {e}")
             self.stop()
@@ -271,67 +310,71 @@ class InterferenceDetection(threading.Thread):
                 logger.info(f"Exception in run: {e}")
                 return None
                     
-    def receive_messages(self, socket, interface) -> None:
+    async def handle_message(self, parsed_message, interface, address) -> None:
         """
-        Receive incoming messages from the orchestrator.
+        Handle a message from the orchestrator, dispatched by the multicast transport.
         """
-        while self.running:
-            try:
-                # Receive incoming messages and decode the netstring encoded data
-                try:
-                    data, address = socket.recvfrom(1024)
-                    data = data.decode('utf-8')
+        message_id = parsed_message.get("payload", {}).get("message_id")
+        action_id: int = parsed_message.get("payload", {}).get("a_id")
+        action_str: str = id_to_action.get(action_id)
+        if action_str == "switch_frequency" and self.rconfig.switch_ack_enabled:
+            # Acknowledge retransmissions too, the orchestrator resends until it hears from us
+            self.send_switch_ack(message_id)
+        if not self.processed_ids.check_and_add(message_id):
+            logger.debug(f"Duplicate Msg : Message with ID {message_id} has already been processed and was received from interface : {interface}. Ignoring.")
+            return
+        logger.debug(f"New Msg: Processing message: {message_id} : msg : {parsed_message} via interface : {interface}")
+
+        # Handle frequency switch request
+        if action_str in ["switch_frequency", "operating_frequency"]:
+            # Checking and switching the frequency blocks, keep it off the event loop
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(None, self.handle_frequency_message, parsed_message, action_str, interface)
+
+    def send_switch_ack(self, switch_message_id) -> None:
+        """
+        Acknowledge a switch request to the orchestrator.
 
-                    # Parse the JSON message
-                    parsed_message = json.loads(data)
-                    
-                except Exception as e:
-                    # Handle netstring decoding errors
-                    logger.error(f"Failed to decode netstring: {e} via interface : {interface} ")
-                    break
+        Copies of one request arrive on every radio interface, they are acknowledged
+        once unless the request is received again after half the ack timeout
+        (a retransmission).
 
-                # Deserialize the MessagePack message
-                try:
-                    message_id = parsed_message.get("payload", {}).get("message_id")
-                    with self.msg_id_lock:
-                        if message_id in self.processed_ids:
-                            logger.debug(f"Duplicate Msg : Message with ID {message_id} has already been processed and was received from interface : {interface}. Ignoring.")
-                        else:
-                            logger.debug(f"New Msg: Processing message: {message_id} : msg : {data} via interface : {interface}")
-                            # Add the unique ID to the processed set
-
-                            #with self.msg_id_lock:
-                            self.processed_ids.add(message_id)
-                            action_id: int = parsed_message.get("payload", {}).get("a_id")
-                            action_str: str = id_to_action.get(action_id)
-
-
-                            # Handle frequency switch request
-                            if action_str in ["switch_frequency", "operating_frequency"]:
-                                requested_switch_freq = parsed_message.get("payload", {}).get("freq")
-                                self.update_operating_freq(requested_switch_freq)
-                                cur_freq = get_mesh_freq(self.interface)
-                                logger.info(f"The requested switch freq: {requested_switch_freq} and current operating freq: {cur_freq} via interface : {interface}")
-                                if cur_freq != self.operating_frequency:
-                                    self.switching_frequency = requested_switch_freq
-                                    logger.info(f"Handling action_str : {action_str} via interface : {interface}")
-                                    self.fsm.trigger(ClientEvent.EXT_SWITCH_EVENT)
-                except Exception as e:
-                    logger.warning(f"Error in received message: {e}")
-                    continue
+        :param switch_message_id: Message id of the switch request.
+        """
+        now = time.monotonic()
+        last_id, last_time = self.last_switch_ack
+        if switch_message_id == last_id and now - last_time < self.rconfig.switch_ack_timeout / 2:
+            return
+        self.last_switch_ack = (switch_message_id, now)
+        data = {'a_id': action_to_id["switch_frequency_ack"],
+                'message_id': new_message_id(),
+                'ack_id': switch_message_id,
+                'device': self.mac_address}
+        logger.info(f"Acknowledging switch request {switch_message_id}")
+        self.send_to_all(data)
+
+    def handle_frequency_message(self, parsed_message, action_str, interface) -> None:
+        """
+        Switch to the frequency announced by the orchestrator if the node is not operating on it.
+        """
+        requested_switch_freq = parsed_message.get("payload", {}).get("freq")
+        self.update_operating_freq(requested_switch_freq)
+        cur_freq = self.channel_monitor.get_frequency(self.interface)
+        logger.info(f"The requested switch freq: {requested_switch_freq} and current operating freq: {cur_freq} via interface : {interface}")
+        if cur_freq != self.operating_frequency:
+            self.switching_frequency = requested_switch_freq
+            logger.info(f"Handling action_str : {action_str} via interface : {interface}")
+            self.fsm.trigger(ClientEvent.EXT_SWITCH_EVENT)
 
-            except ConnectionResetError:
-                logger.warning("Connection forcibly closed by the remote host")
-                break
     def sending_bad_channel_quality_index(self, trigger_event) -> None:
         """
         Send bad_channel_quality_index to orchestrator to report bad channel quality.
 
         :param trigger_event: ClientEvent that triggered the execution of this function.
         """
-        curr_freq: int = get_mesh_freq(self.interface)
+        curr_freq: int = self.channel_monitor.get_frequency(self.interface)
         action_id: int = action_to_id["bad_channel_quality_index"]
-        message_id: str = str(uuid.uuid4())  
+        message_id: int = new_message_id()  
         data = {'a_id': action_id,
                 'message_id': message_id,
                 'freq': curr_freq,
@@ -341,21 +384,27 @@ class InterferenceDetection(threading.Thread):
                 'tx_timeout' : self.tx_timeout,
                 'device': self.mac_address}
         logger.info(f'Sending BCQI report to Multicast group: {data}')
-        repeat = 2
-        while repeat:
-            # Loop through the sockets dictionary and send data
-            for interface, socket in self.sockets.items():
-                self.send_to_socket(socket, data, interface)
-            repeat -= 1                  
+        self.send_to_all(data, repeat=2)
         self.fsm.trigger(ClientEvent.SENT_BAD_CHANNEL_QUALITY_INDEX)
        
-    def send_to_socket(self, socket, data, interface):
-        try:
-            send_data(socket, data, interface)
-            logger.info(f"Successfully sent data to {interface}")
-        except Exception as e:
-            logger.error(f"Error sending data to {interface}: {e}")
-    
+    def send_to_all(self, data, repeat: int = 1) -> dict:
+        """
+        Encode a message once and send it to every connected interface.
+
+        :param data: Message payload.
+        :param repeat: Number of times the message is sent on every interface.
+        :return: Dict of {interface: None on success or the send error}.
+        """
+        message = encode_message(data, self.rconfig.wire_format)
+        results = send_fanout(self.sockets, message, self.rconfig.multicast, repeat)
+        self.metrics.sent(results)
+        for interface, error in results.items():
+            if error is None:
+                logger.info(f"Successfully sent data to {interface}")
+            else:
+                logger.error(f"Error sending data to {interface}: {error}")
+        return results
+
     def report_channel_quality(self, trigger_event) -> None:
         """
         Report channel quality to orchestrator if data is valid.
@@ -363,7 +412,7 @@ class InterferenceDetection(threading.Thread):
         :param trigger_event: ClientEvent that triggered the execution of this function.
         """
         action_id: int = action_to_id["channel_quality_report"]
-        message_id: str = str(uuid.uuid4()) 
+        message_id: int = new_message_id() 
         data = {'a_id': action_id,
                 'freq': self.scan_freq,
                 'qual': self.channel_quality_index,
@@ -374,9 +423,7 @@ class InterferenceDetection(threading.Thread):
                 'device': self.mac_address}
         logger.info(f'Sending Channel quality report to Multicast group: {data}')
         
-        # Loop through the sockets dictionary and send data
-        for interface, socket in self.sockets.items():
-            self.send_to_socket(socket, data, interface)
+        self.send_to_all(data)
         self.fsm.trigger(ClientEvent.REPORTED_CHANNEL_QUALITY)
     
     def switch_frequency(self, trigger_event) -> None:
@@ -388,42 +435,64 @@ class InterferenceDetection(threading.Thread):
             logger.info(f"Mesh node is currently operating at requested switch frequency:{cur_freq} already")
             self.fsm.trigger(ClientEvent.SWITCH_NOT_REQUIRED)
             return None
-        iw_path = path_lookup('iw')
-        if iw_path is not None:
-            run_cmd = f"{iw_path} dev {self.interface} switch freq {self.switching_frequency} HT{self.channel_bandwidth} beacons {self.client_beacon_count}"
-            logger.info(f"+run_cmd : {run_cmd}")
-            try:
-                result = subprocess.run(run_cmd, 
-                                    shell=True, 
-                                    capture_output=True, 
-                                    text=True)
-                if(result.returncode != 0):
-                    logger.info("Failed to execute the switch frequency command")
-                    return None
-                else:
-                    logger.info(f"Executed switch freq cmd successfully : ")
-                    time.sleep(self.client_beacon_count)
-                    cur_freq = get_mesh_freq(self.interface)
-
-                 # If maximum frequency switch retries not reached, try to switch again
-                if cur_freq != self.switching_frequency and self.num_retries < self.max_retries:
-                    logger.info(f"Frequency switch is unsuccessful, retry {self.num_retries}")
-                    self.num_retries += 1
-                    self.fsm.trigger(ClientEvent.SWITCH_UNSUCCESSFUL)
-
-                 # Frequency switch successful
-                elif cur_freq == self.switching_frequency:
-                    logger.info(f"Frequency switch is successful, Operating frequency : {cur_freq} and requested switch frequency : {self.switching_frequency} both are same")
-                    self.num_retries = 0
-                    self.fsm.trigger(ClientEvent.SWITCH_SUCCESSFUL)
-
-            except subprocess.CalledProcessError as e:
-                logger.warning(f"Switching frequency error occurred: {str(e)}")
-                self.fsm.trigger(ClientEvent.SWITCH_UNSUCCESSFUL)        
-        else:
-            logger.warning("iw utility is not found")
+        error = channel_switch_announcement(self.switching_frequency, self.interface,
+                                            self.channel_bandwidth, self.client_beacon_count)
+        self.metrics.channel_switch(error)
+        if error == CSA_BUSY:
+            # A switch is already in progress, e.g. one relayed by a mesh peer
+            logger.info("Channel switch already in progress")
+        elif error is not None:
+            logger.info(f"Failed to execute the switch frequency command: {error}")
             return None
+        else:
+            logger.info(f"Executed switch freq cmd successfully : ")
+        self.channel_monitor.wait_for_switch(self.interface, self.switching_frequency, self.client_beacon_count)
+        cur_freq = self.channel_monitor.get_frequency(self.interface)
+
+         # If maximum frequency switch retries not reached, try to switch again
+        if cur_freq != self.switching_frequency and self.num_retries < self.max_retries:
+            logger.info(f"Frequency switch is unsuccessful, retry {self.num_retries}")
+            self.num_retries += 1
+            self.fsm.trigger(ClientEvent.SWITCH_UNSUCCESSFUL)
+
+         # Frequency switch successful
+        elif cur_freq == self.switching_frequency:
+            logger.info(f"Frequency switch is successful, Operating frequency : {cur_freq} and requested switch frequency : {self.switching_frequency} both are same")
+            self.num_retries = 0
+            self.fsm.trigger(ClientEvent.SWITCH_SUCCESSFUL)
              
+    def apply_config_update(self, changes, snapshot=None) -> bool:
+        """
+        Apply changed configuration values to the running client.
+
+        The update is all or nothing: if any value is invalid the whole change set is
+        rejected. Sockets and FSM state are preserved.
+
+        :param changes: Changed keys as returned by config.diff_config().
+        :param snapshot: The new configuration snapshot (unused).
+        :return: True if the update was applied, False if it was rejected.
+        """
+        updates, rejected, ignored = validate_config_changes(changes, CLIENT_RELOADABLE_KEYS)
+        if ignored:
+            logger.info(f"Configuration keys need a client restart to take effect: {ignored}")
+        if rejected:
+            logger.error(f"Rejected configuration update, invalid values: {rejected}")
+            return False
+        if not updates:
+            return True
+        with self.config_lock:
+            traffic_threshold = updates.pop("traffic_threshold", None)
+            if traffic_threshold is not None:
+                for monitor in self.radio_monitor.monitors.values():
+                    monitor.traffic_threshold = traffic_threshold
+            if "freq_list" in updates:
+                updates["freq_list"] = list(updates["freq_list"])
+                self.freq_index = self.freq_index % len(updates["freq_list"]) if self.freq_index >= 0 else -1
+            for key, value in updates.items():
+                setattr(self, key, value)
+        logger.info(f"Applied configuration update: {updates}{f' traffic_threshold={traffic_threshold}' if traffic_threshold is not None else ''}")
+        return True
+
     def update_operating_freq(self, requested_switch_freq):
         """
         Update the operating mesh frequency.
@@ -435,18 +504,21 @@ class InterferenceDetection(threading.Thread):
     def channel_scan(self, trigger_event) -> None:
         
         if self.fsm.state == ClientState.CHANNEL_SCAN:
-            self.freq_index = (self.freq_index + 1) % len(self.freq_list)
-            self.scan_freq = self.freq_list[self.freq_index]
+            with self.config_lock:
+                self.freq_index = (self.freq_index + 1) % len(self.freq_list)
+                self.scan_freq = self.freq_list[self.freq_index]
             self.channel_report: list[dict] = self.perform_scan(self.scan_freq)
             self.channel_quality_index = self.channel_quality_estimator(self.channel_report)
+            self.metrics.channel_quality_index.set(self.channel_quality_index, self.scan_freq)
             logger.info(f"Performed channel scan at freq : {self.scan_freq} and its channel quality index : {self.channel_quality_index}")
             self.fsm.trigger(ClientEvent.PERFORMED_CHANNEL_SCAN)
             
             
         elif self.fsm.state == ClientState.OPERATING_CHANNEL_SCAN:
-            self.scan_freq = get_mesh_freq(self.interface)
+            self.scan_freq = self.channel_monitor.get_frequency(self.interface)
             self.channel_report = self.perform_scan(self.scan_freq)
             self.channel_quality_index = self.channel_quality_estimator(self.channel_report)
+            self.metrics.channel_quality_index.set(self.channel_quality_index, self.scan_freq)
             if self.channel_quality_index > self.channel_quality_index_threshold:
                 logger.info("Trigger Bad Channel Qaulity index")
                 self.fsm.trigger(ClientEvent.BAD_CHANNEL_QUALITY_INDEX)
@@ -456,7 +528,10 @@ class InterferenceDetection(threading.Thread):
             
             
     def perform_scan(self, freq: str) -> list[dict]:
+        start = time.monotonic()
         try:
+            if self.scan is None:
+                self.scan = Spectral_Scan(self.rconfig)
             self.scan.initialize_scan()
             self.scan.execute_scan(freq)
             self.channel_quality:list[dict] = self.scan.run_fft_eval(freq)
@@ -466,6 +541,8 @@ class InterferenceDetection(threading.Thread):
         except Exception as e:
             logger.info(f"An unexpected error occurred: {e}")
             return []
+        finally:
+            self.metrics.scan_duration.observe(time.monotonic() - start, self.metrics.role)
         if not self.channel_quality:
             logger.info("Channel quality is empty.")
             return []
@@ -474,7 +551,11 @@ class InterferenceDetection(threading.Thread):
         
     def channel_quality_estimator(self,channel_qaulity_report: list[dict]) -> int:
         
-        self.report = json.loads(channel_qaulity_report)
+        # ss-analyser reports a JSON string, the built-in decoder a list
+        if isinstance(channel_qaulity_report, str):
+            self.report = json.loads(channel_qaulity_report)
+        else:
+            self.report = channel_qaulity_report
 
         for item in self.report:
             if "index" in item:
@@ -491,6 +572,9 @@ class InterferenceDetection(threading.Thread):
         '''
         if self.fsm.state == ClientState.MONITOR_TRAFFIC:
             self.traffic_rate = self.traffic_monitor.traffic_monitor()
+            for interface, sample in self.radio_monitor.samples().items():
+                if interface != self.interface and sample is not None:
+                    logger.info(f"Secondary radio sample : {sample}")
             if self.traffic_rate:
                 logger.info(f"Traffic rate : {self.traffic_rate}")
                 self.fsm.trigger(ClientEvent.TRAFFIC)
@@ -501,17 +585,28 @@ class InterferenceDetection(threading.Thread):
     def error_monitoring(self, trigger_event) -> None:
         
         self.error_check_count = 0
+        samples = self.traffic_monitor.recent_samples(self.max_error_check, error_check=True)
+        if samples is not None:
+            # The sampler history covers all checks, decide on it without waiting
+            logger.info(f"Channel busy ratios : {self.traffic_monitor.get_channel_busy(self.freq_list)}")
+            errors = [sample for sample in samples if self.is_traffic_error(sample)]
+            logger.info(f"Observed error in {len(errors)} of the last {len(samples)} traffic samples")
+            if len(errors) < len(samples):
+                logger.info("Observed no-error in on-going traffic")
+                self.fsm.trigger(ClientEvent.NO_ERROR)
+            else:
+                logger.info(f"Report error in on-going traffic with phy_error: {self.phy_error} and tx_timeout: {self.tx_timeout}")
+                self.fsm.trigger(ClientEvent.ERROR)
+            return
         self.monitoring = True
         while self.monitoring: 
             if self.fsm.state == ClientState.MONITOR_ERROR:
                 if self.error_check_count < self.max_error_check:
                     logger.info(f'Traffic error observed for {self.error_check_count} items')
-                    self.phy_error = self.traffic_monitor.get_phy_error()
-                    self.tx_timeout = self.traffic_monitor.get_tx_timeout()
-                    self.air_time = self.traffic_monitor.get_air_time()
-                    self.beacons_late = self.traffic_monitor.get_beacons_late()
-                    logger.info(f"beacons_late : {self.beacons_late}")
-                    if self.phy_error > self.phy_error_limit or self.tx_timeout > self.tx_timeout_limit or self.air_time > self.air_time_limit:
+                    # All metrics over one window, the first check reuses the window of the traffic check
+                    sample = self.traffic_monitor.sample(reuse_last=self.error_check_count == 0, error_check=True)
+                    logger.info(f"Channel busy ratios : {self.traffic_monitor.get_channel_busy(self.freq_list)}")
+                    if self.is_traffic_error(sample):
                         self.error_check_count +=1
                         logger.info(f"Observed error in on-going traffic : count = {self.error_check_count}")
                         continue
@@ -526,6 +621,20 @@ class InterferenceDetection(threading.Thread):
                     self.error_check_count = 0
                     self.monitoring = False
                     self.fsm.trigger(ClientEvent.ERROR)
+
+    def is_traffic_error(self, sample) -> bool:
+        """
+        Check the error metrics of a traffic sample against the configured limits.
+
+        :param sample: TrafficSample to check, its metrics are kept as the latest observed.
+        :return: True if any limit is exceeded.
+        """
+        self.phy_error = sample.phy_error
+        self.tx_timeout = sample.tx_timeout
+        self.air_time = sample.air_time or 0
+        self.beacons_late = sample.beacons_late
+        logger.info(f"beacons_late : {self.beacons_late}")
+        return self.phy_error > self.phy_error_limit or self.tx_timeout > self.tx_timeout_limit or self.air_time > self.air_time_limit
                 
     def recovering_switch_error(self, trigger_event) -> None:
         """
@@ -561,23 +670,24 @@ class InterferenceDetection(threading.Thread):
         """
         try:
             self.running = False
+            self.config_watcher.stop()
+            self.channel_monitor.stop()
+            self.radio_monitor.stop()
+            if self.metrics_exporter is not None:
+                self.metrics_exporter.stop()
             
             if self.run_client_fsm_thread.is_alive():
                 self.run_client_fsm_thread.join(timeout=5)
                 logger.info("Client FSM thread stopped successfully.")
 
+            self.transport.stop()
+
             for interface, socket in self.sockets.items():
                 try:
                     socket.close()
                     logger.info(f"Closed socket on interface: {interface}")
                 except Exception as e:
                     logger.error(f"Error while closing socket on {interface}: {e}")
-
-
-            for thread in self.listen_threads:
-                if thread.is_alive():
-                    thread.join(timeout=5)
-                    logger.info("Listen thread stopped successfully.")
                     
         except Exception as e:
             logger.error(f"Error while stopping listen thread: {e}")
@@ -590,11 +700,17 @@ def main():
     Main entry point for the RMACS client.
     """
     client: InterferenceDetection = None
+    enable_from_args("rmacs_client")
 
     try:
         client = InterferenceDetection()
+        profiler.mark("client init")
         client.start()
         logger.info("RMACS client is running...")
+        if profiler.enabled:
+            # run() opens the sockets in the client thread and returns once the FSM is started
+            client.join()
+            profiler.report()
 
     except Exception as e:
         logger.error(f"Unexpected error in the server: {e}")
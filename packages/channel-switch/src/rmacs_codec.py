@@ -0,0 +1,208 @@
+"""
+RMACS control message wire format.
+
+Binary messages start with a fixed header followed by a fixed layout body
+selected by the action id, all fields in network byte order:
+
+    header : magic (u8) | version (u8) | action id (u8) | message id (u64)
+    bad_channel_quality_index, channel_quality_report :
+             freq (u16) | qual (f32) | tx_rate (f32) | phy_error (i32) | tx_timeout (i32) | device MAC (6s)
+    operating_frequency, switch_frequency :
+             freq (u16) | device MAC (6s)
+    switch_frequency_ack :
+             acknowledged message id (u64) | device MAC (6s)
+
+Missing values are sent as 0 (integers, MAC) or NaN (floats) and decoded back
+to None. Messages starting with '{' are decoded as the legacy JSON format, so
+nodes running older versions can stay in the mesh. Older versions do not decode
+the binary format, which is why JSON is sent by default (wire_format).
+"""
+
+import json
+import math
+import os
+import struct
+
+from rmacs_util import create_json_message
+
+
+action_to_id = {
+    "bad_channel_quality_index": 0,
+    "channel_quality_report": 1,
+    "operating_frequency": 2,
+    "switch_frequency": 3,
+    "switch_frequency_ack": 4
+}
+id_to_action = {v: k for k, v in action_to_id.items()}
+
+WIRE_MAGIC = 0xA5
+WIRE_VERSION = 1
+WIRE_FORMATS = ("binary", "json")
+
+HEADER = struct.Struct("!BBBQ")
+QUALITY_BODY = struct.Struct("!Hffii6s")
+FREQUENCY_BODY = struct.Struct("!H6s")
+ACK_BODY = struct.Struct("!Q6s")
+
+BODY_LAYOUTS = {
+    action_to_id["bad_channel_quality_index"]: QUALITY_BODY,
+    action_to_id["channel_quality_report"]: QUALITY_BODY,
+    action_to_id["operating_frequency"]: FREQUENCY_BODY,
+    action_to_id["switch_frequency"]: FREQUENCY_BODY,
+    action_to_id["switch_frequency_ack"]: ACK_BODY,
+}
+
+NO_MAC = bytes(6)
+
+
+def new_message_id() -> int:
+    """
+    Generate a random 64-bit message id.
+    """
+    return int.from_bytes(os.urandom(8), "big")
+
+
+def _mac_to_bytes(mac: str) -> bytes:
+    return bytes.fromhex(mac.replace(":", "")) if mac else NO_MAC
+
+
+def _bytes_to_mac(raw: bytes) -> str:
+    return raw.hex(":") if raw != NO_MAC else None
+
+
+def _float(value) -> float:
+    return math.nan if value is None else float(value)
+
+
+def _optional(value):
+    return None if value != value else value
+
+
+def encode_binary(payload: dict) -> bytes:
+    """
+    Encode a message payload in the binary wire format.
+
+    :param payload: Message payload with 'a_id', 'message_id' and the fields of the action.
+    :return: The encoded message.
+    :raises ValueError: If the payload cannot be represented in the binary format.
+    """
+    action_id = payload.get("a_id")
+    layout = BODY_LAYOUTS.get(action_id)
+    message_id = payload.get("message_id")
+    if layout is None or not isinstance(message_id, int):
+        raise ValueError(f"Payload can not be binary encoded: {payload}")
+    header = HEADER.pack(WIRE_MAGIC, WIRE_VERSION, action_id, message_id)
+    try:
+        if layout is QUALITY_BODY:
+            body = layout.pack(payload.get("freq") or 0,
+                               _float(payload.get("qual")),
+                               _float(payload.get("tx_rate")),
+                               int(payload.get("phy_error") or 0),
+                               int(payload.get("tx_timeout") or 0),
+                               _mac_to_bytes(payload.get("device")))
+        elif layout is ACK_BODY:
+            body = layout.pack(payload.get("ack_id"), _mac_to_bytes(payload.get("device")))
+        else:
+            body = layout.pack(payload.get("freq") or 0, _mac_to_bytes(payload.get("device")))
+    except (struct.error, TypeError) as e:
+        raise ValueError(f"Payload can not be binary encoded: {e}") from e
+    return header + body
+
+
+def decode_binary(data) -> dict:
+    """
+    Decode a binary wire format message.
+
+    :param data: bytes-like object holding one message.
+    :return: The message as {"msg_type": "COMMAND", "payload": {...}}, like the JSON format.
+    :raises ValueError: If the message is malformed or of an unsupported version.
+    """
+    if len(data) < HEADER.size:
+        raise ValueError(f"Message too short: {len(data)} bytes")
+    magic, version, action_id, message_id = HEADER.unpack_from(data, 0)
+    if magic != WIRE_MAGIC:
+        raise ValueError(f"Unknown message magic: {magic:#x}")
+    if version != WIRE_VERSION:
+        raise ValueError(f"Unsupported message version: {version}")
+    layout = BODY_LAYOUTS.get(action_id)
+    if layout is None:
+        raise ValueError(f"Unknown action id: {action_id}")
+    if len(data) < HEADER.size + layout.size:
+        raise ValueError(f"Truncated message: {len(data)} bytes")
+    if layout is QUALITY_BODY:
+        freq, qual, tx_rate, phy_error, tx_timeout, device = layout.unpack_from(data, HEADER.size)
+        payload = {"a_id": action_id, "message_id": message_id, "freq": freq or None,
+                   "qual": _optional(qual), "tx_rate": _optional(tx_rate),
+                   "phy_error": phy_error, "tx_timeout": tx_timeout, "device": _bytes_to_mac(device)}
+    elif layout is ACK_BODY:
+        ack_id, device = layout.unpack_from(data, HEADER.size)
+        payload = {"a_id": action_id, "message_id": message_id, "ack_id": ack_id,
+                   "device": _bytes_to_mac(device)}
+    else:
+        freq, device = layout.unpack_from(data, HEADER.size)
+        payload = {"a_id": action_id, "message_id": message_id, "freq": freq or None,
+                   "device": _bytes_to_mac(device)}
+    return {"msg_type": "COMMAND", "payload": payload}
+
+
+def encode_message(payload: dict, wire_format: str = "binary") -> bytes:
+    """
+    Encode a COMMAND message.
+
+    :param payload: The message payload.
+    :param wire_format: 'binary' or 'json'. Payloads which do not fit the binary layout are sent as JSON.
+    :return: The encoded message.
+    """
+    if wire_format == "binary":
+        try:
+            return encode_binary(payload)
+        except ValueError:
+            pass
+    return create_json_message(msg_type="COMMAND", payload=payload).encode('utf-8')
+
+
+def decode_message(data) -> dict:
+    """
+    Decode a received message in either wire format.
+
+    :param data: bytes-like object holding one message.
+    :return: The decoded message.
+    :raises ValueError: If the message is malformed.
+    """
+    if not data:
+        raise ValueError("Empty message")
+    if data[0] == WIRE_MAGIC:
+        return decode_binary(data)
+    try:
+        message = json.loads(bytes(data).decode('utf-8'))
+    except (UnicodeDecodeError, json.JSONDecodeError) as e:
+        raise ValueError(f"Malformed JSON message: {e}") from e
+    if not isinstance(message, dict):
+        raise ValueError("Malformed JSON message: not an object")
+    return message
+
+
+def benchmark(rounds: int = 100000) -> None:
+    """
+    Compare size and encode/decode speed of the binary and JSON wire formats.
+    """
+    import timeit
+    samples = {
+        "bad_channel_quality_index": {'a_id': 0, 'message_id': new_message_id(), 'freq': 5180, 'qual': 3,
+                                      'tx_rate': 12345.6, 'phy_error': 1700, 'tx_timeout': 2,
+                                      'device': "00:30:1a:4f:7b:21"},
+        "switch_frequency": {'a_id': 3, 'freq': 5200, 'message_id': new_message_id(),
+                             'device': "00:30:1a:4f:7b:21"},
+    }
+    print(f"{'message':<28}{'format':<8}{'bytes':>6}{'encode us':>11}{'decode us':>11}")
+    for name, payload in samples.items():
+        for wire_format in WIRE_FORMATS:
+            encoded = encode_message(payload, wire_format)
+            encode_time = timeit.timeit(lambda: encode_message(payload, wire_format), number=rounds)
+            decode_time = timeit.timeit(lambda: decode_message(encoded), number=rounds)
+            print(f"{name:<28}{wire_format:<8}{len(encoded):>6}"
+                  f"{encode_time / rounds * 1e6:>11.2f}{decode_time / rounds * 1e6:>11.2f}")
+
+
+if __name__ == "__main__":
+    benchmark()
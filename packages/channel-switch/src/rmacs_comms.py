@@ -1,8 +1,8 @@
 import socket
 import struct
-from config import load_config
+from config import get_config
 from logging_config import logger
-from rmacs_util import create_json_message
+from rmacs_codec import encode_message
 
 config_file_path = '/etc/meshshield/rmacs_config.yaml'
 
@@ -10,31 +10,41 @@ def get_multicast_config(interface):
     """
     Retrieve multicast group and port based on the interface.
     """
-    config = load_config(config_file_path)
+    config = get_config(config_file_path)
     multicast_config = config.get("MULTICAST_CONFIG",{})
     _config = multicast_config.get(interface)
-    if config:
+    if _config:
         return _config['group'], _config['port']
     else:
         raise ValueError(f"Unknown interface: {interface}")
 
-def rmacs_comms(interface):
+def rmacs_comms(interface, rconfig=None):
     """
     Create a RMACS Multicast socket for Server and Client communication
+
+    :param interface: Radio interface to bind the socket to.
+    :param rconfig: RuntimeConfig with the precomputed multicast destinations, optional.
     """
     try:
         # Create a socket for IPv6 UDP communication
         # Retrieve the multicast group and port based on the interface
-        MULTICAST_GROUP, MULTICAST_PORT = get_multicast_config(interface)
+        if rconfig is not None:
+            MULTICAST_GROUP, MULTICAST_PORT = rconfig.multicast[interface]
+            interface_index = rconfig.get_ifindex(interface)
+        else:
+            MULTICAST_GROUP, MULTICAST_PORT = get_multicast_config(interface)
+            interface_index = socket.if_nametoindex(interface)
         sock = socket.socket(socket.AF_INET6, socket.SOCK_DGRAM)
 
         # Allow multiple sockets to use the same port
         sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)    
+        if rconfig is not None:
+            # Room for a burst of reports from all clients after an interference event
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, rconfig.socket_rcvbuf)
         sock.bind(('', MULTICAST_PORT))  # '' means bind to all interfaces
 
         # Join the multicast group
         # Set the outgoing interface for multicast
-        interface_index = socket.if_nametoindex(interface)
         sock.setsockopt(socket.IPPROTO_IPV6, socket.IPV6_MULTICAST_IF, interface_index)
 
         # Join the multicast group
@@ -52,15 +62,20 @@ def rmacs_comms(interface):
         logger.error(f"An unexpected error occurred: {ex}")
         return None
     
-def send_data(socket, data, interface) -> None:
+def send_data(socket, data, interface, destination=None, wire_format="json") -> None:
+    """
+    Send a COMMAND message to the multicast group of the interface.
 
+    :param destination: Precomputed (group, port) of the interface, looked up in the configuration if not given.
+    :param wire_format: 'binary' or 'json', see rmacs_codec.
+    """
     try:
-        MULTICAST_GROUP, MULTICAST_PORT = get_multicast_config(interface)
-        # Create the JSON message
+        MULTICAST_GROUP, MULTICAST_PORT = destination if destination else get_multicast_config(interface)
+        # Encode the message
         payload = data
-        message = create_json_message(msg_type="COMMAND", payload=payload)
+        message = encode_message(payload, wire_format)
         if socket:
-            socket.sendto(message.encode('utf-8'), (MULTICAST_GROUP, MULTICAST_PORT))  
+            socket.sendto(message, (MULTICAST_GROUP, MULTICAST_PORT))  
             logger.info(f"Sent report to Mutlicast")
         else:
             logger.info(f"Debug : No socket connection for interface :{interface}")
@@ -70,9 +85,39 @@ def send_data(socket, data, interface) -> None:
         logger.info(f"Broken pipe error")
     except Exception as e:
         logger.info(f"Error in sending data : {e}")
- 
- 
 
+def send_fanout(sockets: dict, message: bytes, destinations=None, repeat: int = 1) -> dict:
+    """
+    Send an already encoded message to every interface.
 
+    The message is serialized once by the caller and the same buffer is handed to
+    every socket back to back, so all radios get it as close together as possible.
 
-        
\ No newline at end of file
+    :param sockets: Dict of {interface: socket}.
+    :param message: Encoded message, see rmacs_codec.encode_message().
+    :param destinations: Dict of {interface: (group, port)}, looked up in the configuration if missing.
+    :param repeat: Number of times the message is sent on every interface.
+    :return: Dict of {interface: None on success or the exception raised by the send}.
+    """
+    destinations = destinations or {}
+    targets = []
+    results = {}
+    for interface, sock in sockets.items():
+        try:
+            destination = destinations.get(interface) or get_multicast_config(interface)
+        except (ValueError, KeyError, TypeError) as e:
+            results[interface] = e
+            continue
+        if sock is None:
+            results[interface] = ConnectionError(f"No socket connection for interface : {interface}")
+            continue
+        targets.append((interface, sock, destination))
+    payload = memoryview(message)
+    for _ in range(repeat):
+        for interface, sock, destination in targets:
+            try:
+                sock.sendto(payload, destination)
+                results.setdefault(interface, None)
+            except OSError as e:
+                results[interface] = e
+    return results
@@ -1,12 +1,7 @@
-import threading
 import signal
 import sys
 import os
-import asyncio
 import queue
-from nats.aio.client import Client as NATS
-import time
-import yaml
 import json
 #from src.rmacs_server_fsm import main as rmacs_server_main
 #from src.rmacs_client_fsm import main as rmacs_client_main
@@ -16,9 +11,10 @@ parent_directory = os.path.abspath(os.path.dirname(__file__))
 if parent_directory not in sys.path:
    sys.path.append(parent_directory)
 
-from config import create_default_config, load_config
+from config import create_default_config, load_config, get_config_store
 from logging_config import logger
-from rmacs_util import get_interface_operstate, get_channel_bw, kill_process_by_pid, run_command
+from rmacs_util import probe_interfaces
+from process_supervisor import ProcessSupervisor
 config_file_path = '/etc/meshshield/rmacs_config.yaml'
 CONFIG_DIR = "/etc/meshshield"
 
@@ -39,6 +35,7 @@ async def connect_nats(nats_server_url):
     Returns:
         NATS: An instance of the connected NATS client.
     """
+    from nats.aio.client import Client as NATS
     nc = NATS()
     try:
         await nc.connect(nats_server_url)
@@ -141,6 +138,7 @@ async def nats_subscriber(config):
     rmacs_sub_topic = config['NATS_Config']['rmacs_sub_topic']
     rmacs_pub_topic = config['NATS_Config']['rmacs_pub_topic']
 
+    nc = None
     try:
         # Connect to NATS
         nc = await connect_nats(nats_server_url)
@@ -163,87 +161,54 @@ async def nats_subscriber(config):
         await publish_to_topic(nc, rmacs_pub_topic, "Current mesh operating frequency")
 
         # Keep the connection alive
-        while True:
+        import asyncio
+        while not graceful_shutdown:
             await asyncio.sleep(1)
 
     except Exception as e:
         logger.error(f"Error in NATS subscription: {e}")
 
     finally:
-        await nc.drain()
+        if nc is not None:
+            await nc.drain()
 
 async def run_with_nats(config):
     """
-    Runs the NATS subscriber concurrently.
+    Runs the NATS subscriber concurrently with the supervised RMACS scripts.
     """
+    import asyncio
+    logger.info("Starting RMACS scripts...")
+    supervisor = start_rmacs_scripts(config)
     try:
-        # Start the RMACS scripts in a thread using run_in_executor
-        loop = asyncio.get_running_loop()
-        logger.info("Starting RMACS scripts...")
-        rmacs_task = loop.run_in_executor(None, start_rmacs_scripts, config)
-
-        # Wait for NATS subscriber task
         await nats_subscriber(config)
-        await rmacs_task
+        # Keep supervising the scripts if NATS is not available
+        while not graceful_shutdown:
+            await asyncio.sleep(1)
 
     except Exception as e:
         logger.error(f"Error in NATS scripts: {e}")
         raise
 
+    finally:
+        supervisor.stop()
+        logger.info(f"RMACS scripts stopped: {supervisor.status()}")
 
-      
-def start_rmacs_server(args) -> None:
-    """
-    Start rmacs server script
 
-    param args: Configuration options.
+def start_rmacs_scripts(config) -> ProcessSupervisor:
     """
-    try:
-        # Start or restart the service using systemctl
-        run_command(["rmacs_server"],args,
-            "Failed to start rmacs_server service")
-    except Exception as e:
-        logger.error(f"Failed to start rmacs_server service: {e}")
-        raise
-
-def start_rmacs_client(config, nats_msg_queue) -> None:
-    """
-    Start rmacs client script.
+    Start rmacs-related scripts based on configuration.
 
-    param args: Configuration options.
-    """
-    try:
-        # Start or restart the service using systemctl
-        run_command(["rmacs_client"],config,nats_msg_queue)
-    except Exception as e:
-        logger.error(f"Failed to start rmacs_client service: {e}")
-        raise
+    The scripts are supervised: a script which exits is restarted with backoff,
+    and a script which is already running is not started a second time.
 
-def start_rmacs_scripts(config) -> None:
+    :return: The running supervisor, stop() it to terminate the scripts.
     """
-    Start rmacs-related scripts based on configuration.
-    """
-    
-    try:
-        if config['RMACS_Config']['orchestra_node']:
-            #server_thread = threading.Thread(target=rmacs_server_main, args=(nats_msg_queue,))
-            #client_thread = threading.Thread(target=rmacs_client_main, args=(nats_msg_queue,))
-            server_thread = threading.Thread(target=start_rmacs_server, args=(config,))
-            client_thread = threading.Thread(target=start_rmacs_client, args=(config,))
-            server_thread.start()
-            client_thread.start()
-            server_thread.join()
-            client_thread.join()
-        else:
-            #client_thread = threading.Thread(target=rmacs_client_main, args=(nats_msg_queue,))
-            client_thread = threading.Thread(target=start_rmacs_client, args=(config,))
-            client_thread.start()
-            client_thread.join()
-            
-        
-    except Exception as e:
-        logger.info(f"Error starting rmacs server/client scripts: {e}")
-        raise Exception(e)
+    supervisor = ProcessSupervisor(log_file=config['RMACS_Config']['log_file'])
+    if config['RMACS_Config']['orchestra_node']:
+        supervisor.add("rmacs_server")
+    supervisor.add("rmacs_client")
+    supervisor.start()
+    return supervisor
  
 
 def create_rmacs_config():
@@ -266,9 +231,11 @@ def update_rmacs_config(new_rmacs_config):
             logger.warning(f"Unknown configuration section: {section}")
     # Save the updated configuration to the file
     try:
+        import yaml
         with open(config_file_path, "w") as config_file:
             yaml.dump(config, config_file, sort_keys=False)
             logger.info(f"Configuration saved to {config_file_path}")
+        get_config_store(config_file_path).invalidate()
     except Exception as e:
         logger.error(f"Failed to save configuration to {config_file_path}: {e}")
 
@@ -278,9 +245,9 @@ def check_radio_interface(config, primary_radio):
     # Load the configuration
     #config = load_config(config_file_path)
     radio_interfaces = config['RMACS_Config']['radio_interfaces'] 
-    for interface in radio_interfaces:
-        if get_interface_operstate(interface):
-            logger.info(f'Radio interface:[{interface}] is up with channel BW : {get_channel_bw(interface)}MHz')
+    for interface, (is_up, channel_bw) in probe_interfaces(radio_interfaces).items():
+        if is_up:
+            logger.info(f'Radio interface:[{interface}] is up with channel BW : {channel_bw}MHz')
         else:
             if interface == primary_radio:
                 logger.error(f'Primary radio:[{interface}] is not up')
@@ -310,10 +277,9 @@ def main():
     primary_radio = config['RMACS_Config']['primary_radio']
     # Check radio status 
     check_radio_interface(config,primary_radio)
-    count = 1
-    start_rmacs_scripts(config)
     
     # Start the RMACS scripts and NATS subscriber
+    import asyncio
     asyncio.run(run_with_nats(config))
         
 
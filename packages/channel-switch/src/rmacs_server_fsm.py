@@ -1,10 +1,7 @@
 import threading
 import time
-import uuid
-import subprocess
 import os
 import sys
-import json
 import signal
 import atexit
 
@@ -16,21 +13,33 @@ parent_directory = os.path.abspath(os.path.dirname(__file__))
 if parent_directory not in sys.path:
    sys.path.append(parent_directory)
 
-from config import load_config
+from startup_profile import profiler, enable_from_args
+from config import thaw_config, validate_config_changes
+from runtime_config import RuntimeConfig
 
 config_file_path = '/etc/meshshield/rmacs_config.yaml'
-from rmacs_util import get_mesh_freq, get_mac_address, get_interface_operstate, get_channel_bw, path_lookup
+from rmacs_util import get_mesh_freq, probe_interfaces, channel_switch_announcement
+from interface_registry import get_registry
+from nl80211 import CSA_BUSY
 from logging_config import logger
-from rmacs_comms import rmacs_comms, send_data
+from rmacs_comms import rmacs_comms, send_fanout
+from config_watcher import ConfigWatcher
+from channel_monitor import ChannelMonitor
+from rmacs_transport import MulticastTransport
+from dedup_cache import MessageIdCache
+from delivery_tracker import AckTracker
+from metrics_exporter import RmacsMetrics, MetricsExporter
 
 
-action_to_id = {
-    "bad_channel_quality_index": 0,
-    "channel_quality_report": 1,
-    "operating_frequency": 2,
-    "switch_frequency": 3
-}
-id_to_action = {v: k for k, v in action_to_id.items()}
+from rmacs_codec import action_to_id, id_to_action, new_message_id, encode_message
+
+
+# RMACS_Config keys which are applied to a running server without a restart
+SERVER_RELOADABLE_KEYS = (
+    "seq_limit", "hop_interval", "stability_threshold", "report_expiry_threshold",
+    "channel_bandwidth", "beacon_count", "buffer_period", "bcqi_threshold_time",
+    "periodic_operating_freq_broadcast", "freq_list",
+)
 
 
 class ServerState(Enum):
@@ -88,6 +97,7 @@ class RMACSServerFSM:
         if key in self.transitions:
             next_state, action = self.transitions[key]
             logger.info(f'{self.state} -> {next_state}')
+            self.server.metrics.transition(self.state, next_state)
             self.state = next_state
             if action:
                 action(event)
@@ -97,24 +107,33 @@ class RMACSServerFSM:
 
 
 class RMACSServer:
-    def __init__(self):
+    def __init__(self, rconfig: RuntimeConfig = None):
         """
         Initializes the RMACS Server object.
 
+        :param rconfig: Runtime configuration, built from the configuration file if not given.
         """
         # Initialize server objects and attributes
         self.running = False
         self.fsm = RMACSServerFSM(self)
-        config = load_config(config_file_path)
-        self.interface = config['RMACS_Config']['primary_radio']
-        self.freq_quality_report = config['RMACS_Config']['freq_quality_report']
-        self.seq_limit = config['RMACS_Config']['seq_limit']
-        self.hop_interval = config['RMACS_Config']['hop_interval']
-        self.stability_threshold = config['RMACS_Config']['stability_threshold']
+        self.rconfig = rconfig if rconfig is not None else RuntimeConfig.from_file(config_file_path)
+        rconfig = self.rconfig
+        self.interface = rconfig.interface
+        # The report is updated at runtime, keep a private mutable copy of it
+        self.freq_quality_report = thaw_config(rconfig.freq_quality_report)
+        self.seq_limit = rconfig.seq_limit
+        self.hop_interval = rconfig.hop_interval
+        self.stability_threshold = rconfig.stability_threshold
         # Control channel interfaces
-        self.ch_interfaces = config['RMACS_Config']['radio_interfaces']
+        self.ch_interfaces = rconfig.radio_interfaces
         self.sockets: Dict = {}
-        self.listen_threads: list = []
+        # Receives the messages of all interfaces on one event loop
+        self.transport = MulticastTransport(self.handle_message, name="rmacs-server-transport",
+                                            buffer_size=rconfig.receive_buffer_size)
+        self.last_received_bcqi_alert: float = 0
+        # Clients heard from, {device: last seen} and switch request acknowledgements
+        self.peers: Dict = {}
+        self.ack_tracker: AckTracker = None
         
         # Receive msg 
         self.bad_channel_message: Dict = {}
@@ -123,18 +142,18 @@ class RMACSServer:
         # Variables for Partial Frequency Hopping
         self.top_freq_stability_counter = 0
         self.pfh_index = 0
-        self.seq_limit = config['RMACS_Config']['seq_limit']
+        self.seq_limit = rconfig.seq_limit
         self.sorted_frequencies: list = [] 
         self.top_freq = 0
-        self.report_expiry_threshold = config['RMACS_Config']['report_expiry_threshold']
+        self.report_expiry_threshold = rconfig.report_expiry_threshold
         
         # Variables for Channel Switch 
-        self.channel_bandwidth: int = config['RMACS_Config']['channel_bandwidth']
-        self.beacon_count: int = config['RMACS_Config']['beacon_count']
-        self.buffer_period: int = config['RMACS_Config']['buffer_period']
+        self.channel_bandwidth: int = rconfig.channel_bandwidth
+        self.beacon_count: int = rconfig.beacon_count
+        self.buffer_period: int = rconfig.buffer_period
         
         # BCQI 
-        self.bcqi_threshold_time = config['RMACS_Config']['bcqi_threshold_time']
+        self.bcqi_threshold_time = rconfig.bcqi_threshold_time
 
         # Initialize the lock for thread-safe access
         self.lock = threading.Lock()
@@ -144,16 +163,30 @@ class RMACSServer:
         
         # Time for periodic events' variables (in seconds)
         self.last_operating_freq_broadcast: float = time.time()
-        self.periodic_operating_freq_broadcast = config['RMACS_Config']['periodic_operating_freq_broadcast']
+        self.periodic_operating_freq_broadcast = rconfig.periodic_operating_freq_broadcast
 
         # Internal Attributes
         self.operating_frequency: int = get_mesh_freq(self.interface)
-        self.mac_address: str = get_mac_address(self.interface)
+        self.mac_address: str = get_registry().mac(self.interface)
         self.switch_freq: int = self.operating_frequency
         
-        # A set to store the unique IDs of processed messages
-        self.processed_ids = set()
-        self.msg_id_lock = threading.Lock()
+        # Bounded, expiring set of the unique IDs of processed messages
+        self.processed_ids = MessageIdCache(rconfig.dedup_capacity, rconfig.dedup_ttl)
+        
+        # Configuration hot-reload
+        self.config_watcher = ConfigWatcher(config_file_path)
+        self.config_watcher.add_listener(self.apply_config_update)
+
+        # Operating frequency kept current from nl80211 channel switch events
+        self.channel_monitor = ChannelMonitor([self.interface])
+
+        # Prometheus metrics, served on /metrics if enabled
+        self.metrics = RmacsMetrics("server")
+        self.metrics.add_collector(lambda: self.metrics.current_state(self.fsm.state, ServerState))
+        self.metrics.add_collector(lambda: self.metrics.transport(self.transport, self.processed_ids))
+        self.metrics.add_collector(self.collect_channel_quality)
+        self.metrics_exporter = (MetricsExporter(self.metrics, rconfig.metrics_address, rconfig.metrics_server_port)
+                                 if rconfig.metrics_enabled else None)
 
     def start(self) -> None:
         """
@@ -161,25 +194,34 @@ class RMACSServer:
         """
         try:     
             self.running = True
+            self.channel_monitor.start()
+            if self.metrics_exporter is not None:
+                self.metrics_exporter.start()
             # Establish socket connections for all interfaces
-            for interface in self.ch_interfaces:
-                if get_interface_operstate(interface):
-                    logger.info(f'Radio interface:[{interface}] is up with channel BW : {get_channel_bw(interface)}MHz')
+            for interface, (is_up, channel_bw) in probe_interfaces(self.ch_interfaces).items():
+                if is_up:
+                    logger.info(f'Radio interface:[{interface}] is up with channel BW : {channel_bw}MHz')
                     try:
-                        socket = rmacs_comms(interface)
+                        socket = rmacs_comms(interface, self.rconfig)
+                        if socket is None:
+                            continue
                         self.sockets[interface] = socket
-                        listen_thread = threading.Thread(target=self.receive_messages, args=(socket, interface))
-                        self.listen_threads.append(listen_thread)
-                        listen_thread.start()
-                        logger.info(f"Listening on interface: {interface}")
+                        self.transport.add_socket(interface, socket)
                     except ConnectionError as e:
                         logger.error(f"Connection error on {interface}: {e}")
                 else:
                     logger.info(f'Radio interface:[{interface}] is not up, cannot create a multicast socket connection to it.')
+            self.transport.start()
+            if self.rconfig.switch_ack_enabled:
+                self.ack_tracker = AckTracker(self.transport.loop, self.send_encoded,
+                                              self.rconfig.switch_ack_timeout, self.rconfig.switch_ack_max_retries)
+            profiler.mark("sockets listening")
             # Start the server FSM thread
             logger.info("Server started and listening...")
             self.run_server_fsm_thread = threading.Thread(target=self.run_server_fsm)
             self.run_server_fsm_thread.start()
+            self.config_watcher.start()
+            profiler.mark("fsm started")
 
         except Exception as e:
             logger.error(f"Unexpected error while starting server: {e}")
@@ -239,17 +281,20 @@ class RMACSServer:
         except Exception as e:
                 logger.info(f"Exception in update channel quality report: {e}")
         current_time = time.time()
-        # Check if the frequency exists; if not, add it
-        if self.freq not in self.freq_quality_report:
-            self.freq_quality_report[self.freq] = {'nodes': {}, 'Average_quality': 1}
-        # Update the node's quality data
-        self.freq_quality_report[self.freq]['nodes'][self.device_id] = {'quality': self.quality_index, 'timestamp':current_time}
-        self.update_average_quality(self.freq)
+        # The report is rebuilt by apply_config_update() when freq_list is reloaded
+        with self.lock:
+            # Check if the frequency exists; if not, add it
+            if self.freq not in self.freq_quality_report:
+                self.freq_quality_report[self.freq] = {'nodes': {}, 'Average_quality': 1}
+            # Update the node's quality data
+            self.freq_quality_report[self.freq]['nodes'][self.device_id] = {'quality': self.quality_index, 'timestamp':current_time}
+            self.update_average_quality(self.freq)
         logger.info(f"Updated Channel Quality Report: {self.freq_quality_report}")
         
     def update_average_quality(self, freq):
         """
         Recalculate the average quality for a specific frequency, considering only recent reports.
+        Called with self.lock held.
         :param freq: Frequency to recalculate average quality for
         """
         node_reports = self.freq_quality_report[freq]['nodes']
@@ -280,6 +325,16 @@ class RMACSServer:
         logger.info(f'Channel quality report is {self.freq_quality_report}')
     
 
+    def collect_channel_quality(self) -> None:
+        """
+        Copy the average quality of the frequencies into the metrics.
+        """
+        with self.lock:
+            report = [(freq, item['Average_quality']) for freq, item in self.freq_quality_report.items()]
+        self.metrics.average_quality.clear()
+        for freq, quality in report:
+            self.metrics.average_quality.set(quality, freq)
+
     def broadcast_operating_freq(self, trigger_event) -> None:
         """
         Broadcast Operating frequency to all clients.
@@ -288,31 +343,44 @@ class RMACSServer:
         """
         try:
             action_id: int = action_to_id["operating_frequency"]
-            freq = get_mesh_freq(self.interface)
-            message_id: str = str(uuid.uuid4())  
+            freq = self.channel_monitor.get_frequency(self.interface)
+            message_id: int = new_message_id()  
             operating_freq_data = {'a_id': action_id, 'freq': freq, 'message_id': message_id, 'device': self.mac_address }
             logger.info(f"Brodcasting operating freq : {operating_freq_data}")
-             # Loop through the sockets dictionary and send data
-            for interface, socket in self.sockets.items():
-                self.send_to_socket(socket, operating_freq_data, interface)
+            self.send_to_all(operating_freq_data)
             self.fsm.trigger(ServerEvent.BROADCAST_COMPLETE)
         except Exception as e:
             logger.info(f"Broadcast operating frequency error: {e}")
     
-    def send_to_socket(self, socket, data, interface):
-        try:
-            send_data(socket, data, interface)
-            logger.info(f"Successfully sent data to {interface}")
-        except Exception as e:
-            logger.error(f"Error sending data to {interface}: {e}")
-        
-        
-    # Adaptive frequency hopping with dynamic intervals and exit condition based on top frequency stability
-    
+    def send_to_all(self, data, repeat: int = 1) -> dict:
+        """
+        Encode a message once and send it to every connected interface.
+
+        :param data: Message payload.
+        :param repeat: Number of times the message is sent on every interface.
+        :return: Dict of {interface: None on success or the send error}.
+        """
+        return self.send_encoded(encode_message(data, self.rconfig.wire_format), repeat)
+
+    def send_encoded(self, message: bytes, repeat: int = 1) -> dict:
+        """
+        Send an encoded message to every connected interface.
+        """
+        results = send_fanout(self.sockets, message, self.rconfig.multicast, repeat)
+        self.metrics.sent(results)
+        for interface, error in results.items():
+            if error is None:
+                logger.info(f"Successfully sent data to {interface}")
+            else:
+                logger.error(f"Error sending data to {interface}: {error}")
+        return results
+
     def partial_frequency_hopping(self, trigger_event) -> None:
         
         try:
-            self.sorted_frequencies = sorted(self.freq_quality_report.items(),key=lambda item: item[1]['Average_quality'])
+            # The report is rebuilt by apply_config_update() when freq_list is reloaded
+            with self.lock:
+                self.sorted_frequencies = sorted(self.freq_quality_report.items(),key=lambda item: item[1]['Average_quality'])
             logger.info(f'Sorted freq : {self.sorted_frequencies}  ')
             self.top_freq = self.sorted_frequencies[0][0]
             self.seq_limit = min(self.seq_limit, len(self.sorted_frequencies))
@@ -351,11 +419,13 @@ class RMACSServer:
                     result = self.switch_frequency(self.switch_freq, self.interface, self.channel_bandwidth, self.beacon_count)
                     if result:
                         logger.info("Waiting for CSA to be established")
-                        time.sleep(self.beacon_count + self.buffer_period)
-                    if get_mesh_freq(self.interface) == self.switch_freq:
-                       logger.info(f" CSA is successfull, Node switched to new operating freq : {get_mesh_freq(self.interface)}")
+                        self.channel_monitor.wait_for_switch(self.interface, self.switch_freq,
+                                                             self.beacon_count + self.buffer_period)
+                    current_freq = self.channel_monitor.get_frequency(self.interface)
+                    if current_freq == self.switch_freq:
+                       logger.info(f" CSA is successfull, Node switched to new operating freq : {current_freq}")
                     else:
-                       logger.info(f" CSA is not successfull, current operating freq : {get_mesh_freq(self.interface)}")
+                       logger.info(f" CSA is not successfull, current operating freq : {current_freq}")
                     self.fsm.trigger(ServerEvent.CHANNEL_SWITCH_REQUEST)
 
                 if self.top_freq_stability_counter >= self.stability_threshold:
@@ -372,28 +442,17 @@ class RMACSServer:
         if cur_freq == frequency:
             logger.info(f"Mesh node is currently operating at requested freq:{cur_freq} switch")
             return False 
-        iw_path = path_lookup('iw')
-        if iw_path is not None:
-            run_cmd = f"{iw_path} dev {interface} switch freq {frequency} HT{bandwidth} beacons {beacon_count}"
-            logger.info(f"+run_cmd: {run_cmd}")
-            try:
-                result = subprocess.run(run_cmd, 
-                                    shell=True, 
-                                    capture_output=True, 
-                                    text=True)
-                if(result.returncode != 0):
-                    logger.info("Failed to execute the switch frequency command")
-                    return False
-                else:
-                    logger.info("Channel Switch cmd run successfully!")
-                    return True
-
-            except subprocess.CalledProcessError as e:
-                logger.info(f"Error: {e}")
-                return False
-            
-        else:
-            logger.warning(f"iw utility is not found")
+        error = channel_switch_announcement(frequency, interface, bandwidth, beacon_count)
+        self.metrics.channel_switch(error)
+        if error == CSA_BUSY:
+            # A switch is already in progress, e.g. one relayed by a mesh peer
+            logger.info("Channel switch already in progress")
+            return True
+        if error is not None:
+            logger.info(f"Failed to execute the switch frequency command: {error}")
+            return False
+        logger.info("Channel Switch cmd run successfully!")
+        return True
 
 
     def send_switch_frequency_message(self, trigger_event) -> None:
@@ -404,91 +463,126 @@ class RMACSServer:
         """
         logger.info('Sending channel switch request...')
         action_id = action_to_id["switch_frequency"]
-        message_id = str(uuid.uuid4())  # Generate a new ID at the end of the healing process
+        message_id = new_message_id()  # Generate a new ID at the end of the healing process
         switch_frequency_data = {'a_id': action_id, 'freq': self.switch_freq, 'message_id': message_id, 'device': self.mac_address}
         logger.info(f"The switch info is : {switch_frequency_data}")     
-        # Loop through the sockets dictionary and send data
-        for interface, socket in self.sockets.items():
-            self.send_to_socket(socket, switch_frequency_data, interface)
+        message = encode_message(switch_frequency_data, self.rconfig.wire_format)
+        self.send_encoded(message)
+        if self.ack_tracker is not None:
+            delivery = self.ack_tracker.track(message_id, message, self.active_peers())
+            self.wait_for_switch_delivery(delivery)
         self.fsm.trigger(ServerEvent.CHANNEL_SWITCH_REQUEST_SENT)
+
+    def active_peers(self) -> set:
+        """
+        Devices heard from within the peer expiry time.
+        """
+        deadline = time.monotonic() - self.rconfig.peer_expiry_time
+        return {device for device, last_seen in list(self.peers.items()) if last_seen >= deadline}
+
+    def wait_for_switch_delivery(self, delivery) -> bool:
+        """
+        Wait until every client acknowledged the switch request or the retransmissions ran out.
+
+        :param delivery: Delivery returned by the AckTracker.
+        :return: True if all expected clients acknowledged the request.
+        """
+        # Time needed for all retransmissions with exponential backoff, plus the last wait
+        timeout = self.rconfig.switch_ack_timeout * (2 ** (self.rconfig.switch_ack_max_retries + 1))
+        delivered = delivery.wait(timeout)
+        latencies = {device: f"{latency * 1000:.1f}ms" for device, latency in delivery.latency.items()}
+        if delivered:
+            logger.info(f"Switch request {delivery.message_id} acknowledged by all clients after {delivery.attempts} attempts: {latencies}")
+        else:
+            logger.warning(f"Switch request {delivery.message_id} not acknowledged by {sorted(delivery.pending)}, acknowledged: {latencies}")
+        return delivered
         
 
-    def receive_messages(self, socket, interface) -> None:
+    async def handle_message(self, parsed_message, interface, address) -> None:
         """
-        Handles incoming messages from the client.
+        Handles a message from a client, dispatched by the multicast transport.
         """
-        logger.info("RMACS server receive msg is started.........")
-        current_received_bcqi_alert = 0
-        last_received_bcqi_alert = 0
-        while self.running:
-            try:
-                # Receive incoming messages and decode the netstring encoded data
-                try:
-                    data, address = socket.recvfrom(1024)
-                    data = data.decode('utf-8')
-                    logger.debug(f"Received message from {address[0]}")
-                    # Parse the JSON message
-                    parsed_message = json.loads(data)
-                except Exception as e:
-                    # Handle netstring decoding errors
-                    logger.info(f"Failed to decode netstring from interface: {interface}")
-                    break
+        logger.debug(f"Received message from {address[0]}")
+        message_id = parsed_message.get("payload", {}).get("message_id")
+        if not self.processed_ids.check_and_add(message_id):
+            logger.debug(f"Duplicate Msg: Message with ID {message_id} has already been processed and was received via interface : {interface}. Ignoring.")
+            return
+        logger.debug(f"New Msg: Processing Message with ID : {message_id} via interface : {interface}")
+        action_id: int = parsed_message.get("payload", {}).get("a_id")
+        action_str: str = id_to_action.get(action_id)
+        sender: str = parsed_message.get("payload", {}).get("device")
+        if sender and sender != self.mac_address:
+            self.peers[sender] = time.monotonic()
+
+        # Bad channel quality index received from client
+        if action_str == "bad_channel_quality_index":
+            current_received_bcqi_alert = time.time()
+            device_id = parsed_message.get("payload", {}).get("device")
+            bcqi_reported_freq = parsed_message.get("payload", {}).get("freq")
+            channel_quality_index = parsed_message.get("payload", {}).get("qual")
+            current_operating_freq = self.channel_monitor.get_frequency(self.interface)
+            logger.info(f"Received BCQI report for freq :{bcqi_reported_freq} of channel quality index : {channel_quality_index} from device : {device_id} via interface : {interface}")
+            if current_operating_freq == bcqi_reported_freq:
+                if (current_received_bcqi_alert - self.last_received_bcqi_alert) > self.bcqi_threshold_time:
+                    logger.info(f"The current rec bcqi alert : {current_received_bcqi_alert}")
+                    logger.info(f"The last rec bcqi alert : {self.last_received_bcqi_alert}")
+                    logger.info(f"The bcqi threshold time : {self.bcqi_threshold_time}")
+                    logger.info(f" the time diff : {current_received_bcqi_alert - self.last_received_bcqi_alert}")
+                    self.last_received_bcqi_alert = current_received_bcqi_alert
+                    logger.info(f"Received BCQI report for freq:{bcqi_reported_freq} from device :{device_id} is for the current operating freq : {current_operating_freq} via interface : {interface}")
+                    self.bad_channel_message = parsed_message
+                else:
+                    logger.info(f"Received BCQI report for freq : {bcqi_reported_freq} from device : {device_id} at time : {current_received_bcqi_alert} via interface : {interface} is considered as duplicate message, since similar msg from other client prior to this msg is already addressed")
+            else:
+                logger.info(f"Received BCQI report for freq:{bcqi_reported_freq} not for current operating freq : {current_operating_freq} via interface : {interface}")
+                logger.info("Not required to trigger partial frequency hopping")
+
+        # Channel report received from client
+        elif action_str == "channel_quality_report":
+            self.channel_report_message = parsed_message
+            logger.info(f"The report is {self.channel_report_message}")
+
+        # Client acknowledged a switch request
+        elif action_str == "switch_frequency_ack":
+            if self.ack_tracker is not None and sender != self.mac_address:
+                ack_id = parsed_message.get("payload", {}).get("ack_id")
+                latency = self.ack_tracker.acknowledge(ack_id, sender)
+                if latency is not None:
+                    logger.info(f"Switch request {ack_id} acknowledged by {sender} in {latency * 1000:.1f}ms via interface : {interface}")
+
+    def apply_config_update(self, changes, snapshot=None) -> bool:
+        """
+        Apply changed configuration values to the running server.
 
-                # Deserialize the MessagePack message
-                try:
-                    message_id = parsed_message.get("payload", {}).get("message_id")
-                    with self.msg_id_lock:
-                        if message_id in self.processed_ids:
-                            logger.debug(f"Duplicate Msg: Message with ID {message_id} has already been processed and was received via interface : {interface}. Ignoring.")
-                        else:
-                            logger.debug(f"New Msg: Processing Message with ID : {message_id} via interface : {interface}")
-                            device_id: str = parsed_message.get("payload", {}).get("device")
-                            # Add the unique ID to the processed set
-                            self.processed_ids.add(message_id)
-                            action_id: int = parsed_message.get("payload", {}).get("a_id")
-                            action_str: str = id_to_action.get(action_id)
-    
-                            # Bad channel quality index received from client
-                            if action_str == "bad_channel_quality_index":
-                                current_received_bcqi_alert = time.time()
-                                device_id = parsed_message.get("payload", {}).get("device")
-                                bcqi_reported_freq = parsed_message.get("payload", {}).get("freq")
-                                channel_quality_index = parsed_message.get("payload", {}).get("qual")
-                                current_operating_freq = get_mesh_freq(self.interface)
-                                logger.info(f"Received BCQI report for freq :{bcqi_reported_freq} of channel quality index : {channel_quality_index} from device : {device_id} via interface : {interface}")
-                                if current_operating_freq == bcqi_reported_freq:
-                                    if (current_received_bcqi_alert - last_received_bcqi_alert) > self.bcqi_threshold_time:
-                                        logger.info(f"The current rec bcqi alert : {current_received_bcqi_alert}")
-                                        logger.info(f"The last rec bcqi alert : {last_received_bcqi_alert}")
-                                        logger.info(f"The bcqi threshold time : {self.bcqi_threshold_time}")
-                                        logger.info(f" the time diff : {current_received_bcqi_alert - last_received_bcqi_alert}")
-                                        last_received_bcqi_alert = current_received_bcqi_alert
-                                        logger.info(f"Received BCQI report for freq:{bcqi_reported_freq} from device :{device_id} is for the current operating freq : {current_operating_freq} via interface : {interface}")
-                                        self.bad_channel_message = data
-                                    else:
-                                        logger.info(f"Received BCQI report for freq : {bcqi_reported_freq} from device : {device_id} at time : {current_received_bcqi_alert} via interface : {interface} is considered as duplicate message, since similar msg from other client prior to this msg is already addressed")
-                                else:
-                                    logger.info(f"Received BCQI report for freq:{bcqi_reported_freq} not for current operating freq : {current_operating_freq} via interface : {interface}")
-                                    logger.info("Not required to trigger partial frequency hopping")
-                                    parsed_message = {}
-                                #self.bad_channel_message = data
-
-                            # Channel report received from client
-                            elif action_str == "channel_quality_report":
-                                #self.channel_report_message = data
-                                self.channel_report_message = parsed_message
-                                if not self.channel_report_message:
-                                    logger.info("Channel quality is empty.")
-                                else:
-                                    logger.info(f"The report is {self.channel_report_message}")
-                                parsed_message = {}
-                except Exception as e:
-                    logger.error(f"Error in received message: {e}")
-                    continue
+        The update is all or nothing: if any value is invalid the whole change set is
+        rejected and the server keeps running with its current settings. Sockets,
+        FSM state and the collected channel quality report are preserved.
 
-            except ConnectionResetError:
-                logger.error("Connection forcibly closed by the remote host")
-                break
+        :param changes: Changed keys as returned by config.diff_config().
+        :param snapshot: The new configuration snapshot (unused).
+        :return: True if the update was applied, False if it was rejected.
+        """
+        updates, rejected, ignored = validate_config_changes(changes, SERVER_RELOADABLE_KEYS)
+        if ignored:
+            logger.info(f"Configuration keys need a server restart to take effect: {ignored}")
+        if rejected:
+            logger.error(f"Rejected configuration update, invalid values: {rejected}")
+            return False
+        if not updates:
+            return True
+        with self.lock:
+            freq_list = updates.pop("freq_list", None)
+            if freq_list is not None:
+                # Keep the reports of frequencies still in use, drop the removed ones
+                self.freq_quality_report = {
+                    freq: self.freq_quality_report.get(freq, {'nodes': {}, 'Average_quality': 1})
+                    for freq in freq_list
+                }
+                self.pfh_index = 0
+            for key, value in updates.items():
+                setattr(self, key, value)
+        logger.info(f"Applied configuration update: {updates}{' and freq_list' if freq_list is not None else ''}")
+        return True
 
     def reset(self):
         """
@@ -504,11 +598,17 @@ class RMACSServer:
         logger.info("Stopping the RMACS server...")
         try:
             self.running = False
+            self.config_watcher.stop()
+            self.channel_monitor.stop()
+            if self.metrics_exporter is not None:
+                self.metrics_exporter.stop()
 
             if self.run_server_fsm_thread.is_alive():
                 self.run_server_fsm_thread.join()
                 logger.info("RMACS Server FSM thread stopped.")
 
+            self.transport.stop()
+
             for interface, socket in self.sockets.items():
                 try:
                     socket.close()
@@ -516,11 +616,6 @@ class RMACSServer:
                 except Exception as e:
                     logger.error(f"Error closing socket on interface {interface}: {e}")
 
-            for thread in self.listen_threads:
-                if thread.is_alive():
-                    thread.join()
-                    logger.info(f"Listener thread {thread.name} stopped.")
-
             self.reset()
             logger.info("Server attributes reset.")
 
@@ -557,12 +652,15 @@ def main():
     Main entry point for the RMACS server.
     """
     server: RMACSServer = None
+    enable_from_args("rmacs_server")
 
     try:
         server = RMACSServer()
+        profiler.mark("server init")
         register_exit_handlers(server)
         server.start()
         logger.info("RMACS server is running...")
+        profiler.report()
 
     except Exception as e:
         logger.error(f"Unexpected error in the server: {e}")
@@ -0,0 +1,162 @@
+import asyncio
+import socket
+import threading
+
+from logging_config import logger
+from rmacs_codec import decode_message
+
+
+class MulticastTransport:
+    '''
+    Receive RMACS multicast messages of all radio interfaces on a single asyncio event loop.
+
+    The rmacs_comms() sockets are switched to non-blocking mode and registered with
+    loop.add_reader(), so one loop replaces the per-interface receiver threads.
+    Every decoded message is dispatched to the handler coroutine
+    handler(message, interface, address).
+
+    The transport runs its own event loop in a thread, or attaches to an existing
+    loop (e.g. the one running a NATS client) when one is given to start().
+
+    Datagrams are received with recvmsg_into() into one preallocated buffer per
+    socket, and every wake-up drains all pending datagrams (up to max_batch).
+    Datagrams larger than the buffer are detected through MSG_TRUNC and dropped,
+    malformed ones are counted, neither stops the listener.
+
+    Attributes:
+    received : Number of datagrams received.
+    truncated : Number of datagrams dropped because they did not fit the buffer.
+    malformed : Number of datagrams which could not be decoded.
+    wakeups : Number of times a socket became readable.
+    '''
+    def __init__(self, handler, name: str = "rmacs-transport", buffer_size: int = 2048, max_batch: int = 64):
+        self.handler = handler
+        self.name = name
+        self.buffer_size = buffer_size
+        self.max_batch = max_batch
+        self.sockets: dict = {}
+        self.buffers: dict = {}
+        self.received = 0
+        self.truncated = 0
+        self.malformed = 0
+        self.wakeups = 0
+        self.loop: asyncio.AbstractEventLoop = None
+        self.thread: threading.Thread = None
+        self.own_loop = False
+        self.tasks: set = set()
+
+    def add_socket(self, interface: str, sock) -> None:
+        """
+        Start receiving on the socket of an interface.
+        """
+        sock.setblocking(False)
+        self.sockets[interface] = sock
+        self.buffers[interface] = memoryview(bytearray(self.buffer_size))
+        if self.loop is not None:
+            self.loop.call_soon_threadsafe(self._register, interface, sock)
+
+    def start(self, loop: asyncio.AbstractEventLoop = None) -> None:
+        """
+        Start dispatching received messages.
+
+        :param loop: Running event loop to attach to, a new loop is run in a thread if not given.
+        """
+        if loop is not None:
+            self.loop = loop
+            self.own_loop = False
+            for interface, sock in self.sockets.items():
+                loop.call_soon_threadsafe(self._register, interface, sock)
+            return
+        self.loop = asyncio.new_event_loop()
+        self.own_loop = True
+        for interface, sock in self.sockets.items():
+            self._register(interface, sock)
+        self.thread = threading.Thread(target=self._run_loop, name=self.name)
+        self.thread.start()
+
+    def submit(self, coro):
+        """
+        Run a coroutine on the transport loop from any thread.
+
+        :return: concurrent.futures.Future of the coroutine result.
+        """
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def stats(self) -> dict:
+        """
+        Return the receive counters.
+        """
+        return {"received": self.received, "truncated": self.truncated,
+                "malformed": self.malformed, "wakeups": self.wakeups}
+
+    def stop(self) -> None:
+        """
+        Stop receiving and, if the transport owns it, stop the event loop.
+        The sockets are left open, they belong to the caller.
+        """
+        if self.loop is None or self.loop.is_closed():
+            return
+        try:
+            self.loop.call_soon_threadsafe(self._shutdown)
+        except RuntimeError:
+            # Loop already closed
+            return
+        if self.own_loop and self.thread is not None and self.thread is not threading.current_thread():
+            self.thread.join(timeout=5)
+            logger.info(f"Transport loop {self.name} stopped.")
+
+    def _run_loop(self) -> None:
+        asyncio.set_event_loop(self.loop)
+        logger.info(f"Transport loop {self.name} is running with {len(self.sockets)} sockets")
+        try:
+            self.loop.run_forever()
+        finally:
+            self.loop.close()
+
+    def _register(self, interface: str, sock) -> None:
+        self.loop.add_reader(sock.fileno(), self._on_readable, interface, sock)
+        logger.info(f"Listening on interface: {interface}")
+
+    def _shutdown(self) -> None:
+        for sock in self.sockets.values():
+            try:
+                self.loop.remove_reader(sock.fileno())
+            except (ValueError, OSError):
+                pass
+        for task in self.tasks:
+            task.cancel()
+        if self.own_loop:
+            self.loop.stop()
+
+    def _on_readable(self, interface: str, sock) -> None:
+        self.wakeups += 1
+        buffer = self.buffers[interface]
+        for _ in range(self.max_batch):
+            try:
+                nbytes, _, flags, address = sock.recvmsg_into([buffer])
+            except BlockingIOError:
+                return
+            except OSError as e:
+                logger.error(f"Receive error on interface {interface}: {e}")
+                return
+            self.received += 1
+            if flags & socket.MSG_TRUNC:
+                self.truncated += 1
+                logger.warning(f"Dropped datagram larger than {self.buffer_size} bytes from {address[0]} via interface: {interface}")
+                continue
+            try:
+                # The decoded message holds copies, the buffer is reused for the next datagram
+                message = decode_message(buffer[:nbytes])
+            except ValueError as e:
+                self.malformed += 1
+                logger.info(f"Failed to decode message from interface: {interface}: {e}")
+                continue
+            task = self.loop.create_task(self._dispatch(message, interface, address))
+            self.tasks.add(task)
+            task.add_done_callback(self.tasks.discard)
+
+    async def _dispatch(self, message: dict, interface: str, address) -> None:
+        try:
+            await self.handler(message, interface, address)
+        except Exception as e:
+            logger.error(f"Error in received message via interface {interface}: {e}")
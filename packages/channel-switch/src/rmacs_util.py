@@ -1,8 +1,13 @@
 import subprocess
 import re
+import os
+import signal
 import json
 from logging_config import logger
 import shutil
+from concurrent.futures import ThreadPoolExecutor
+from nl80211 import get_nl80211, center_frequency, ChannelSwitchError, CSA_FAILED, CSA_NOT_SUPPORTED
+from sysfs_reader import read_sysfs_text
 
 # Channel to frequency and frequency to channel mapping
 CH_TO_FREQ = {1: 2412, 2: 2417, 3: 2422, 4: 2427, 5: 2432, 6: 2437, 7: 2442, 8: 2447, 9: 2452, 10: 2457, 11: 2462,
@@ -25,8 +30,7 @@ def get_interface_operstate(interface : str) -> bool:
     """
     operstate_path = f"/sys/class/net/{interface}/operstate"
     try:
-        with open(operstate_path, "r") as file:
-            operstate = file.read().strip()
+        operstate = read_sysfs_text(operstate_path)
         if operstate.lower() == 'up':
             print(f"The operational state of {interface} is: up")
             return True
@@ -55,6 +59,20 @@ def get_phy_interface(interface : str) -> str:
         print(f"Interface {interface} not found.")
     except Exception as e:
         print(f"Error reading operstate: {e}")
+
+def get_interface_driver(interface : str) -> str:
+    """
+    Get the name of the kernel driver bound to the device of a network interface.
+    Path : /sys/class/net/<interface>/device/driver
+    Arguments:
+    interface: str -- Name of the network interface.
+    Return:
+    str: Driver name (e.g. ath9k, ath10k_pci, morse_sdio), None for virtual interfaces.
+    """
+    try:
+        return os.path.basename(os.readlink(f"/sys/class/net/{interface}/device/driver"))
+    except OSError:
+        return None
  
 '''       
 def get_ipv6_addr(interface) -> str:
@@ -80,6 +98,19 @@ def get_ipv6_addr(interface) -> str:
 
     
 def get_channel_bw(interface) -> int:
+    """
+    Get the channel width of the interface in MHz, through nl80211 if available.
+    """
+    nl80211 = get_nl80211()
+    if nl80211 is not None:
+        try:
+            return nl80211.get_interface(interface).width
+        except OSError as e:
+            logger.error(f"Get channel bw of {interface} failed: {e}")
+            return None
+    return _get_channel_bw_iw(interface)
+
+def _get_channel_bw_iw(interface) -> int:
     
     run_cmd = f"iw dev {interface} info | grep 'width' | awk '{{print $6}}'"
     try:
@@ -99,30 +130,99 @@ def get_channel_bw(interface) -> int:
         print(f"Error: {e}")
         return None
     
-def channel_switch_announcement(frequency: int, interface: str, bandwidth: int, beacons_count: int ) -> None:
-    if bandwidth in {5,10,80}:
-        run_cmd = f"iw dev {interface} switch freq {frequency} {bandwidth}MHz beacons {beacons_count}"
-    else:
-        run_cmd = f"iw dev {interface} switch freq {frequency} HT{bandwidth}+ beacons {beacons_count}"
-        
+def channel_switch_announcement(frequency: int, interface: str, bandwidth: int, beacons_count: int, block_tx: bool = False) -> str:
+    """
+    Start a channel switch of the interface, announced for beacons_count beacons.
+
+    The switch is requested over nl80211, `iw` is only run when nl80211 is not available.
+
+    :param frequency: Control channel frequency in MHz.
+    :param interface: Name of the network interface.
+    :param bandwidth: Channel width in MHz.
+    :param beacons_count: Number of beacons announcing the switch.
+    :param block_tx: Stop transmitting until the switch.
+    :return: None if the switch was started, otherwise the failure reason (nl80211.CSA_*).
+    """
+    nl80211 = get_nl80211()
+    if nl80211 is not None:
+        try:
+            nl80211.channel_switch(interface, frequency, bandwidth, beacons_count, block_tx)
+            return None
+        except ChannelSwitchError as e:
+            logger.error(f"{e.strerror} ({e.reason})")
+            return e.reason
+    return _channel_switch_iw(frequency, interface, bandwidth, beacons_count, block_tx)
+
+_iw_path = None
+
+def _channel_switch_iw(frequency: int, interface: str, bandwidth: int, beacons_count: int, block_tx: bool) -> str:
+    global _iw_path
+    if _iw_path is None:
+        _iw_path = path_lookup('iw')
+        if _iw_path is None:
+            logger.warning("iw utility is not found")
+            return CSA_NOT_SUPPORTED
     try:
-        result = subprocess.run(run_cmd, 
-                            shell=True, 
-                            capture_output=True, 
-                            text=True)
-        if(result.returncode != 0):
-            print("Failed to execute the switch frequency command")
+        if bandwidth == 20:
+            mode = "HT20"
+        elif bandwidth == 40:
+            mode = "HT40+" if center_frequency(frequency, bandwidth) > frequency else "HT40-"
+        else:
+            mode = f"{bandwidth}MHz"
+    except ChannelSwitchError as e:
+        logger.error(f"{e.strerror} ({e.reason})")
+        return e.reason
+    command = [_iw_path, "dev", interface, "switch", "freq", str(frequency), mode, "beacons", str(beacons_count)]
+    if block_tx:
+        command.append("block-tx")
+    logger.info(f"+run_cmd: {' '.join(command)}")
+    result = subprocess.run(command, capture_output=True, text=True)
+    if result.returncode != 0:
+        logger.error(f"Failed to execute the switch frequency command: {result.stderr.strip()}")
+        return CSA_FAILED
+    return None
+
+def probe_interfaces(interfaces) -> dict:
+    """
+    Probe operational state and channel bandwidth of several interfaces concurrently.
 
-    except subprocess.CalledProcessError as e:
-        print(f"Error: {e}")
-        return None
+    :param interfaces: Names of the network interfaces to probe.
+    :return: Dict of {interface: (is_up, channel_bw)}, channel_bw is None for interfaces which are down.
+    """
+    # Imported here, the registry is built on the helpers of this module
+    from interface_registry import get_registry
+    registry = get_registry()
+
+    def probe(interface):
+        state = registry.get(interface)
+        return interface, (bool(state.is_up), state.channel_bw)
+
+    interfaces = list(interfaces)
+    if not interfaces:
+        return {}
+    with ThreadPoolExecutor(max_workers=len(interfaces)) as executor:
+        return dict(executor.map(probe, interfaces))
 
 def get_mesh_freq(interface) -> int:
     """
     Get the mesh frequency of the device.
 
-    :return: An integer representing the mesh frequency.
+    Queried over the shared nl80211 socket, `iw dev` is only parsed when
+    nl80211 is not available.
+
+    :return: An integer representing the mesh frequency, None if the interface is not an operating mesh point.
     """
+    nl80211 = get_nl80211()
+    if nl80211 is None:
+        return _get_mesh_freq_iw(interface)
+    try:
+        info = nl80211.get_interface(interface)
+    except OSError as e:
+        logger.error(f"Get mesh freq exception: {e}")
+        return None
+    return info.freq if info.is_mesh else None
+
+def _get_mesh_freq_iw(interface) -> int:
     mesh_freq: int = None
 
     try:
@@ -158,8 +258,7 @@ def get_mesh_freq(interface) -> int:
 def get_mac_address(interface):
     mac_address_path = f"/sys/class/net/{interface}/address"
     try:
-        with open(mac_address_path, "r") as file:
-            mac_address = file.read().strip()
+        mac_address = read_sysfs_text(mac_address_path)
         if mac_address:
             logger.info(f"MAC address is : {mac_address}")
             return mac_address
@@ -171,6 +270,37 @@ def get_mac_address(interface):
     except Exception as e:
         print(f"Error reading operstate: {e}")
        
+def find_processes(process_name: str) -> list:
+    """
+    Find the processes with a given name through /proc.
+
+    A process matches if its command name or the program of its command line
+    (the script for interpreted programs, e.g. python3 /usr/bin/rmacs_server) is process_name.
+
+    param process_name: The name of the process to search for.
+
+    return: List of the PIDs of the matching processes.
+    """
+    pids = []
+    for entry in os.scandir('/proc'):
+        if not entry.name.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry.name}/comm", "rb") as file:
+                comm = file.read().strip().decode(errors="replace")
+            if comm == process_name[:15]:
+                pids.append(int(entry.name))
+                continue
+            with open(f"/proc/{entry.name}/cmdline", "rb") as file:
+                argv = file.read().split(b"\0")[:2]
+        except OSError:
+            # Exited in the meantime, or a kernel thread
+            continue
+        if any(os.path.basename(arg.decode(errors="replace")) == process_name for arg in argv):
+            pids.append(int(entry.name))
+    return pids
+
+
 def is_process_running(process_name: str) -> bool:
     """
     Check if a process with a given name is currently running.
@@ -179,15 +309,7 @@ def is_process_running(process_name: str) -> bool:
 
     return: True if the process is running, False otherwise.
     """
-    try:
-        ps_output = subprocess.check_output(['ps', 'aux']).decode('utf-8')
-        if process_name in ps_output:
-            return True
-        else:
-            return False
-    except subprocess.CalledProcessError as e:
-        logger.error(f"Error occurred while checking process: {e}")
-        return False
+    return bool(find_processes(process_name))
 
 
 def get_pid_by_process_name(process_name: str) -> int:
@@ -198,16 +320,8 @@ def get_pid_by_process_name(process_name: str) -> int:
 
     return: The PID of the process if found, or 0 if the process is not found.
     """
-    try:
-        # List processes and filter by name
-        ps_output = subprocess.check_output(['ps', 'aux'], text=True)
-        for line in ps_output.split('\n'):
-            if process_name in line:
-                pid = int(line.split()[0])
-                return pid
-        return 0  # Process not found
-    except subprocess.CalledProcessError:
-        return 0
+    pids = find_processes(process_name)
+    return pids[0] if pids else 0
 
 
 def kill_process_by_pid(process_name: str) -> None:
@@ -216,15 +330,16 @@ def kill_process_by_pid(process_name: str) -> None:
 
     param: The name of the process to be killed.
     """
-    if is_process_running(process_name):
-        # Retrieve the Process ID (PID) of the specified process
-        pid = get_pid_by_process_name(process_name)
+    pids = [pid for pid in find_processes(process_name) if pid != os.getpid()]
+    if not pids:
+        logger.info(f"{process_name} not running, nothing to kill.")
+    for pid in pids:
         try:
-            subprocess.check_output(['kill', str(pid)])
-        except subprocess.CalledProcessError as e:
+            os.kill(pid, signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+        except PermissionError as e:
             logger.error(f"Failed to kill process: {e}")  # Failed to kill the process
-    else:
-        logger.info(f"{process_name} not running, nothing to kill.") 
         
 
 def run_command(command, config, error_message) -> None:
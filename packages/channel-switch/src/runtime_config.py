@@ -0,0 +1,185 @@
+import socket
+from types import MappingProxyType
+
+from config import get_config, RELOADABLE_KEYS, _positive_int, _positive_number, _non_negative_number
+from rmacs_codec import WIRE_FORMATS
+
+
+def _is_str(value):
+    return isinstance(value, str) and value != ""
+
+def _is_bool(value):
+    return isinstance(value, bool)
+
+def _is_str_list(value):
+    return isinstance(value, (list, tuple)) and all(_is_str(item) for item in value)
+
+def _is_frequency(value):
+    # starting_frequency is a string in the default configuration
+    try:
+        return int(value) > 0 and not isinstance(value, bool)
+    except (TypeError, ValueError):
+        return False
+
+def _is_mapping(value):
+    return hasattr(value, "items")
+
+def _non_negative_int(value):
+    return isinstance(value, int) and not isinstance(value, bool) and value >= 0
+
+def _is_spectral_decoder(value):
+    return value in ("auto", "builtin", "ss-analyser")
+
+def _is_port(value):
+    return _positive_int(value) and value < 65536
+
+def _is_wire_format(value):
+    return value in WIRE_FORMATS
+
+
+# Type validators for RMACS_Config keys used by the runtime configuration
+SCHEMA = dict(RELOADABLE_KEYS, **{
+    "orchestra_node": _is_bool,
+    "primary_radio": _is_str,
+    "halow_interface": _is_str,
+    "halow_firmware": _is_str,
+    "halow_stats_interval": _non_negative_number,
+    "driver": _is_str,
+    "radio_interfaces": _is_str_list,
+    "freq_quality_report": _is_mapping,
+    "starting_frequency": _is_frequency,
+    "log_file": _is_str,
+    "bin_file": _is_str,
+    "spectral_decoder": _is_spectral_decoder,
+    "spectral_persist": _is_bool,
+    "spectral_interference_margin": _non_negative_number,
+    "wire_format": _is_wire_format,
+    "dedup_capacity": _positive_int,
+    "dedup_ttl": _positive_number,
+    "switch_ack_enabled": _is_bool,
+    "switch_ack_timeout": _positive_number,
+    "switch_ack_max_retries": _non_negative_int,
+    "peer_expiry_time": _positive_number,
+    "receive_buffer_size": _positive_int,
+    "socket_rcvbuf": _positive_int,
+    "sampler_enabled": _is_bool,
+    "sampler_interval": _positive_number,
+    "sampler_capacity": _positive_int,
+    "metrics_enabled": _is_bool,
+    "metrics_address": _is_str,
+    "metrics_server_port": _is_port,
+    "metrics_client_port": _is_port,
+})
+
+
+class InterfacePaths:
+    '''
+    Precomputed sysfs paths of a network interface.
+    '''
+    __slots__ = ("tx_bytes", "tx_errors", "operstate", "address", "phy_name")
+
+    def __init__(self, interface: str):
+        base = f"/sys/class/net/{interface}"
+        object.__setattr__(self, "tx_bytes", f"{base}/statistics/tx_bytes")
+        object.__setattr__(self, "tx_errors", f"{base}/statistics/tx_errors")
+        object.__setattr__(self, "operstate", f"{base}/operstate")
+        object.__setattr__(self, "address", f"{base}/address")
+        object.__setattr__(self, "phy_name", f"{base}/phy80211/name")
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+
+class RuntimeConfig:
+    '''
+    Validated, immutable view of the RMACS configuration with derived values.
+
+    Built once at start-up and handed to the server, client, traffic monitor and
+    scanners, so they do not dig through the configuration dicts or rebuild
+    paths and multicast destinations on their hot paths. Invalid values raise
+    ValueError when the object is built.
+    '''
+    __slots__ = tuple(SCHEMA) + (
+        "interface", "multicast", "ifindex", "paths", "phy",
+        "spectral_scan_ctl", "spectral_scan0",
+    )
+
+    def __init__(self, config):
+        rmacs_config = config.get("RMACS_Config", {})
+        errors = []
+        for key, validator in SCHEMA.items():
+            if key not in rmacs_config:
+                errors.append(f"RMACS_Config.{key} is missing")
+            elif not validator(rmacs_config[key]):
+                errors.append(f"RMACS_Config.{key} has invalid value {rmacs_config[key]!r}")
+
+        multicast = {}
+        for interface, settings in config.get("MULTICAST_CONFIG", {}).items():
+            try:
+                group = settings["group"]
+                port = int(settings["port"])
+                socket.inet_pton(socket.AF_INET6, group)
+                if not 0 < port < 65536:
+                    raise ValueError(port)
+                multicast[interface] = (group, port)
+            except (KeyError, TypeError, ValueError, OSError):
+                errors.append(f"MULTICAST_CONFIG.{interface} has invalid value {settings!r}")
+        for interface in rmacs_config.get("radio_interfaces", ()):
+            if interface not in config.get("MULTICAST_CONFIG", {}):
+                errors.append(f"MULTICAST_CONFIG has no entry for radio interface {interface}")
+        if errors:
+            raise ValueError(f"Invalid RMACS configuration: {'; '.join(errors)}")
+
+        for key in SCHEMA:
+            value = rmacs_config[key]
+            if isinstance(value, list):
+                value = tuple(value)
+            object.__setattr__(self, key, value)
+        object.__setattr__(self, "starting_frequency", int(rmacs_config["starting_frequency"]))
+        object.__setattr__(self, "interface", rmacs_config["primary_radio"])
+
+        # Derived values
+        interfaces = set(self.radio_interfaces) | {self.interface}
+        object.__setattr__(self, "multicast", MappingProxyType(multicast))
+        object.__setattr__(self, "ifindex", MappingProxyType({interface: self._ifindex(interface) for interface in interfaces}))
+        object.__setattr__(self, "paths", MappingProxyType({interface: InterfacePaths(interface) for interface in interfaces}))
+        object.__setattr__(self, "phy", MappingProxyType({interface: self._phy(interface) for interface in interfaces}))
+        phy = self.phy[self.interface]
+        debugfs = f"/sys/kernel/debug/ieee80211/{phy}" if phy else None
+        object.__setattr__(self, "spectral_scan_ctl", f"{debugfs}/{self.driver}/spectral_scan_ctl" if debugfs else None)
+        object.__setattr__(self, "spectral_scan0", f"{debugfs}/{self.driver}/spectral_scan0" if debugfs else None)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    @classmethod
+    def from_file(cls, config_file_path: str) -> "RuntimeConfig":
+        """
+        Build the runtime configuration from the cached configuration file.
+
+        :param config_file_path: Path of the RMACS configuration file.
+        :return: The validated runtime configuration.
+        """
+        return cls(get_config(config_file_path))
+
+    def get_ifindex(self, interface: str) -> int:
+        """
+        Interface index, resolved again if the interface did not exist at start-up.
+        """
+        index = self.ifindex.get(interface)
+        return index if index is not None else socket.if_nametoindex(interface)
+
+    @staticmethod
+    def _ifindex(interface: str):
+        try:
+            return socket.if_nametoindex(interface)
+        except OSError:
+            return None
+
+    @staticmethod
+    def _phy(interface: str):
+        try:
+            with open(f"/sys/class/net/{interface}/phy80211/name", "r") as file:
+                return file.read().strip()
+        except OSError:
+            return None
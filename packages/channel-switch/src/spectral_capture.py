@@ -0,0 +1,58 @@
+from logging_config import logger
+
+# Initial capture buffer size, it grows to the largest dump seen
+DEFAULT_CAPTURE_SIZE = 1 << 18
+
+
+class SpectralCapture:
+    '''
+    Read the spectral scan samples (spectral_scan0) into a reused buffer.
+
+    The samples are read with readinto() straight into a bytearray kept across
+    scans, so a scan neither spawns cat nor writes the dump to flash. Writing the
+    dump to a file is opt-in with save().
+
+    Attributes:
+    length : Number of bytes of the last capture.
+    '''
+    def __init__(self, size: int = DEFAULT_CAPTURE_SIZE):
+        self.buffer = bytearray(size)
+        self.length = 0
+
+    def read(self, path: str) -> int:
+        """
+        Read all samples available in the debugfs file.
+
+        :param path: Path of spectral_scan0.
+        :return: Number of bytes read.
+        :raises OSError: If the file cannot be read.
+        """
+        length = 0
+        self.length = 0
+        with open(path, "rb", buffering=0) as file:
+            while True:
+                if length == len(self.buffer):
+                    # No view of the buffer is held between captures, so it can grow
+                    self.buffer.extend(bytes(len(self.buffer)))
+                with memoryview(self.buffer) as view:
+                    with view[length:] as free:
+                        count = file.readinto(free)
+                if not count:
+                    break
+                length += count
+        self.length = length
+        logger.info(f"Captured {length} bytes of spectral samples from {path}")
+        return length
+
+    def view(self) -> memoryview:
+        """
+        The samples of the last capture, to be released before the next read().
+        """
+        return memoryview(self.buffer)[:self.length]
+
+    def save(self, path: str) -> None:
+        """
+        Write the samples of the last capture to a file.
+        """
+        with open(path, "wb") as file, self.view() as data:
+            file.write(data)
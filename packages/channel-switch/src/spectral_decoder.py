@@ -0,0 +1,183 @@
+import struct
+
+from logging_config import logger
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Reference : drivers/net/wireless/ath/spectral_common.h
+ATH_FFT_SAMPLE_HT20 = 1
+ATH_FFT_SAMPLE_HT20_40 = 2
+ATH_FFT_SAMPLE_ATH10K = 3
+SPECTRAL_HT20_NUM_BINS = 56
+SPECTRAL_HT20_40_NUM_BINS = 128
+TLV_HEADER = struct.Struct(">BH")
+
+if np is not None:
+    _TLV = [("type", "u1"), ("length", ">u2")]
+    # struct fft_sample_ht20
+    HT20_DTYPE = np.dtype(_TLV + [
+        ("max_exp", "u1"), ("freq", ">u2"), ("rssi", "i1"), ("noise", "i1"),
+        ("max_magnitude", ">u2"), ("max_index", "u1"), ("bitmap_weight", "u1"), ("tsf", ">u8"),
+        ("data", "u1", (SPECTRAL_HT20_NUM_BINS,)),
+    ])
+    # struct fft_sample_ht20_40
+    HT20_40_DTYPE = np.dtype(_TLV + [
+        ("channel_type", "u1"), ("freq", ">u2"), ("lower_rssi", "i1"), ("upper_rssi", "i1"), ("tsf", ">u8"),
+        ("lower_noise", "i1"), ("upper_noise", "i1"),
+        ("lower_max_magnitude", ">u2"), ("upper_max_magnitude", ">u2"),
+        ("lower_max_index", "u1"), ("upper_max_index", "u1"),
+        ("lower_bitmap_weight", "u1"), ("upper_bitmap_weight", "u1"), ("max_exp", "u1"),
+        ("data", "u1", (SPECTRAL_HT20_40_NUM_BINS,)),
+    ])
+    # struct fft_sample_ath10k, the number of bins depends on the channel width
+    _ATH10K_FIELDS = _TLV + [
+        ("chan_width_mhz", "u1"), ("freq1", ">u2"), ("freq2", ">u2"), ("noise", ">i2"),
+        ("max_magnitude", ">u2"), ("total_gain_db", ">u2"), ("base_pwr_db", ">u2"), ("tsf", ">u8"),
+        ("max_index", "i1"), ("rssi", "i1"), ("relpwr_db", "u1"), ("avgpwr_db", "u1"), ("max_exp", "u1"),
+    ]
+    ATH10K_HEADER_SIZE = np.dtype(_ATH10K_FIELDS).itemsize - TLV_HEADER.size
+
+
+def ath10k_dtype(bins: int):
+    return np.dtype(_ATH10K_FIELDS + [("data", "u1", (bins,))])
+
+
+class SpectralSamples:
+    '''
+    Decoded FFT samples of one sample type.
+
+    Attributes:
+    freq : Center frequency of every sample in MHz, shape (samples,).
+    noise : Noise floor of every bin in dBm, the channel noise floor spread over its bins, shape (samples, bins).
+    power : Signal power of every bin in dBm, shape (samples, bins).
+    '''
+    __slots__ = ("freq", "noise", "power")
+
+    def __init__(self, freq, noise, power):
+        self.freq = freq
+        self.noise = noise
+        self.power = power
+
+    def __len__(self):
+        return len(self.freq)
+
+
+def _bin_power(data, max_exp, rssi, noise):
+    # Reference : Documentation of ath9k spectral scan, fft_eval
+    # power = noise + rssi + 20 * log10(magnitude) - 10 * log10(sum of squared magnitudes)
+    magnitude = np.maximum(data.astype(np.float64) * np.left_shift(1, max_exp.astype(np.int64))[:, None], 1.0)
+    square_sum = np.square(magnitude).sum(axis=1)
+    base = noise.astype(np.float64) + rssi.astype(np.float64) - 10 * np.log10(square_sum)
+    return base[:, None] + 20 * np.log10(magnitude)
+
+
+def _bin_noise(noise, bins: int):
+    # The noise floor reported by the hardware covers all bins of the segment
+    return np.repeat(noise.astype(np.float64)[:, None] - 10 * np.log10(bins), bins, axis=1)
+
+
+def _decode_records(sample_type: int, records) -> SpectralSamples:
+    if sample_type == ATH_FFT_SAMPLE_HT20:
+        power = _bin_power(records["data"], records["max_exp"], records["rssi"], records["noise"])
+        return SpectralSamples(records["freq"].astype(np.int64), _bin_noise(records["noise"], power.shape[1]), power)
+    if sample_type == ATH_FFT_SAMPLE_HT20_40:
+        # Both halves of the 40 MHz channel have their own rssi and noise floor
+        half = SPECTRAL_HT20_40_NUM_BINS // 2
+        data = records["data"]
+        lower = _bin_power(data[:, :half], records["max_exp"], records["lower_rssi"], records["lower_noise"])
+        upper = _bin_power(data[:, half:], records["max_exp"], records["upper_rssi"], records["upper_noise"])
+        noise = np.concatenate([_bin_noise(records["lower_noise"], half), _bin_noise(records["upper_noise"], half)], axis=1)
+        return SpectralSamples(records["freq"].astype(np.int64), noise, np.concatenate([lower, upper], axis=1))
+    power = _bin_power(records["data"], records["max_exp"], records["rssi"], records["noise"])
+    return SpectralSamples(records["freq1"].astype(np.int64), _bin_noise(records["noise"], power.shape[1]), power)
+
+
+def _record_dtype(sample_type: int, length: int):
+    if sample_type == ATH_FFT_SAMPLE_HT20 and length == HT20_DTYPE.itemsize - TLV_HEADER.size:
+        return HT20_DTYPE
+    if sample_type == ATH_FFT_SAMPLE_HT20_40 and length == HT20_40_DTYPE.itemsize - TLV_HEADER.size:
+        return HT20_40_DTYPE
+    if sample_type == ATH_FFT_SAMPLE_ATH10K and length > ATH10K_HEADER_SIZE:
+        return ath10k_dtype(length - ATH10K_HEADER_SIZE)
+    return None
+
+
+def decode(buffer) -> list:
+    """
+    Decode a spectral scan dump (spectral_scan0) of ath9k or ath10k.
+
+    A dump of samples of one type and length, the usual case, is mapped as one
+    structured array without copying. Otherwise the TLVs are walked once to group
+    the samples by type and length, each group is then gathered and decoded in bulk.
+    Decoding stops at the first malformed or truncated TLV.
+
+    :param buffer: Bytes-like dump.
+    :return: List of SpectralSamples, one per sample type and length found.
+    """
+    if np is None:
+        raise RuntimeError("numpy is required by the spectral decoder")
+    size = len(buffer)
+    if size < TLV_HEADER.size:
+        return []
+    sample_type, length = TLV_HEADER.unpack_from(buffer, 0)
+    dtype = _record_dtype(sample_type, length)
+    if dtype is None:
+        logger.info(f"Unknown spectral sample type {sample_type} with length {length}")
+        return []
+    count = size // dtype.itemsize
+    records = np.frombuffer(buffer, dtype=dtype, count=count)
+    if np.all(records["type"] == sample_type) and np.all(records["length"] == length):
+        return [_decode_records(sample_type, records)] if count else []
+
+    groups = {}
+    offset = 0
+    while offset + TLV_HEADER.size <= size:
+        sample_type, length = TLV_HEADER.unpack_from(buffer, offset)
+        if offset + TLV_HEADER.size + length > size or _record_dtype(sample_type, length) is None:
+            logger.info(f"Skip malformed spectral sample at offset {offset}")
+            break
+        groups.setdefault((sample_type, length), []).append(offset)
+        offset += TLV_HEADER.size + length
+    raw = np.frombuffer(buffer, dtype=np.uint8)
+    result = []
+    for (sample_type, length), offsets in groups.items():
+        dtype = _record_dtype(sample_type, length)
+        records = raw[np.asarray(offsets)[:, None] + np.arange(dtype.itemsize)].copy().view(dtype).reshape(-1)
+        result.append(_decode_records(sample_type, records))
+    return result
+
+
+def channel_quality(samples: list, freq: int, margin: float) -> dict:
+    """
+    Channel quality of one frequency from decoded samples.
+
+    The index is the share of FFT bins, over all samples of the frequency, whose
+    power is more than margin dB above the noise floor, scaled to 0 (no energy
+    in the channel) to 10 (every bin occupied). Lower is better.
+
+    :param samples: Decoded samples, see decode().
+    :param freq: Frequency in MHz.
+    :param margin: dB above the noise floor a bin counts as occupied.
+    :return: Report entry {"freq", "index", "samples", "max_power"}, or {"freq", "error"}.
+    """
+    occupied = 0
+    bins = 0
+    count = 0
+    max_power = None
+    for group in samples:
+        selected = group.freq == freq
+        if not selected.any():
+            continue
+        power = group.power[selected]
+        noise = group.noise[selected]
+        occupied += int(np.count_nonzero(power > noise + margin))
+        bins += power.size
+        count += int(selected.sum())
+        group_max = float(power.max())
+        max_power = group_max if max_power is None else max(max_power, group_max)
+    if not count:
+        return {"freq": freq, "error": f"No spectral samples on {freq} MHz"}
+    return {"freq": freq, "index": round(10 * occupied / bins, 2), "samples": count, "max_power": round(max_power, 1)}
@@ -8,28 +8,43 @@ import os
 
 
 
-from config import load_config
+from runtime_config import RuntimeConfig
 config_file_path = '/etc/meshshield/rmacs_config.yaml'
-from rmacs_util import get_mesh_freq, get_channel_bw, get_interface_operstate, get_phy_interface, path_lookup
+from rmacs_util import get_mesh_freq, path_lookup
+from interface_registry import get_registry
 from logging_config import logger
+import spectral_decoder
+from spectral_capture import SpectralCapture
 
 class Spectral_Scan:
-    def __init__(self):
+    def __init__(self, rconfig: RuntimeConfig = None):
         self.VALUES = dict()
-        config = load_config(config_file_path)
-        self.interface = config['RMACS_Config']['primary_radio']
-        self.is_interface_up = get_interface_operstate(self.interface)
-        self.phy_interface = get_phy_interface(self.interface)
-        self.channel_bw = get_channel_bw(self.interface)
-        self.driver = config['RMACS_Config']['driver']
-        self.bin_file = config['RMACS_Config']['bin_file']
+        rconfig = rconfig if rconfig is not None else RuntimeConfig.from_file(config_file_path)
+        self.interface = rconfig.interface
+        state = get_registry().get(self.interface)
+        self.is_interface_up = state.is_up
+        self.phy_interface = rconfig.phy[self.interface] or state.phy
+        self.channel_bw = state.channel_bw
+        self.driver = rconfig.driver
+        self.bin_file = rconfig.bin_file
+        # The built-in decoder needs numpy, ss-analyser is used without it
+        self.use_builtin_decoder = rconfig.spectral_decoder == "builtin" or (
+            rconfig.spectral_decoder == "auto" and spectral_decoder.np is not None)
+        self.interference_margin = rconfig.spectral_interference_margin
+        # The samples are kept in memory, bin_file is only written on request or for ss-analyser
+        self.capture = SpectralCapture()
+        self.persist = rconfig.spectral_persist or not self.use_builtin_decoder
+        # debugfs control and sample files of the spectral scan
+        debugfs = f"/sys/kernel/debug/ieee80211/{self.phy_interface}/{self.driver}"
+        self.spectral_scan_ctl = rconfig.spectral_scan_ctl or f"{debugfs}/spectral_scan_ctl"
+        self.spectral_scan0 = rconfig.spectral_scan0 or f"{debugfs}/spectral_scan0"
 
     def initialize_scan(self) -> None:
         """
         Initialize spectral scan.
         """
         if self.driver in ("ath9k", "ath10K"):
-            output_file = f"/sys/kernel/debug/ieee80211/{self.phy_interface}/{self.driver}/spectral_scan_ctl"
+            output_file = self.spectral_scan_ctl
 
             cmd_background = ["echo", "background"]
             with open(output_file, "w") as file:
@@ -77,23 +92,29 @@ class Spectral_Scan:
             return
         # Command to stop spectral scan
         cmd_disable = ["echo", "disable"]
-        spectral_scan_ctl_file = f"/sys/kernel/debug/ieee80211/{self.phy_interface}/{self.driver}/spectral_scan_ctl"
         try:
-            with open(spectral_scan_ctl_file, "w") as file:
+            with open(self.spectral_scan_ctl, "w") as file:
                 subprocess.call(cmd_disable, stdout=file, stderr=subprocess.PIPE, shell=False)
         except subprocess.CalledProcessError as e:
             logger.info(f"Error: {e}")
 
-        # Command to dump scan output from spectral_scan0 to binary file
-        cmd_dump = ["cat", f"/sys/kernel/debug/ieee80211/{self.phy_interface}/{self.driver}/spectral_scan0"]
+        # Read the samples from spectral_scan0, and dump them to the binary file if requested
         try:
-            with open(self.bin_file, "wb") as output_file:
-                subprocess.call(cmd_dump, stdout=output_file, stderr=subprocess.PIPE, shell=False)
-        except subprocess.CalledProcessError as e:
+            self.capture.read(self.spectral_scan0)
+            if self.persist:
+                self.capture.save(self.bin_file)
+        except OSError as e:
             logger.info(f"Error: {e}")
             
     def run_fft_eval(self, freq:str) -> list[dict]:
+        """
+        Evaluate the channel quality of a frequency from the spectral scan dump.
 
+        :return: Report of the channel quality, a list of dicts with the "index" of the channel or an "error".
+                 ss-analyser returns it as a JSON string.
+        """
+        if self.use_builtin_decoder:
+            return self.decode_scan(freq)
         try:
             # Run the subprocess command
             #result = subprocess.run(['ss-analyser', self.bin_file, f"{freq}"], stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
@@ -137,5 +158,25 @@ class Spectral_Scan:
             return [{"error": f"Subprocess failed: {e}"}]
         except json.JSONDecodeError as e:
             return [{"error": f"Failed to parse JSON: {e}"}]
+
+    def decode_scan(self, freq) -> list[dict]:
+        """
+        Decode the captured spectral samples in-process and compute the channel quality index.
+        """
+        report = None
+        try:
+            with self.capture.view() as data:
+                try:
+                    samples = spectral_decoder.decode(data)
+                except (RuntimeError, ValueError) as e:
+                    # Handled before the view is released, the traceback refers to numpy arrays of the buffer
+                    report = [{"error": f"Decoding spectral scan failed: {e}"}]
+            if report is None:
+                report = [spectral_decoder.channel_quality(samples, int(freq), self.interference_margin)]
+        except (BufferError, RuntimeError, ValueError) as e:
+            # BufferError: the view is still exported by an unexpected error of the decoder
+            report = [{"error": f"Decoding spectral scan failed: {e}"}]
+        logger.info(f"Channel Quality Report : {report}")
+        return report
        
        
\ No newline at end of file
@@ -2,9 +2,9 @@ import os
 import subprocess
 import struct
 from typing import BinaryIO
-import pandas as pd
 
-from rmacs_util import Setup
+from rmacs_util import get_phy_interface, get_interface_operstate
+from spectral_capture import SpectralCapture
 
 # Reference : drivers/net/wireless/ath/spectral_common.h
 '''
@@ -24,9 +24,11 @@ class SpectralScanLite:
     Scan report is in binary format, to be converted to text format.
     '''
     def __init__(self, driver: str, interface: str):
-        self.phy_interface = Setup.get_phy_interface(driver)
-        self.is_interface_up = Setup.get_interface_operstate(interface)
+        self.phy_interface = get_phy_interface(interface)
+        self.is_interface_up = get_interface_operstate(interface)
         self.scan_interface = "TBD"
+        # Samples of the last scan, kept in memory
+        self.capture = SpectralCapture()
         
     
     def initialize_scan(self, driver: str) -> None:
@@ -41,7 +43,7 @@ class SpectralScanLite:
         """
           
         if driver == "ath9k":
-            output_file = f"/sys/kernel/debug/ieee80211/phy{self.phy_interface}/{driver}/spectral_scan_ctl"
+            output_file = f"/sys/kernel/debug/ieee80211/{self.phy_interface}/{driver}/spectral_scan_ctl"
 
             cmd_background = ["echo", "background"]
             with open(output_file, "w") as file:
@@ -54,9 +56,12 @@ class SpectralScanLite:
             raise Exception(f"Invalid driver: {driver}")
         
     
-    def execute_scan(self,driver: str, bin_file: str) -> None:
+    def execute_scan(self,driver: str, bin_file: str = None) -> None:
         """
         Execute spectral scan lite for ath9k chipset.
+
+        The samples are kept in memory for read(), they are also written to
+        bin_file if one is given.
         /* enum spectral_mode:
         *
         * @SPECTRAL_DISABLED: spectral mode is disabled
@@ -82,36 +87,40 @@ class SpectralScanLite:
             return
         # Command to stop spectral scan
         cmd_disable = ["echo", "disable"]
-        spectral_scan_ctl_file = f"/sys/kernel/debug/ieee80211/phy{self.phy_interface}/{driver}/spectral_scan_ctl"
+        spectral_scan_ctl_file = f"/sys/kernel/debug/ieee80211/{self.phy_interface}/{driver}/spectral_scan_ctl"
         try:
             with open(spectral_scan_ctl_file, "w") as file:
                 subprocess.call(cmd_disable, stdout=file, stderr=subprocess.PIPE, shell=False)
         except subprocess.CalledProcessError as e:
             print(f"Error: {e}")
 
-        # Command to dump scan output from spectral_scan0 to binary file
-        cmd_dump = ["cat", f"/sys/kernel/debug/ieee80211/phy{self.phy_interface}/{driver}/spectral_scan0"]
+        # Read the samples from spectral_scan0, and dump them to the binary file if requested
         try:
-            with open(bin_file, "wb") as output_file:
-                subprocess.call(cmd_dump, stdout=output_file, stderr=subprocess.PIPE, shell=False)
-        except subprocess.CalledProcessError as e:
+            self.capture.read(f"/sys/kernel/debug/ieee80211/{self.phy_interface}/{driver}/spectral_scan0")
+            if bin_file is not None:
+                self.capture.save(bin_file)
+        except OSError as e:
             print(f"Error: {e}")
             
-    def read(self, bin_file: str) -> pd.DataFrame:
+    def read(self, bin_file: str = None) -> "pd.DataFrame":
         """
-        Read spectral scan binary file.
+        Read spectral scan samples.
         
         Parameter:
-        bin_file: str -- spectral scan binary file
+        bin_file: str -- spectral scan binary file, the samples of the last execute_scan() if not given
 
         Return: 
         A dataframe of the spectral scan.
         """
+        import pandas as pd
         try:
-            binary_scan_file = self.file_open(bin_file)
-            file_stats = os.stat(bin_file)
-            data = binary_scan_file.read(file_stats.st_size)
-            self.file_close(binary_scan_file)
+            if bin_file is None:
+                data = self.capture.view()
+            else:
+                binary_scan_file = self.file_open(bin_file)
+                file_stats = os.stat(bin_file)
+                data = binary_scan_file.read(file_stats.st_size)
+                self.file_close(binary_scan_file)
             pos = 0
             count = 0
             self.VALUES = dict()
@@ -0,0 +1,102 @@
+import os
+import sys
+import time
+
+from logging_config import logger
+
+# Modules which must not be imported on the startup path
+HEAVY_MODULES = ("yaml", "pandas", "numpy", "nats")
+
+_START = time.perf_counter()
+
+
+def process_age() -> float:
+    """
+    Seconds since the current process was started by the kernel.
+    Includes the interpreter start-up which perf_counter based timers cannot see.
+
+    Path : /proc/self/stat (field 22, starttime in clock ticks since boot)
+    """
+    try:
+        with open("/proc/self/stat", "r") as file:
+            stat = file.read()
+        with open("/proc/uptime", "r") as file:
+            uptime = float(file.read().split()[0])
+        # The command name may contain spaces, fields are counted after the closing bracket
+        start_ticks = int(stat[stat.rindex(")") + 2:].split()[19])
+        return uptime - start_ticks / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class StartupProfiler:
+    '''
+    Record start-up milestones of an RMACS entry point.
+
+    Milestones are no-ops until the profiler is enabled (--startup-profile),
+    so they can stay in the start-up path permanently.
+    '''
+    def __init__(self):
+        self.enabled = False
+        self.name = None
+        self.marks: list = []
+        self.interpreter_time = None
+
+    def enable(self, name: str) -> None:
+        self.enabled = True
+        self.name = name
+        age = process_age()
+        if age is not None:
+            # Time spent before this module was imported: interpreter and early imports
+            self.interpreter_time = age - (time.perf_counter() - _START)
+        self.mark("imports")
+
+    def mark(self, label: str) -> None:
+        """
+        Record a start-up milestone.
+
+        :param label: Name of the milestone reached.
+        """
+        if self.enabled:
+            self.marks.append((label, time.perf_counter(), len(sys.modules)))
+
+    def report(self) -> str:
+        """
+        Build the start-up profiling report and write it to the log and stdout.
+
+        :return: The report as text.
+        """
+        if not self.enabled:
+            return ""
+        lines = [f"Startup profile for {self.name}:"]
+        if self.interpreter_time is not None:
+            lines.append(f"  {'process start':<24} {self.interpreter_time * 1000:9.1f} ms")
+        previous = _START
+        for label, timestamp, module_count in self.marks:
+            lines.append(f"  {label:<24} {(timestamp - previous) * 1000:9.1f} ms"
+                         f"  (total {(timestamp - _START) * 1000:8.1f} ms, {module_count} modules)")
+            previous = timestamp
+        loaded = [name for name in HEAVY_MODULES if name in sys.modules]
+        lines.append(f"  heavy modules loaded    : {', '.join(loaded) if loaded else 'none'}")
+        report = "\n".join(lines)
+        for line in lines:
+            logger.info(line)
+        print(report, flush=True)
+        return report
+
+
+profiler = StartupProfiler()
+
+
+def enable_from_args(name: str, argv: list = None) -> bool:
+    """
+    Enable the start-up profiler if --startup-profile is given on the command line.
+
+    :param name: Name of the entry point being profiled.
+    :param argv: Command line arguments, defaults to sys.argv[1:].
+    :return: True if profiling is enabled.
+    """
+    argv = sys.argv[1:] if argv is None else argv
+    if "--startup-profile" in argv:
+        profiler.enable(name)
+    return profiler.enabled
@@ -0,0 +1,108 @@
+import errno
+import os
+import threading
+
+# sysfs attributes are at most one page
+PAGE_SIZE = 4096
+
+# Errors of a file whose kernel object is gone, e.g. the interface was removed or re-created
+STALE_ERRNOS = (errno.ENODEV, errno.ENXIO, errno.ESTALE)
+
+
+class SysfsFile:
+    '''
+    A sysfs/debugfs attribute held open and re-read in place.
+
+    The file is opened on the first read and every read is a single preadv() at
+    offset 0 into a buffer reused across reads, instead of stat + open + read +
+    close. When the kernel object behind the file disappears (ENODEV and
+    friends) the file is reopened once, so an interface which is removed and
+    created again is picked up transparently.
+
+    Attributes:
+    path : Path of the attribute.
+    reopens : Number of times the file was reopened after it went stale.
+    '''
+    def __init__(self, path: str, size: int = PAGE_SIZE):
+        self.path = path
+        self.fd: int = None
+        self.buffer = bytearray(size)
+        self.view = memoryview(self.buffer)
+        self.reopens = 0
+        self.lock = threading.Lock()
+
+    def read_bytes(self) -> bytes:
+        """
+        Current content of the attribute.
+
+        :raises OSError: If the file does not exist or cannot be read.
+        """
+        with self.lock:
+            if self.fd is None:
+                self.fd = os.open(self.path, os.O_RDONLY | os.O_CLOEXEC)
+            try:
+                length = os.preadv(self.fd, [self.buffer], 0)
+            except OSError as e:
+                if e.errno not in STALE_ERRNOS:
+                    raise
+                self._close()
+                self.reopens += 1
+                self.fd = os.open(self.path, os.O_RDONLY | os.O_CLOEXEC)
+                length = os.preadv(self.fd, [self.buffer], 0)
+            return self.view[:length].tobytes()
+
+    def read_int(self) -> int:
+        """
+        Value of a numeric attribute, e.g. a statistics counter.
+
+        :raises OSError: If the file cannot be read.
+        :raises ValueError: If the content is not a number.
+        """
+        return int(self.read_bytes())
+
+    def read_text(self) -> str:
+        """
+        Content of a text attribute without surrounding whitespace.
+        """
+        return self.read_bytes().decode().strip()
+
+    def close(self) -> None:
+        with self.lock:
+            self._close()
+
+    def _close(self) -> None:
+        if self.fd is not None:
+            try:
+                os.close(self.fd)
+            except OSError:
+                pass
+            self.fd = None
+
+
+_files: dict = {}
+_files_lock = threading.Lock()
+
+
+def get_sysfs_file(path: str) -> SysfsFile:
+    """
+    Held-open reader of a sysfs attribute, shared by all modules of the process.
+    """
+    sysfs_file = _files.get(path)
+    if sysfs_file is None:
+        with _files_lock:
+            sysfs_file = _files.setdefault(path, SysfsFile(path))
+    return sysfs_file
+
+
+def read_sysfs_int(path: str) -> int:
+    """
+    Read a numeric sysfs attribute through its shared held-open reader.
+    """
+    return get_sysfs_file(path).read_int()
+
+
+def read_sysfs_text(path: str) -> str:
+    """
+    Read a text sysfs attribute through its shared held-open reader.
+    """
+    return get_sysfs_file(path).read_text()
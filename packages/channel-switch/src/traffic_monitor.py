@@ -6,170 +6,345 @@ import re
 
 from logging_config import logger
 from rmacs_util import get_mesh_freq, path_lookup
+from ethtool_stats import EthtoolStats
+from channel_survey import ChannelSurvey
+from nl80211 import get_nl80211
+from counter_sampler import CounterSampler, counter_delta
+from interface_registry import get_registry
+from sysfs_reader import read_sysfs_int
+from driver_stats import get_driver_stats, get_halow_stats, BEACONS_LATE
 parent_directory = os.path.abspath(os.path.dirname(__file__))
 if parent_directory not in sys.path:
    sys.path.append(parent_directory)
    
-from config import load_config
+from runtime_config import RuntimeConfig
 config_file_path = '/etc/meshshield/rmacs_config.yaml'
 
+# Counters kept by the background sampler, in the order of CounterSnapshot.values()
+COUNTERS = ("tx_bytes", "tx_errors", "phy_error", "tx_timeout", "air_active", "air_busy")
+
+def counter_names(interface: str) -> tuple:
+    """
+    Names of the counters of an interface in a sampler, tagged with the interface as samplers are shared.
+    """
+    return tuple(f"{interface}:{counter}" for counter in COUNTERS)
+
+class CounterSnapshot:
+    '''
+    Values of all monitored counters of an interface read at one instant.
+
+    Counters which could not be read are None.
+    '''
+    __slots__ = ("time", "tx_bytes", "tx_errors", "ethtool", "freq", "air")
+
+    def __init__(self, timestamp: float, tx_bytes, tx_errors, ethtool, freq, air):
+        self.time = timestamp
+        self.tx_bytes = tx_bytes
+        self.tx_errors = tx_errors
+        # EthtoolSnapshot
+        self.ethtool = ethtool
+        # Operating frequency the air time counters belong to
+        self.freq = freq
+        # (active time, busy time) of the operating channel in ms
+        self.air = air
+
+    def values(self) -> tuple:
+        """
+        Raw counter values in the order of COUNTERS.
+        """
+        ethtool = self.ethtool
+        air = self.air if self.air is not None else (None, None)
+        return (self.tx_bytes, self.tx_errors,
+                ethtool.get('d_rx_phy_err') if ethtool is not None else None,
+                ethtool.get('d_tx_timeout') if ethtool is not None else None,
+                air[0], air[1])
+
+
+class TrafficSample:
+    '''
+    Traffic and error metrics computed over one sampling window.
+
+    Attributes:
+    time : Monotonic time of the end of the window.
+    window : Length of the window in seconds.
+    traffic : Transmit rate in kbps.
+    tx_errors : Transmit errors.
+    phy_error : PHY receive errors (ethtool d_rx_phy_err).
+    tx_timeout : Transmit timeouts (ethtool d_tx_timeout).
+    air_time : Busy time of the operating channel in percent, None if not measured.
+    beacons_late : HaLow beacons sent late because of host delay, None if not measured, see TrafficMonitor.read_beacons_late().
+    interface : Name of the measured interface.
+    driver : Driver of the measured interface, None if unknown.
+    '''
+    __slots__ = ("time", "window", "traffic", "tx_errors", "phy_error", "tx_timeout", "air_time", "beacons_late",
+                 "interface", "driver")
+
+    def __init__(self, end_time: float, window: float, deltas: dict, interface: str = None, driver: str = None,
+                 beacons_late: float = None):
+        """
+        :param end_time: Monotonic time of the end of the window.
+        :param window: Length of the window in seconds.
+        :param deltas: Dict of {counter of COUNTERS: increase over the window, None if not measured}.
+        :param interface: Name of the measured interface.
+        :param driver: Driver of the measured interface.
+        :param beacons_late: Late beacons per window, None if not measured.
+        """
+        self.interface = interface
+        self.driver = driver
+        self.time = end_time
+        self.window = window
+        tx_bytes = deltas["tx_bytes"]
+        # Convert tx_bytes value in bytes to Kilobits [Kilobits = Bytes * 8 / 1000]
+        self.traffic = (tx_bytes * 8) / (window * 1000) if tx_bytes is not None and window > 0 else 0
+        self.tx_errors = deltas["tx_errors"] or 0
+        self.phy_error = deltas["phy_error"] or 0
+        self.tx_timeout = deltas["tx_timeout"] or 0
+        self.air_time = None
+        active, busy = deltas["air_active"], deltas["air_busy"]
+        if active and busy is not None:
+            self.air_time = min(busy / active, 1.0) * 100
+        self.beacons_late = beacons_late
+
+    @classmethod
+    def between(cls, previous: CounterSnapshot, current: CounterSnapshot, interface: str = None,
+                driver: str = None) -> "TrafficSample":
+        """
+        Metrics over the window between two snapshots.
+        """
+        deltas = {counter: _delta(old, new) for counter, old, new in zip(COUNTERS, previous.values(), current.values())}
+        if previous.freq != current.freq:
+            # The air time counters belong to another channel after a switch
+            deltas["air_active"] = deltas["air_busy"] = None
+        return cls(current.time, current.time - previous.time, deltas, interface, driver)
+
+    def __repr__(self):
+        return (f"TrafficSample(interface={self.interface}, driver={self.driver}, window={self.window:.2f}, "
+                f"traffic={self.traffic:.1f}, tx_errors={self.tx_errors}, "
+                f"phy_error={self.phy_error}, tx_timeout={self.tx_timeout}, air_time={self.air_time}, "
+                f"beacons_late={self.beacons_late})")
+
+
+def _delta(previous, current):
+    if previous is None or current is None:
+        return None
+    return counter_delta(previous, current)
+
+
 class TrafficMonitor:
     '''
     A class designed to monitor network traffic and transmission errors by capturing network interface statistics from sysfs.
     
+    All counters are read together by snapshot_counters() and every metric of a
+    sample() is computed over the same window, so one measurement costs one
+    sample_window instead of one wait per metric.
+
+    With a background CounterSampler, shared by all radios (see RadioMonitor),
+    the counters are polled into ring buffers and sample() returns the most
+    recent window without waiting; recent_samples() gives the consecutive
+    windows before it.
+
+    The air time counters of the operating channel come from a survey of the
+    whole band, read with the other counters so every window has its own air
+    time; the operating frequency is taken from the ChannelMonitor cache. The late
+    beacons need a query of the driver statistics, they are not polled by the
+    sampler but read by error checks, see read_beacons_late().
+
     Methods:
+    sample: Read all counters twice, sample_window apart, and compute the metrics.
+    recent_samples: Consecutive sample windows from the background sampler.
     traffic_monitor: Monitor the Network traffic at specific Network Interface.
-    error_monitor: Monitor the Transmission error at specific Network Interface.
-    get_traffic_status: Calculate the Network traffic based on previous and current tx_bytes 
     read_sysfs_file: Read the network interface statistics from sysfs.
 
+    :param rconfig: Runtime configuration.
+    :param interface: Monitored interface, the interface of the configuration by default.
+    :param sampler: Background sampler polling read_counters() under counter_names(interface), None to read on demand.
+    :param channel_monitor: ChannelMonitor the operating frequency is taken from, None to query it.
     '''
-    def __init__(self):
-        self.prev_tx_bytes = None
-        self.cur_tx_bytes = None
-        self.tx_rate_wait_time = 2
-        self.phy_error_wait_time = 2
-        self.tx_timeout_wait_time = 2
+    def __init__(self, rconfig: RuntimeConfig = None, interface: str = None, sampler: CounterSampler = None,
+                 channel_monitor = None):
+        self.sample_window = 2
+        self.last_sample: TrafficSample = None
         # Set the Network interface  
-        config = load_config(config_file_path)
-        self.interface = config['RMACS_Config']['primary_radio']
-        self.traffic_threshold =  config['RMACS_Config']['traffic_threshold']
+        rconfig = rconfig if rconfig is not None else RuntimeConfig.from_file(config_file_path)
+        self.interface = interface or rconfig.interface
+        self.phy = rconfig.phy.get(self.interface) or get_registry().phy(self.interface)
+        self.driver = get_registry().driver(self.interface)
+        self.counters = counter_names(self.interface)
+        self.sampler = sampler
+        self.channel_monitor = channel_monitor
+        self.traffic_threshold =  rconfig.traffic_threshold
         #Network statistics file 
-        self.tx_bytes_path = f"/sys/class/net/{self.interface}/statistics/tx_bytes"
-        self.tx_error_path = f"/sys/class/net/{self.interface}/statistics/tx_errors"
-        self.fw_stats_path = f"/sys/kernel/debug/ieee80211/phy1/{self.interface}/fw_stats"
-        self.ethtool_path = path_lookup('ethtool')
+        self.tx_bytes_path = rconfig.paths[self.interface].tx_bytes
+        self.tx_error_path = rconfig.paths[self.interface].tx_errors
+        self.ethtool = EthtoolStats(self.interface)
+        self.survey = ChannelSurvey(self.interface)
         self.iw_path = path_lookup('iw') 
+        # Operating frequency of the previous sampler read
+        self.sampler_freq = None
+        # Driver specific statistics, e.g. late beacons of the HaLow (Morse Micro) firmware
+        self.driver_stats = get_driver_stats(self.interface, self.driver, rconfig)
+        if self.driver_stats is None and self.interface == rconfig.interface:
+            # The late beacons of the HaLow radio are checked with the primary radio, whatever its driver
+            self.driver_stats = get_halow_stats(rconfig)
+        # (read time, late beacons) of the previous read of the driver statistics
+        self.last_beacons = None
         
+    def snapshot_counters(self) -> CounterSnapshot:
+        '''
+        Read all monitored counters of the interface.
+        '''
+        timestamp = time.monotonic()
+        tx_bytes = self._read_counter(self.tx_bytes_path)
+        tx_errors = self._read_counter(self.tx_error_path)
+        try:
+            ethtool = self.ethtool.snapshot()
+        except OSError as e:
+            logger.warning(f"Error occurred while reading ethtool statistics of {self.interface}: {e}")
+            ethtool = None
+        freq = self.get_frequency()
+        return CounterSnapshot(timestamp, tx_bytes, tx_errors, ethtool, freq, self._read_air(freq))
+
+    def sample(self, reuse_last: bool = False, error_check: bool = False) -> TrafficSample:
+        '''
+        Measure all metrics over one window of sample_window seconds.
+
+        The most recent window of the background sampler is returned right away
+        once it has enough history (waited for right after start), otherwise the
+        counters are read twice.
+
+        Args:
+        reuse_last: Return the sample of the previous call instead, once, if it ended less than sample_window ago.
+        error_check: Also measure the late beacons, since the previous read.
+        Returns:
+        TrafficSample : The metrics of the window
+        '''
+        samples = self.recent_samples(1, error_check)
+        if samples is None and self.sampler is not None and self.sampler.is_alive():
+            deadline = time.monotonic() + self.sample_window + 2 * self.sampler.interval
+            while samples is None and time.monotonic() < deadline:
+                time.sleep(self.sampler.interval)
+                samples = self.recent_samples(1, error_check)
+        if samples is not None:
+            logger.info(f"Traffic sample : {samples[0]}")
+            return samples[0]
+        sample, self.last_sample = self.last_sample, None
+        if not reuse_last or sample is None or time.monotonic() - sample.time > self.sample_window:
+            previous = self.snapshot_counters()
+            time.sleep(self.sample_window)
+            sample = TrafficSample.between(previous, self.snapshot_counters(), self.interface, self.driver)
+            self.last_sample = sample
+        if error_check:
+            sample.beacons_late = self.read_beacons_late()
+        logger.info(f"Traffic sample : {sample}")
+        return sample
+
+    def recent_samples(self, count: int, error_check: bool = False) -> list:
+        '''
+        The count most recent consecutive windows of sample_window seconds, oldest first.
+
+        Args:
+        error_check: Also measure the late beacons, since the previous read, for the newest window; the earlier windows keep None.
+        Returns:
+        list : TrafficSamples, None if the background sampler is not running or has not enough history
+        '''
+        if self.sampler is None or not self.sampler.is_alive():
+            return None
+        windows = self.sampler.windows(self.sample_window, count)
+        if windows is None:
+            return None
+        samples = [TrafficSample(end_time, window, {counter: deltas[name] for counter, name in zip(COUNTERS, self.counters)},
+                                 self.interface, self.driver)
+                   for end_time, window, deltas in windows]
+        if error_check:
+            samples[-1].beacons_late = self.read_beacons_late()
+        return samples
+
+    def read_counters(self) -> tuple:
+        '''
+        Raw counter values for the sampler, in the order of COUNTERS.
+        '''
+        snapshot = self.snapshot_counters()
+        values = snapshot.values()
+        if snapshot.freq != self.sampler_freq:
+            # The air time counters belong to another channel after a switch, start over
+            self.sampler_freq = snapshot.freq
+            values = tuple(None if counter in ("air_active", "air_busy") else value
+                           for counter, value in zip(COUNTERS, values))
+        return values
+
+    def get_frequency(self) -> int:
+        '''
+        Operating frequency of the interface, from the ChannelMonitor cache if there is one.
+        '''
+        if self.channel_monitor is not None:
+            return self.channel_monitor.get_frequency(self.interface)
+        return get_mesh_freq(self.interface)
+
     def traffic_monitor(self) -> int:
         '''
         Monitor the Network traffic at specific Network Interface.
+
+        The error metrics of the same window are kept for the next sample(reuse_last=True).
         
         Returns: 
-        int : Return the network traffic in bytes
+        int : Return the network traffic in kbps
         '''  
-        self.prev_tx_bytes = self.read_sysfs_file(self.tx_bytes_path)
-        time.sleep(self.tx_timeout_wait_time)
-        self.cur_tx_bytes = self.read_sysfs_file(self.tx_bytes_path)
-        if self.prev_tx_bytes is not None and self.cur_tx_bytes is not None: 
-            self.traffic = ((self.cur_tx_bytes - self.prev_tx_bytes) * 8)/ (self.tx_rate_wait_time * 1000) #kbps 
-            logger.info(f"Traffic : {self.traffic}")
-            if self.traffic > self.traffic_threshold:
-                logger.info(f"Current Traffic: {self.traffic} in Kbps above threshold traffic : {self.traffic_threshold} in Kbps")
-                return self.traffic
-            else:
-                logger.info(f"There is no traffic, let's go for channel scan......")
-                return 0
+        self.traffic = self.sample().traffic
+        logger.info(f"Traffic : {self.traffic}")
+        if self.traffic > self.traffic_threshold:
+            logger.info(f"Current Traffic: {self.traffic} in Kbps above threshold traffic : {self.traffic_threshold} in Kbps")
+            return self.traffic
         else:
+            logger.info(f"There is no traffic, let's go for channel scan......")
             return 0
-
                
-    def error_monitor(self) -> int:
-        '''
-        Monitor the Transmission error at specific Network Interface.
-        
-        Returns: 
-        int : Return the network traffic error in bytes
-        '''
-        self.tx_error = self.read_sysfs_file(self.tx_error_path)
-        logger.info(f"The traffic error is : {self.tx_error}")
-        return self.tx_error
-    
-    def get_traffic_status(self) -> int:
-        '''
-        Calculate the Network traffic based on previous and current tx_bytes 
-        
-        Returns: 
-        int : Return the network traffic in bytes
-        '''
-        if self.prev_tx_bytes is None:
-            self.prev_tx_bytes = self.cur_tx_bytes
-            time.sleep(self.tx_rate_wait_time) 
-            self.cur_tx_bytes = self.read_sysfs_file(self.tx_bytes_path) 
-            # Convert tx_bytes value in bytes to Kilobits [Kilobits = Bytes * 8 / 1000]
-        self.traffic_in_kbps = ((self.cur_tx_bytes - self.prev_tx_bytes) * 8)/ (self.tx_rate_wait_time * 1000) #kbps 
-        logger.info(f"Traffic : {self.traffic_in_kbps}")
-        return self.traffic_in_kbps
-    
     def get_phy_error(self) ->int:
-        if self.ethtool_path is not None:
-            try:   
-                self.command = f"{self.ethtool_path} -S {self.interface} | grep -i 'd_rx_phy_err:' | cut -f 2 -d :"
-                self.prev_phy_error = self.run_command(self.command)
-                time.sleep(self.phy_error_wait_time)
-                self.cur_phy_error = self.run_command(self.command)
-                if self.prev_phy_error is not None and self.cur_phy_error is not None:
-                    logger.info(f"phy_error: {self.cur_phy_error - self.prev_phy_error}")
-                    return self.cur_phy_error - self.prev_phy_error
-                else:
-                    return 0
-            except Exception as e:
-                logger.warning(f"Error occurred while getting PHY errors: {e}")
-                return 0
-        else:
-            logger.warning('ethtool is not found')
-            return 0
-            
-            
+        self.phy_error = self.sample().phy_error
+        logger.info(f"phy_error: {self.phy_error}")
+        return self.phy_error
                 
     def get_tx_timeout(self) ->int:
-             
-        if self.ethtool_path is not None:
-            try:   
-                self.command = f"{self.ethtool_path} -S {self.interface} | grep -i 'd_tx_timeout:' | cut -f 2 -d :"
-                self.prev_tx_timeout = self.run_command(self.command)
-                time.sleep(self.tx_timeout_wait_time)
-                self.cur_tx_timeout = self.run_command(self.command)
-                if self.prev_tx_timeout is not None and self.cur_tx_timeout is not None:
-                    logger.info(f"tx_timeout: {self.cur_tx_timeout - self.prev_tx_timeout}")
-                    return self.cur_tx_timeout - self.prev_tx_timeout
-                else:
-                    return 0     
-            except Exception as e:
-                logger.warning(f"Error occurred while getting tx_timeout: {e}")
-                return 0
-        else:
-            logger.warning('ethtool is not found')
-            return 0
+        self.tx_timeout = self.sample().tx_timeout
+        logger.info(f"tx_timeout: {self.tx_timeout}")
+        return self.tx_timeout
         
     def get_air_time(self) -> int:
-        self.mesh_freq = get_mesh_freq(self.interface)
-        if self.iw_path is not None:
-            self.command = f"iw {self.interface} survey dump | grep -A 2 {self.mesh_freq}| grep -E 'channel active time|channel busy time'"
-
-            self.prev_value = self.run_command(self.command)
-            time.sleep(self.tx_timeout_wait_time)
-            self.cur_value = self.run_command(self.command)
-            act_time_1, bsy_time_1 = self.parse_air_time(self.prev_value)
-            act_time_2, bsy_time_2 = self.parse_air_time(self.cur_value)
-
-            # Check for missing values
-            if None in (act_time_1, bsy_time_1, act_time_2, bsy_time_2):
-                logger.info("Error: One or more RF parameters are missing.")
-                return None
-
-            # Calculate the differences
-            act_time_delta = act_time_2 - act_time_1
-            bsy_time_delta = bsy_time_2 - bsy_time_1
-
-            # Check for zero active time delta to avoid division by zero
-            if act_time_delta == 0:
-                logger.info("Active time delta is zero. Cannot calculate air time.")
-                return None
-
-            # Calculate air time percentage
-            air_time = (bsy_time_delta / act_time_delta) * 100
-
-            logger.debug(f"Active Time Delta: {act_time_delta} ms")
-            logger.debug(f"Busy Time Delta: {bsy_time_delta} ms")
-            logger.info(f"Air Time: {air_time}")
-            return air_time 
-        else:
-            logger.warning('iw utility is not found')
+        '''
+        Busy time of the operating channel in percent of its active time over one sample window.
+        '''
+        air_time = self.sample().air_time
+        logger.info(f"Air Time: {air_time}")
+        return air_time
+
+    def _read_air(self, freq: int):
+        # Cumulative (active, busy) time of the operating channel, the whole band is surveyed at once
+        if get_nl80211() is not None:
+            self.survey.update()
+            survey = self.survey.previous.get(freq)
+            return (survey.time, survey.busy) if survey is not None else None
+        if self.iw_path is None or freq is None:
+            return None
+        command = f"{self.iw_path} {self.interface} survey dump | grep -A 2 {freq}| grep -E 'channel active time|channel busy time'"
+        output = self.run_text_command(command)
+        return self.parse_air_time(output) if output is not None else None
+
+    def _read_counter(self, syspath: str) -> int:
+        try:
+            return self.read_sysfs_file(syspath)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Error occurred while reading {syspath}: {e}")
             return None
-                   
 
-    def parse_air_time(rf_params):
+    def get_channel_busy(self, frequencies) -> dict:
+        '''
+        Busy ratio of the frequencies between the last two surveys, i.e. the last sampler interval.
+
+        Returns:
+        dict : {frequency: busy ratio between 0 and 1, None if not measured}
+        '''
+        return self.survey.busy_ratios(frequencies)
+
+    def parse_air_time(self, rf_params):
  
         active_time = None
         busy_time = None
@@ -182,62 +357,119 @@ class TrafficMonitor:
 
         return active_time, busy_time
     
-    def get_beacons_late(self) -> int:
-        
-       self.command = (
-           "sudo morsectrl -i morse1 stats -s /run/current-system/sw/lib/firmware/mm6108.bin "
-           "| grep -i 'BEACONS late from host delay' | awk '$1=$1' | cut -f 2 -d :"
-       )
-       self.prev_beacons_delay = self.run_command(self.command)
-       time.sleep(self.tx_timeout_wait_time)
-       self.cur_beacons_delay = self.run_command(self.command)
-       if self.prev_beacons_delay is not None and self.cur_beacons_delay is not None:
-           logger.info(f"beacons_delay: {self.cur_beacons_delay - self.prev_beacons_delay}")
-           return self.cur_beacons_delay - self.prev_beacons_delay
-       else:
-           return 0
+    def get_beacons_late(self) -> float:
+        self.beacons_late = self.sample(error_check=True).beacons_late
+        logger.info(f"beacons_delay: {self.beacons_late}")
+        return self.beacons_late
+
+    def read_beacons_late(self) -> float:
+        '''
+        HaLow beacons sent late per sample_window since the previous call, from the driver statistics.
+
+        The statistics are read at most every halow_stats_interval, so the count is
+        scaled by the time between the two reads of the statistics, not by the window
+        of the other counters.
+
+        Returns:
+        float : None on the first call, if the statistics were not read again or are not available
+        '''
+        if self.driver_stats is None:
+            return None
+        counters = self.driver_stats.read()
+        value = counters.get(BEACONS_LATE) if counters is not None else None
+        if value is None:
+            return None
+        previous, read_at = self.last_beacons, self.driver_stats.read_at
+        if previous is not None and read_at <= previous[0]:
+            # Same read as the previous call, keep it as the start of the window
+            return None
+        self.last_beacons = (read_at, value)
+        if previous is None:
+            return None
+        return round(counter_delta(previous[1], value) * self.sample_window / (read_at - previous[0]), 2)
     
-    def run_command(self, command: str) -> int:
+    def run_text_command(self, command: str) -> str:
         try:
             result = subprocess.run(command, shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-            if result.returncode == 0:
-                output  = result.stdout.strip()
-                return int(output)
-            else:
-                logger.info(f"Command failed with return code {result.returncode}. Error:", result.stderr)
-                return None
-    
-        except FileNotFoundError as e:
-            logger.info(f"Command not found: {e}")
-            return None
-        except subprocess.SubprocessError as e:
+        except (OSError, subprocess.SubprocessError) as e:
             logger.info(f"Subprocess error: {e}")
             return None
-        except Exception as e:
-            logger.info(f"An unexpected error occurred: {e}")
+        if result.returncode != 0:
+            logger.info(f"Command failed with return code {result.returncode}. Error: {result.stderr}")
             return None
-            
-    
+        return result.stdout
+
     def read_sysfs_file(self, syspath: str) -> int:
         '''
         Read the network interface statistics from sysfs.
+
+        The file is held open and re-read with one pread per call.
         
         Returns: 
         int : Return the sysfs value 
         '''
-        
-        if os.path.exists(syspath):
-            with open(syspath, 'r') as file:
-                return int(file.read().strip())
-        else:
-            raise FileNotFoundError(f"{syspath} does not exist.")
-        
+        return read_sysfs_int(syspath)
 
-        
-    
-    
 
-    
+class RadioMonitor:
+    '''
+    Traffic and error monitoring of all radios of the node.
 
+    Every wireless interface of radio_interfaces (resolved to its wiphy) and the
+    primary radio get a TrafficMonitor. The counters of all of them are read in
+    one pass by a single background CounterSampler and every sample is tagged with
+    its interface and driver, so the secondary radios (e.g. HaLow next to 2.4/5 GHz)
+    are measured over the same windows as the primary radio.
 
-    
\ No newline at end of file
+    The operating frequency of the air time counters comes from the
+    ChannelMonitor cache when one is given.
+    '''
+    def __init__(self, rconfig: RuntimeConfig = None, channel_monitor = None):
+        rconfig = rconfig if rconfig is not None else RuntimeConfig.from_file(config_file_path)
+        self.interface = rconfig.interface
+        interfaces = []
+        for interface in dict.fromkeys((rconfig.interface,) + rconfig.radio_interfaces):
+            if interface != rconfig.interface and not (rconfig.phy.get(interface) or get_registry().phy(interface)):
+                logger.info(f"{interface} is not a wireless interface, its traffic is not monitored")
+                continue
+            interfaces.append(interface)
+        counters = tuple(name for interface in interfaces for name in counter_names(interface))
+        self.sampler_enabled = rconfig.sampler_enabled
+        self.sampler = CounterSampler(counters, self.read_counters, rconfig.sampler_interval,
+                                      rconfig.sampler_capacity, name="rmacs-radio-sampler")
+        self.monitors: dict = {interface: TrafficMonitor(rconfig, interface, self.sampler, channel_monitor)
+                              for interface in interfaces}
+        logger.info(f"Monitoring radios : {', '.join(f'{name} ({monitor.phy}, {monitor.driver})' for name, monitor in self.monitors.items())}")
+
+    @property
+    def primary(self) -> TrafficMonitor:
+        return self.monitors[self.interface]
+
+    def start(self) -> None:
+        '''
+        Start polling the counters of all radios in the background, if enabled in the configuration.
+        '''
+        if self.sampler_enabled and not self.sampler.is_alive():
+            self.sampler.start()
+
+    def stop(self) -> None:
+        self.sampler.stop()
+
+    def read_counters(self) -> tuple:
+        '''
+        Raw counter values of all radios, in the order of the sampler counters.
+        '''
+        return tuple(value for monitor in self.monitors.values() for value in monitor.read_counters())
+
+    def samples(self) -> dict:
+        '''
+        The most recent sample window of every radio.
+
+        Returns:
+        dict : {interface: TrafficSample, None if the sampler has no history yet}
+        '''
+        result = {}
+        for interface, monitor in self.monitors.items():
+            samples = monitor.recent_samples(1)
+            result[interface] = samples[0] if samples is not None else None
+        return result